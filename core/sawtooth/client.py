@@ -441,6 +441,29 @@ class SawtoothClient(object):
 
         return path
 
+    @staticmethod
+    def _construct_page_path(path, limit, cursor=None):
+        query = {'limit': limit}
+        if cursor is not None:
+            query['cursor'] = cursor
+
+        separator = '&' if '?' in path else '?'
+        return path + separator + urllib.urlencode(query)
+
+    def _iter_pages(self, path, page_size):
+        """
+        Retrieve a listing page by page, yielding the items of each page.
+        """
+        cursor = None
+        while True:
+            page = self._communication.getmsg(
+                self._construct_page_path(path, page_size, cursor))
+            yield page['Items']
+
+            cursor = page['Next']
+            if cursor is None:
+                return
+
     @staticmethod
     def _construct_list_path(list_type, count=None):
         path = list_type
@@ -598,6 +621,69 @@ class SawtoothClient(object):
         self._last_transaction = txnid
         return txnid
 
+    def send_transactions(self, minfos, txntype_name=None,
+                          msgtype_name=None):
+        """
+        Build a transaction for each entry of a list, wrap each one in a
+        message with all of the appropriate signatures and post them to
+        the validator in a single request. The validator checks the
+        transactions in order, each one against the state left by the
+        valid transactions before it.
+
+        Args:
+            minfos: A list of dictionaries with the contents of the
+                transactions.
+            txntype_name: The transaction type, defaults to the transaction
+                type of the client.
+            msgtype_name: The message type, defaults to the message type
+                of the client.
+
+        Returns:
+            A list with the transaction id of each transaction that was
+            accepted, or None where the transaction was rejected or the
+            validator was too busy to accept it.
+        """
+
+        if self._signing_key is None:
+            raise ClientException(
+                'can not send transactions as a read-only client')
+
+        txntype_name = txntype_name or self._transaction_type
+        msgtype_name = msgtype_name or self._message_type
+
+        msgs = []
+        for minfo in minfos:
+            txn = {'TransactionType': txntype_name}
+            txn = dict(txn, **minfo)
+            if 'Dependencies' not in txn:
+                txn['Dependencies'] = []
+
+            msg, _ = _sign_message_with_transaction(
+                txn,
+                msgtype_name,
+                self._signing_key)
+            msgs.append(msg)
+
+        try:
+            LOGGER.debug('Posting %d transactions', len(msgs))
+            results = self._communication.postmsg('batch', msgs)
+        except MessageException as e:
+            LOGGER.warn('Posting transactions failed: %s', str(e))
+            return [None] * len(msgs)
+
+        txnids = []
+        for result in results:
+            if result['Status'] != 'accepted':
+                LOGGER.warn('Posting transaction %s failed: %s',
+                            result.get('Identifier'), result.get('Error'))
+                txnids.append(None)
+                continue
+
+            txnids.append(result['Identifier'])
+            self._last_transaction = result['Identifier']
+
+        return txnids
+
     def get_status(self, timeout=30):
         """
         Get the status for a validator
@@ -729,6 +815,86 @@ class SawtoothClient(object):
         """
         return self.get_store(key='*')
 
+    def iter_store_by_name(self,
+                           txn_type_or_name,
+                           key=None,
+                           block_id=None,
+                           page_size=1000):
+        """
+        Iterate over the keys of any named store, or over its objects,
+        retrieving them from the validator in pages. Every page shows the
+        state of the same block.
+
+        Args:
+            txn_type_or_name: A transaction class or object (i.e., derived
+                from transaction.Transaction) that can be used to infer the
+                store name or a string with the store name.
+            key: (optional) '*' to iterate over the objects, otherwise
+                None to iterate over the keys.
+            block_id: (optional) The block ID of the state to iterate over,
+                the most recently committed block by default.
+            page_size: The number of keys or objects retrieved at once.
+
+        Returns:
+            An iterator over the keys, or over (key, object) pairs when
+            key is '*', in key order.
+        """
+        path = self._construct_store_path(
+            txn_type_or_name=txn_type_or_name,
+            key=key,
+            block_id=block_id)
+        for items in self._iter_pages(path, page_size):
+            if key is None:
+                for item in items:
+                    yield item
+            else:
+                for item in sorted(items.iteritems()):
+                    yield item
+
+    def iter_store(self, key=None, block_id=None, page_size=1000):
+        """
+        Iterate over the keys of the store, or over its objects, retrieving
+        them from the validator in pages.
+
+        Args:
+            key: (optional) '*' to iterate over the objects, otherwise
+                None to iterate over the keys.
+            block_id: (optional) The block ID of the state to iterate over,
+                the most recently committed block by default.
+            page_size: The number of keys or objects retrieved at once.
+
+        Returns:
+            An iterator over the keys, or over (key, object) pairs when
+            key is '*', in key order.
+
+        Raises ClientException if the client object was not created with a
+        store name or transaction type.
+        """
+        if self._store_name is None:
+            raise \
+                ClientException(
+                    'The client must be configured with a store name or '
+                    'transaction type')
+
+        return \
+            self.iter_store_by_name(
+                txn_type_or_name=self._store_name,
+                key=key,
+                block_id=block_id,
+                page_size=page_size)
+
+    def iter_all_store_objects(self, page_size=1000):
+        """
+        Iterate over all of the objects for a particular store, retrieving
+        them from the validator in pages.
+
+        Returns: An iterator over (key, object) pairs in key order.
+
+        Raises ClientException if the client object was not created with a
+        store name or transaction type.
+        """
+        return self.iter_store(key='*', page_size=page_size)
+
     def get_store_object_for_key(self, key):
         """
         Retrieves the object from the store corresponding to the key
@@ -789,6 +955,17 @@ class SawtoothClient(object):
         return \
             self._communication.getmsg(self._construct_block_list_path(count))
 
+    def iter_block_list(self, page_size=1000):
+        """
+        Iterate over the committed block IDs, from newest to oldest,
+        retrieving them from the validator in pages.
+
+        Returns: An iterator over block IDs.
+        """
+        for items in self._iter_pages('block', page_size):
+            for item in items:
+                yield item
+
     def get_block(self, block_id, field=None):
         """
         Retrieve information about a specific block, returning all information
@@ -821,6 +998,23 @@ class SawtoothClient(object):
             self._communication.getmsg(
                 self._construct_transaction_list_path(block_count))
 
+    def iter_transaction_list(self, block_count=None, page_size=1000):
+        """
+        Iterate over the committed transaction IDs, from oldest to newest,
+        retrieving them from the validator in pages.
+
+        Args:
+            block_count: (optional) If not None, specifies the number of
+                most recent blocks to return transaction IDs for.
+            page_size: The number of transaction IDs retrieved at once.
+
+        Returns: An iterator over transaction IDs.
+        """
+        path = self._construct_transaction_list_path(block_count)
+        for items in self._iter_pages(path, page_size):
+            for item in items:
+                yield item
+
     def get_transaction(self, transaction_id, field=None):
         """
         Retrieve information about a specific transaction, returning all
@@ -866,6 +1060,27 @@ class SawtoothClient(object):
         """
         return self._communication.postmsg('forward', msg.dump())
 
+    def get_commit_events(self, since=None, timeout=0):
+        """
+        Retrieves the block commit and decommit events that followed an
+        event, waiting for one to happen.
+
+        Args:
+            since: The number of the event, defaults to the most recent
+                event.
+            timeout: The number of seconds the validator may wait for an
+                event before returning none.
+
+        Returns:
+            A dictionary with the Events, the number of the most recent
+            event as Next and whether events are missing as Truncated.
+        """
+        query = {'timeout': timeout}
+        if since is not None:
+            query['since'] = since
+        return self._communication.getmsg(
+            'event?' + urllib.urlencode(query), timeout + 10)
+
     def wait_for_commit(self, txnid=None, timetowait=5, iterations=12):
         """
         Wait until a specified transaction shows up in the ledger's committed
@@ -915,3 +1130,101 @@ class SawtoothClient(object):
                 txnid,
                 pretty_status)
             time.sleep(timetowait)
+
+
+class CommitWatcher(object):
+    """
+    Follows the block commit and decommit events of a validator to learn
+    when transactions commit, a single stream of events resolves any
+    number of transactions.
+
+    The watcher only sees the events that happen after it is created, so
+    it should be created before the transactions it watches are sent.
+    The None entries that send_transactions returns for the transactions
+    it could not send are skipped.
+
+        watcher = CommitWatcher(client)
+        txnids = client.send_transactions(updates)
+        uncommitted = watcher.wait(txnids, timeout=60)
+    """
+
+    def __init__(self, client, poll_timeout=30):
+        """
+        Args:
+            client: The SawtoothClient of the validator.
+            poll_timeout: The longest time in seconds a single request
+                waits for events.
+        """
+        self._client = client
+        self._poll_timeout = poll_timeout
+        self._since = client.get_commit_events()['Next']
+        self._watched = {}
+
+    def watch(self, txnid):
+        """
+        Starts watching a transaction, None is ignored.
+        """
+        if txnid is not None:
+            self._watched.setdefault(txnid, None)
+
+    def committed_block(self, txnid):
+        """
+        Returns the block a watched transaction was committed in, or None
+        if it has not been committed.
+        """
+        return self._watched.get(txnid)
+
+    def _apply(self, event):
+        for txnid in event['TransactionIDs']:
+            if txnid in self._watched:
+                self._watched[txnid] = event['BlockID'] \
+                    if event['Event'] == 'commit' else None
+
+    def _recheck(self):
+        # events were missed, ask for the status of each transaction
+        for txnid, blockid in self._watched.iteritems():
+            if blockid is None and self._client.get_transaction_status(
+                    txnid) == TransactionStatus.committed:
+                self._watched[txnid] = self._client.get_transaction(
+                    txnid, 'InBlock')
+
+    def poll(self, timeout=0):
+        """
+        Processes the events that happened since the last poll, waiting
+        up to timeout seconds for one if there are none.
+        """
+        result = self._client.get_commit_events(self._since, timeout)
+        for event in result['Events']:
+            self._apply(event)
+        self._since = result['Next']
+        if result['Truncated']:
+            LOGGER.warn('missed commit events, checking transactions')
+            self._recheck()
+
+    def wait(self, txnids=None, timeout=60):
+        """
+        Waits until transactions are committed.
+
+        Args:
+            txnids: The transactions to wait for, they are watched if they
+                are not already and None entries are skipped. Defaults to
+                every watched transaction.
+            timeout: The number of seconds to wait.
+
+        Returns:
+            The list of the transactions that were not committed in time.
+        """
+        if txnids is None:
+            txnids = self._watched.keys()
+        txnids = [t for t in txnids if t is not None]
+        for txnid in txnids:
+            self.watch(txnid)
+
+        end = time.time() + timeout
+        while True:
+            remaining = [t for t in txnids if self._watched[t] is None]
+            now = time.time()
+            if not remaining or now >= end:
+                return remaining
+
+            self.poll(min(self._poll_timeout, end - now))
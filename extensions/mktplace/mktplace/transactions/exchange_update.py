@@ -91,8 +91,9 @@ class _LiabilityInformation(object):
         return 0 < self.Count
 
     def inc_count(self, store, change):
-        obj = market_place_object_update.MarketPlaceObject.get_valid_object(
-            store, self.ObjectID, self.ObjectTypeName)
+        obj = dict(
+            market_place_object_update.MarketPlaceObject.get_valid_object(
+                store, self.ObjectID, self.ObjectTypeName))
 
         # we manage the counts for consumable assets, for non-consumable
         # assets we simply indicate that we have at least one copy of the
@@ -105,8 +106,9 @@ class _LiabilityInformation(object):
             store[self.ObjectID] = obj
 
     def dec_count(self, store, change):
-        obj = market_place_object_update.MarketPlaceObject.get_valid_object(
-            store, self.ObjectID, self.ObjectTypeName)
+        obj = dict(
+            market_place_object_update.MarketPlaceObject.get_valid_object(
+                store, self.ObjectID, self.ObjectTypeName))
 
         # if the asset is consumable then we need to manage the counts
         # explicitly for non-consumable assets the count is never decremented,
@@ -171,13 +173,16 @@ class _OfferInformation(object):
                 this offer
         """
         if payer.CreatorID not in self.ExecutionState['ParticipantList']:
-            self.ExecutionState['ParticipantList'].append(payer.CreatorID)
+            estate = dict(self.ExecutionState)
+            estate['ParticipantList'] = \
+                list(estate['ParticipantList']) + [payer.CreatorID]
+            self.ExecutionState = estate
 
             types = [exchange_offer_update.ExchangeOfferObject.ObjectTypeName,
                      sell_offer_update.SellOfferObject.ObjectTypeName]
-            obj = \
+            obj = dict(
                 market_place_object_update.MarketPlaceObject.get_valid_object(
-                    store, self.ObjectID, types)
+                    store, self.ObjectID, types))
             obj['execution-state'] = self.ExecutionState
 
             store[self.ObjectID] = obj
@@ -75,8 +75,8 @@ class IncentiveUpdate(transaction.Update):
                 "tokens".format(self._holding_id))
 
     def apply(self, store, txn):
-        obj = holding_update.HoldingObject.get_valid_object(store,
-                                                            self._holding_id)
+        obj = dict(holding_update.HoldingObject.get_valid_object(
+            store, self._holding_id))
         obj['count'] = int(obj['count']) + int(self._count)
 
         store[self._holding_id] = obj
@@ -371,6 +371,8 @@ class MarketPlaceTransaction(transaction.UpdatesTransaction):
     TransactionTypeName = '/MarketPlaceTransaction'
     TransactionStoreType = MarketPlaceGlobalStore
     MessageType = MarketPlaceTransactionMessage
+    # updates copy store values before modifying them
+    MutatesStoreValues = False
 
     UpdateRegistry = {
         account_update.Register.UpdateType: account_update.Register,
@@ -152,7 +152,7 @@ class UpdateDescription(transaction.Update):
                 "Description is longer than 255 characters")
 
     def apply(self, store, txn):
-        obj = store[txn.Identifier]
+        obj = dict(store[txn.Identifier])
         obj['description'] = self._description
         store[txn.Identifier] = obj
 
@@ -234,7 +234,7 @@ class UpdateName(transaction.Update):
     def apply(self, store, txn):
         # remove the existing name
 
-        obj = store[self._object_id]
+        obj = dict(store[self._object_id])
         del store[self._object_id]
         obj['name'] = self._name
         store[self._object_id] = obj
@@ -139,8 +139,8 @@ class PayFromHolding(Payment):
         return True
 
     def apply(self, store):
-        obj = holding_update.HoldingObject.get_valid_object(store,
-                                                            self.HoldingID)
+        obj = dict(holding_update.HoldingObject.get_valid_object(
+            store, self.HoldingID))
 
         obj['count'] = int(obj['count']) - int(self.Count)
         assert 0 <= obj['count']
@@ -19,6 +19,7 @@ This module defines the core gossip class for communication between nodes.
 import errno
 import logging
 import socket
+import struct
 import time
 
 from twisted.internet import reactor
@@ -28,12 +29,15 @@ from gossip import event_handler
 from gossip import message
 from gossip.message_dispatcher import MessageDispatcher
 from gossip import stats
+from gossip import timer_wheel
 from gossip.messages import connect_message
 from gossip.messages import gossip_debug
 from gossip.messages import random_walk_message
 from gossip.messages import shutdown_message
 from gossip.messages import topology_message
 from gossip.message_queue import MessageQueue
+from gossip import seen_set
+from gossip.signed_object import SignedObject
 
 logger = logging.getLogger(__name__)
 
@@ -52,7 +56,10 @@ class Gossip(object, DatagramProtocol):
     Attributes:
         ExpireMessageTime (int): Time in seconds to hold message to test
             for duplicates.
-        MaximumPacketSize (int): The maximum size of a packet.
+        MaximumPacketSize (int): The maximum size of a packet, larger
+            messages are sent in fragments to peers that support them.
+        MaximumFragmentRetries (int): The number of times a fragment is
+            retransmitted before the whole message is sent again.
         CleanupInterval (float): The number of seconds between cleanups.
         KeepAliveInterval (float): The number of seconds between keep
             alive messages.
@@ -62,17 +69,22 @@ class Gossip(object, DatagramProtocol):
         LocalNode (Node): The local node sending and receiving messages.
         NodeMap (dict): A map of peer nodes the local node is communicating
             with.
-        PendingAckMap (dict): A map of incoming messages that require
-            acknowledgement.
-        MessageHandledMap (dict): A map of handled messages where keys are
-            message identifiers and values are message expiration times.
+        PendingAckMap (dict): A map of outgoing packets that are waiting
+            for acknowledgement, keyed by sequence number.
+        RetransmitWheel (TimerWheel): The sequence numbers of the packets
+            in PendingAckMap by the time they are treated as dropped.
+        MessageHandledMap (SeenSet): The identifiers of handled messages,
+            kept until ExpireMessageTime seconds after they were handled.
+        ReassemblyBuffer (message.ReassemblyBuffer): Holds the fragments
+            of incoming messages until they are complete.
         SequenceNumber (int): The next sequence number to be used for
             messages from the local node.
         NextCleanup (float): The time of the next cleanup event.
         NextKeepAlive (float): The time of the next keep alive event.
         onNodeDisconnect (EventHandler): An EventHandler for functions
             to call when a node becomes disconnected.
-        IncomingMessageQueue (MessageQueue): The queue of incoming messages.
+        IncomingMessageQueue (MessageQueue): The queue of incoming messages,
+            with a lane for each message priority.
         ProcessIncomingMessages (bool): Whether or not to process incoming
             messages.
         Listener (Reactor.listenUDP): The UDP listener.
@@ -81,6 +93,7 @@ class Gossip(object, DatagramProtocol):
     # time in seconds to hold message to test for duplicates
     ExpireMessageTime = 300
     MaximumPacketSize = 8192 * 6 - 128
+    MaximumFragmentRetries = 5
     CleanupInterval = 1.00
     KeepAliveInterval = 10.0
 
@@ -88,7 +101,10 @@ class Gossip(object, DatagramProtocol):
                  node,
                  minimum_retries=None,
                  retry_interval=None,
-                 stat_domains=None):
+                 stat_domains=None,
+                 duplicate_cache_size=None,
+                 duplicate_bloom_filter=None,
+                 dispatch_lanes=None):
         """Constructor for the Gossip class.
 
         Args:
@@ -96,6 +112,15 @@ class Gossip(object, DatagramProtocol):
             MinimumRetries (int): The minimum number of retries on message
                 transmission.
             RetryInterval (float): The time between retries, in seconds.
+            stat_domains (dict): The map of statistics domains to which
+                the gossip statistics are added.
+            duplicate_cache_size (int): The maximum number of handled
+                message identifiers kept to suppress duplicates.
+            duplicate_bloom_filter (bool): Whether handled message
+                identifiers are kept in Bloom filters, which bounds their
+                memory but may rarely drop a message as a duplicate.
+            dispatch_lanes (dict): The 'Bound' and 'Policy' of lanes of
+                the incoming message queue, by lane name.
         """
         super(Gossip, self).__init__()
 
@@ -111,7 +136,11 @@ class Gossip(object, DatagramProtocol):
         self.NodeMap = {}
 
         self.PendingAckMap = {}
-        self.MessageHandledMap = {}
+        self.RetransmitWheel = timer_wheel.TimerWheel()
+        self.MessageHandledMap = seen_set.SeenSet(self.ExpireMessageTime,
+                                                  duplicate_cache_size,
+                                                  duplicate_bloom_filter)
+        self.ReassemblyBuffer = message.ReassemblyBuffer()
 
         self.SequenceNumber = 0
         self.NextCleanup = time.time() + self.CleanupInterval
@@ -135,7 +164,8 @@ class Gossip(object, DatagramProtocol):
         self.dispatcher.on_heartbeat += self._timer_cleanup
         self.dispatcher.on_heartbeat += self._keep_alive
 
-        self.IncomingMessageQueue = MessageQueue()
+        self.IncomingMessageQueue = MessageQueue(dispatch_lanes)
+        self._init_dispatcher_stats(stat_domains)
         try:
             self.ProcessIncomingMessages = True
             self.Listener = reactor.listenUDP(self.LocalNode.NetPort,
@@ -158,14 +188,51 @@ class Gossip(object, DatagramProtocol):
         self.PacketStats.add_metric(stats.Counter('DroppedPackets'))
         self.PacketStats.add_metric(stats.Counter('AcksReceived'))
         self.PacketStats.add_metric(stats.Counter('MessagesHandled'))
+        self.PacketStats.add_metric(stats.Average('MessagesPerDatagram'))
+        self.PacketStats.add_metric(stats.Counter('AcksSaved'))
+        self.PacketStats.add_metric(stats.Counter('FragmentsSent'))
+        self.PacketStats.add_metric(stats.Counter('FragmentsRetransmitted'))
+        self.PacketStats.add_metric(stats.Sample(
+            'ReassemblyBytes', lambda: self.ReassemblyBuffer.Size))
+        self.PacketStats.add_metric(stats.Sample(
+            'ReassemblyExpired', lambda: self.ReassemblyBuffer.Expired))
         self.PacketStats.add_metric(stats.Sample(
             'UnackedPacketCount', lambda: len(self.PendingAckMap)))
+        self.PacketStats.add_metric(stats.Sample(
+            'HandledMessageCount', lambda: len(self.MessageHandledMap)))
 
         self.MessageStats = stats.Stats(self.LocalNode.Name, 'message')
         self.MessageStats.add_metric(stats.MapCounter('MessageType'))
+
+        # the signature cache is shared by messages, transactions and
+        # blocks so its counters are sampled rather than kept per node
+        self.SignatureStats = stats.Stats(self.LocalNode.Name, 'signature')
+        self.SignatureStats.add_metric(stats.Sample(
+            'CacheHits', lambda: SignedObject.signature_cache.hits))
+        self.SignatureStats.add_metric(stats.Sample(
+            'CacheMisses', lambda: SignedObject.signature_cache.misses))
+        self.SignatureStats.add_metric(stats.Sample(
+            'CacheEvictions', lambda: SignedObject.signature_cache.evictions))
+        self.SignatureStats.add_metric(stats.Sample(
+            'CacheSize', lambda: len(SignedObject.signature_cache)))
         if stat_domains is not None:
             stat_domains['packet'] = self.PacketStats
             stat_domains['message'] = self.MessageStats
+            stat_domains['signature'] = self.SignatureStats
+
+    def _init_dispatcher_stats(self, stat_domains):
+        self.DispatcherStats = stats.Stats(self.LocalNode.Name, 'dispatcher')
+        for name in self.IncomingMessageQueue.Lanes:
+            lane = self.IncomingMessageQueue.lane(name)
+            prefix = name.capitalize()
+            self.DispatcherStats.add_metric(stats.Sample(
+                prefix + 'QueueDepth', lambda l=lane: len(l)))
+            self.DispatcherStats.add_metric(stats.Sample(
+                prefix + 'WaitTime', lambda l=lane: l.WaitTime))
+            self.DispatcherStats.add_metric(stats.Sample(
+                prefix + 'Dropped', lambda l=lane: l.Dropped))
+        if stat_domains is not None:
+            stat_domains['dispatcher'] = self.DispatcherStats
 
     def peer_list(self, allflag=False, exceptions=None):
         """Returns a list of peer nodes.
@@ -245,6 +312,15 @@ class Gossip(object, DatagramProtocol):
 
         self.PacketStats.BytesReceived.add_value(len(data))
 
+        kind = message.packet_type(data)
+        if kind == message.PacketType.bundle:
+            self._handle_bundle(data)
+            return
+
+        if kind == message.PacketType.bundle_ack:
+            self._handle_bundle_ack(data)
+            return
+
         # unpack the header
         try:
             packet = message.Packet()
@@ -259,10 +335,13 @@ class Gossip(object, DatagramProtocol):
         if srcpeer:
             srcpeer.reset_ticks()
 
-        # Handle incoming acknowledgements first, there is no data associated
-        # with an ack
+        # Handle incoming acknowledgements first, the only data associated
+        # with an ack is the packet format version of the sender
         if packet.IsAcknowledgement:
             if srcpeer:
+                if packet.Data:
+                    srcpeer.PacketVersion = min(ord(packet.Data[0]),
+                                                message.PacketVersion)
                 self._handle_ack(packet)
             return
 
@@ -274,12 +353,84 @@ class Gossip(object, DatagramProtocol):
             if srcpeer:
                 self._send_ack(packet, srcpeer)
 
+        # a fragment is handled once the message it belongs to is complete
+        if packet.IsFragment:
+            if srcpeer:
+                srcpeer.PacketVersion = message.PacketVersion
+            packet = self.ReassemblyBuffer.add_fragment(packet)
+            if packet is None:
+                return
+
+        self._handle_packet(packet, srcpeer)
+
+    def _handle_bundle(self, data):
+        """Handles a datagram carrying a bundle of packets.
+
+        Args:
+            data (str): the packed bundle
+        """
+        try:
+            bundle = message.PacketBundle()
+            bundle.unpack(data)
+        except:
+            logger.exception('failed to unpack message bundle')
+            return
+
+        # only a node that understands bundles sends them
+        srcpeer = self.NodeMap.get(bundle.SenderID)
+        if srcpeer:
+            srcpeer.reset_ticks()
+            srcpeer.PacketVersion = message.PacketVersion
+
+            ack = bundle.create_ack(self.LocalNode.Identifier)
+            if ack:
+                logger.debug("sending ack for %s to %s", bundle, srcpeer)
+                self._do_write(ack.pack(), srcpeer)
+                self.PacketStats.MessagesAcked.increment(
+                    len(ack.SequenceNumbers))
+                self.PacketStats.AcksSaved.increment(
+                    len(ack.SequenceNumbers) - 1)
+
+        for packet in bundle.Packets:
+            self._handle_packet(packet, srcpeer)
+
+    def _handle_bundle_ack(self, data):
+        """Handles a datagram acknowledging the packets of a bundle.
+
+        Args:
+            data (str): the packed acknowledgement
+        """
+        try:
+            ack = message.BundleAck()
+            ack.unpack(data)
+        except:
+            logger.exception('failed to unpack bundle acknowledgement')
+            return
+
+        srcpeer = self.NodeMap.get(ack.SenderID)
+        if not srcpeer:
+            return
+
+        srcpeer.reset_ticks()
+        for seqno in ack.SequenceNumbers:
+            packet = message.Packet()
+            packet.SequenceNumber = seqno
+            packet.SenderID = ack.SenderID
+            self._handle_ack(packet)
+
+    def _handle_packet(self, packet, srcpeer):
+        """Unpacks the message carried by a data packet and handles it.
+
+        Args:
+            packet (Packet): the packet carrying the message
+            srcpeer (Node): the peer that sent the packet, if it is known
+        """
         # now unpack the rest of the message
         try:
             minfo = message.unpack_message_data(packet.Data)
         except:
             logger.exception('unable to decode message with length %d',
-                             len(data))
+                             len(packet.Data))
             return
 
         # if we don't have a handler, thats ok we just dont do anything
@@ -357,10 +508,16 @@ class Gossip(object, DatagramProtocol):
                 len(msg))
             return False
 
+        # resolution happens in the background so that sends, including
+        # acks and keep alives, never wait on the resolver
+        address = peer.ResolvedAddress
+        if address is None:
+            logger.debug('address of %s is not resolved, dropping message',
+                         peer)
+            return False
+
         try:
-            host, port = peer.NetAddress
-            ip = socket.gethostbyname(host)
-            sentbytes = self.transport.write(msg, (ip, port))
+            sentbytes = self.transport.write(msg, address)
         except socket.error as serr:
             if serr.errno == errno.EWOULDBLOCK:
                 logger.error('outbound queue is full, dropping message to %s',
@@ -459,6 +616,7 @@ class Gossip(object, DatagramProtocol):
 
         self.PacketStats.AcksReceived.increment()
         del self.PendingAckMap[incomingpkt.SequenceNumber]
+        self.RetransmitWheel.cancel(incomingpkt.SequenceNumber)
 
     def _timer_transmit(self, now):
         """A periodic handler that iterates through the nodes and sends
@@ -467,31 +625,145 @@ class Gossip(object, DatagramProtocol):
         Args:
             now (float): Current time.
         """
-        srcnode = self.LocalNode
-
         dstnodes = self.peer_list(True)
+
+        # messages taken from a queue that did not fit in the bundle being
+        # built for their node, they start the next bundle for the node
+        carried = {}
+
         while len(dstnodes) > 0:
             newnodes = []
             for dstnode in dstnodes:
-                msg = dstnode.get_next_message(now)
-                if msg:
-                    if dstnode.is_peer or msg.IsSystemMessage:
-                        # basically we are looping through the nodes & as long
-                        # as there are messages pending then come back around &
-                        # try again
+                # basically we are looping through the nodes & as long as
+                # there are messages pending then come back around & try
+                # again
+                if dstnode.PacketVersion >= 2:
+                    if self._transmit_bundle(dstnode, now, carried):
                         newnodes.append(dstnode)
+                elif self._transmit_packet(dstnode, now):
+                    newnodes.append(dstnode)
 
-                        packet = message.Packet()
-                        packet.add_message(msg, srcnode, dstnode,
-                                           self.next_sequence_number())
-                        packet.TransmitTime = now
+            dstnodes = newnodes
 
-                        if packet.IsReliable:
-                            self.PendingAckMap[packet.SequenceNumber] = packet
+    def _create_packet(self, msg, dstnode, now):
+        """Builds the packet for a message and, if it needs reliable
+        delivery, records it as waiting for an acknowledgement.
+        """
+        packet = message.Packet()
+        packet.add_message(msg, self.LocalNode, dstnode,
+                           self.next_sequence_number())
+        packet.TransmitTime = now
 
-                        self._do_write(packet.pack(), dstnode)
+        if packet.IsReliable:
+            self._await_ack(packet)
 
-            dstnodes = newnodes
+        return packet
+
+    def _await_ack(self, packet):
+        """Records a reliable packet as waiting for an acknowledgement
+        until its round trip estimate has passed.
+        """
+        self.PendingAckMap[packet.SequenceNumber] = packet
+        self.RetransmitWheel.schedule(
+            packet.SequenceNumber,
+            packet.TransmitTime + packet.RoundTripEstimate)
+
+    def _transmit_packet(self, dstnode, now):
+        """Sends the next message queued for a node in its own packet.
+
+        Args:
+            dstnode (Node): The node to send to.
+            now (float): Current time.
+
+        Returns:
+            bool: Whether a message was sent.
+        """
+        msg = dstnode.get_next_message(now)
+        if not msg or not (dstnode.is_peer or msg.IsSystemMessage):
+            return False
+
+        packet = self._create_packet(msg, dstnode, now)
+        self._do_write(packet.pack(), dstnode)
+        self.PacketStats.MessagesPerDatagram.add_value(1)
+        return True
+
+    def _transmit_bundle(self, dstnode, now, carried):
+        """Sends as many of the messages queued for a node as fit in a
+        single datagram.
+
+        Args:
+            dstnode (Node): The node to send to.
+            now (float): Current time.
+            carried (dict): Messages that start the next bundle for a
+                node, keyed by node identifier.
+
+        Returns:
+            bool: Whether a message was sent.
+        """
+        bundle = message.PacketBundle(self.LocalNode.Identifier)
+        fragmented = False
+
+        msg = carried.pop(dstnode.Identifier, None) or \
+            dstnode.get_next_message(now)
+        while msg and (dstnode.is_peer or msg.IsSystemMessage):
+            data = repr(msg)
+            if struct.calcsize(message.Packet.PackedFormat) + len(data) > \
+                    self.MaximumPacketSize:
+                self._transmit_fragments(msg, dstnode, now)
+                fragmented = True
+            elif bundle.Packets and \
+                    bundle.size_with(data) > self.MaximumPacketSize:
+                carried[dstnode.Identifier] = msg
+                break
+            else:
+                bundle.add_packet(self._create_packet(msg, dstnode, now))
+
+            msg = dstnode.get_next_message(now)
+
+        if not bundle.Packets:
+            return fragmented
+
+        # a lone message goes out in the version 1 format, it is smaller
+        if len(bundle.Packets) == 1:
+            self._do_write(bundle.Packets[0].pack(), dstnode)
+        else:
+            self._do_write(bundle.pack(), dstnode)
+
+        self.PacketStats.MessagesPerDatagram.add_value(len(bundle.Packets))
+        return True
+
+    def _transmit_fragments(self, msg, dstnode, now):
+        """Sends a message that does not fit in a datagram as a series of
+        fragments, each with its own sequence number so that it is
+        acknowledged and retransmitted on its own.
+
+        Args:
+            msg (Message): The message to send.
+            dstnode (Node): The node to send to.
+            now (float): Current time.
+        """
+        packet = message.Packet()
+        packet.add_message(msg, self.LocalNode, dstnode,
+                           self.next_sequence_number())
+        packet.TransmitTime = now
+
+        try:
+            fragments = packet.fragment(self.MaximumPacketSize)
+        except ValueError:
+            logger.exception('unable to send message %s to %s', msg, dstnode)
+            return
+
+        logger.debug('send message %s to %s in %d fragments', msg, dstnode,
+                     len(fragments))
+
+        for fragment in fragments:
+            fragment.SequenceNumber = self.next_sequence_number()
+            if fragment.IsReliable:
+                self._await_ack(fragment)
+
+            self._do_write(fragment.pack(), dstnode)
+
+        self.PacketStats.FragmentsSent.increment(len(fragments))
 
     def _timer_cleanup(self, now):
         """A periodic handler that performs a variety of cleanup operations
@@ -509,17 +781,45 @@ class Gossip(object, DatagramProtocol):
 
         self.NextCleanup = now + self.CleanupInterval
 
-        # Process packet retransmission
-        deleteq = []
-        for seqno, packet in self.PendingAckMap.iteritems():
-            if (packet.TransmitTime + packet.RoundTripEstimate) < now:
-                deleteq.append((seqno, packet))
+        # Process packet retransmission, the wheel returns the packets whose
+        # round trip estimate has passed without scanning the others
+        for seqno in self.RetransmitWheel.expire(now):
+            # the entry may be gone if another fragment of the same
+            # message gave up on it
+            packet = self.PendingAckMap.get(seqno)
+            if packet is None:
+                continue
+
+            # fragments are resent on their own, rather than resending
+            # the whole message, until they run out of retries
+            dstnode = self.NodeMap.get(packet.DestinationID)
+            if packet.IsFragment and dstnode and \
+                    packet.Retries < self.MaximumFragmentRetries:
+                logger.debug('retransmit fragment %d', seqno)
+                packet.Retries += 1
+                packet.TransmitTime = now
+                packet.RoundTripEstimate = min(
+                    2.0 * packet.RoundTripEstimate,
+                    dstnode.Estimator.MaximumRTO)
+                self._await_ack(packet)
+                self._do_write(packet.pack(), dstnode)
+                self.PacketStats.FragmentsRetransmitted.increment()
+                continue
 
-        for (seqno, packet) in deleteq:
             logger.debug('packet %d has been marked as dropped', seqno)
 
             self.PacketStats.DroppedPackets.increment()
 
+            # the message will be sent again in full so forget about the
+            # other fragments of it
+            if packet.IsFragment:
+                for otherseqno, other in self.PendingAckMap.items():
+                    if other.IsFragment and \
+                            other.FragmentID == packet.FragmentID and \
+                            otherseqno != seqno:
+                        del self.PendingAckMap[otherseqno]
+                        self.RetransmitWheel.cancel(otherseqno)
+
             # inform the node that we are treating the packet as though
             # it has been dropped, the node may have already closed the
             # connection so check that here
@@ -530,18 +830,11 @@ class Gossip(object, DatagramProtocol):
             # and remove it from our saved queue
             del self.PendingAckMap[seqno]
 
-        # Clean up information about old messages handled, this is a hack to
-        # reduce memory utilization and does create an opportunity for spurious
-        # duplicate messages to be processed. Should be fixed for production
-        # use
-        deleteq = []
-        for msgid in self.MessageHandledMap.keys():
-            exptime = self.MessageHandledMap[msgid]
-            if exptime < now:
-                deleteq.append(msgid)
+        # forget the messages handled long enough ago that duplicates of
+        # them are no longer expected, whole generations at a time
+        self.MessageHandledMap.expire(now)
 
-        for msgid in deleteq:
-            del self.MessageHandledMap[msgid]
+        self.ReassemblyBuffer.expire(now)
 
     def _keep_alive(self, now):
         """A periodic handler that sends a keep alive message to all peers.
@@ -667,14 +960,20 @@ class Gossip(object, DatagramProtocol):
         logger.debug('calling handler for message %s from %s of type %s',
                      msg.Identifier[:8], msg.SenderID[:8], msg.MessageType)
 
+        # a message dropped because its lane is full is not recorded as
+        # handled, so a later copy of it from any peer is accepted
+        if not self.IncomingMessageQueue.appendleft(msg):
+            return False
+
         self.MessageHandledMap[msg.Identifier] = \
             time.time() + self.ExpireMessageTime
-        self.IncomingMessageQueue.appendleft(msg)
 
         # and now forward it on to the peers if it is marked for forwarding
         if msg.IsForward and msg.TimeToLive > 0:
             self._send_msg(msg, self.peer_id_list(exceptions=[msg.SenderID]))
 
+        return True
+
     def broadcast_message(self, msg, initialize=True):
         """
         Send an encoded message through the peers to the entire network
@@ -682,6 +981,10 @@ class Gossip(object, DatagramProtocol):
 
         Args:
             msg (message.Message): The message to handle.
+
+        Returns:
+            bool: False if the message was dropped because its lane of
+                the incoming queue is full.
         """
         # mark the message as handled
 
@@ -689,7 +992,7 @@ class Gossip(object, DatagramProtocol):
             msg.SenderID = self.LocalNode.Identifier
             msg.sign_from_node(self.LocalNode)
 
-        self._handle_message(msg)
+        return self._handle_message(msg)
 
     def node_id_to_name(self, node_id):
         if node_id in self.NodeMap:
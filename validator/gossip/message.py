@@ -27,6 +27,38 @@ from gossip.signed_object import SignedObject
 
 logger = logging.getLogger(__name__)
 
+# the packet format version implemented by this module, version 1 carries
+# a single message per datagram and version 2 adds message bundles and
+# fragments
+PacketVersion = 2
+
+
+class PacketType(object):
+    """The kinds of datagram, carried in the acknowledgement flag byte of
+    the packet header. Version 1 nodes only understand data and ack.
+    """
+    data = 0
+    ack = 1
+    bundle = 2
+    bundle_ack = 3
+    fragment = 4
+
+
+def packet_type(databuf):
+    """Returns the kind of a packed datagram without unpacking it.
+
+    Args:
+        databuf (bytes): A packed Packet, PacketBundle or BundleAck.
+
+    Returns:
+        int: One of the PacketType values, or None if the datagram is
+            too short to carry a header.
+    """
+    offset = struct.calcsize('!LL')
+    if len(databuf) <= offset:
+        return None
+    return ord(databuf[offset])
+
 
 class Packet(object):
     """The Packet class manages the data that goes onto and comes off of
@@ -52,9 +84,19 @@ class Packet(object):
         DestinationID (str): The identifier for the node that is
             intended to receive this packet.
         Identifier (str): The message identifier.
+        FragmentID (int): For a fragment, the sequence number of the
+            packet it was split from.
+        FragmentIndex (int): For a fragment, its position in the packet
+            it was split from.
+        FragmentCount (int): For a fragment, the number of fragments the
+            packet was split into, zero for packets that are not
+            fragments.
+        Retries (int): The number of times the packet has been
+            retransmitted.
     """
 
     PackedFormat = '!LL??36s'
+    FragmentPackedFormat = '!LLBB36sLHH'
 
     def __init__(self):
         """Constructor for the Packet class.
@@ -73,10 +115,61 @@ class Packet(object):
         self.RoundTripEstimate = 0.0
         self.DestinationID = '========================'
         self.Identifier = None
+        self.Retries = 0
+
+        self.FragmentID = 0
+        self.FragmentIndex = 0
+        self.FragmentCount = 0
 
     def __str__(self):
         return "PKT:{0}:{1}".format(self.SenderID[:8], self.SequenceNumber)
 
+    @property
+    def IsFragment(self):
+        """Returns whether the packet carries a fragment of a larger
+        packet.
+        """
+        return self.FragmentCount > 0
+
+    def fragment(self, maxsize):
+        """Splits the packet into fragments which each pack into at most
+        maxsize bytes. The fragments share the bookkeeping properties of
+        the packet and are identified by its sequence number, each needs
+        its own sequence number before it is sent.
+
+        Args:
+            maxsize (int): The maximum size of a packed fragment.
+
+        Returns:
+            list: The fragments, as Packet objects.
+        """
+        chunk = maxsize - struct.calcsize(self.FragmentPackedFormat)
+        count = max(1, (len(self.Data) + chunk - 1) // chunk)
+        if count > 0xffff:
+            raise ValueError('packet too large to fragment, {0} bytes'.format(
+                len(self.Data)))
+
+        fragments = []
+        for index in xrange(count):
+            packet = Packet()
+            packet.TimeToLive = self.TimeToLive
+            packet.IsReliable = self.IsReliable
+            packet.SenderID = self.SenderID
+            packet.Message = self.Message
+            packet.Data = self.Data[index * chunk:(index + 1) * chunk]
+
+            packet.TransmitTime = self.TransmitTime
+            packet.RoundTripEstimate = self.RoundTripEstimate
+            packet.DestinationID = self.DestinationID
+            packet.Identifier = self.Identifier
+
+            packet.FragmentID = self.SequenceNumber
+            packet.FragmentIndex = index
+            packet.FragmentCount = count
+            fragments.append(packet)
+
+        return fragments
+
     def create_ack(self, sender):
         """Creates a new Packet instance with IsAcknowledgement == True
         and a sequence number which matches this Packet.
@@ -95,7 +188,9 @@ class Packet(object):
         packet.IsReliable = False
         packet.SenderID = sender
 
-        packet.Data = ''
+        # version 1 nodes ignore the data of an ack so it is used to tell
+        # the sender which packet format version this node understands
+        packet.Data = chr(PacketVersion)
 
         return packet
 
@@ -129,10 +224,19 @@ class Packet(object):
             databuf (bytes): A packed object with a header conforming
                 to PackedFormat.
         """
-        size = struct.calcsize(self.PackedFormat)
-
-        (ttl, seqno, aflag, rflag, senderid) = struct.unpack(self.PackedFormat,
-                                                             databuf[:size])
+        if packet_type(databuf) == PacketType.fragment:
+            size = struct.calcsize(self.FragmentPackedFormat)
+            (ttl, seqno, _, rflag, senderid, fragid, index, count) = \
+                struct.unpack(self.FragmentPackedFormat, databuf[:size])
+            aflag = False
+
+            self.FragmentID = fragid
+            self.FragmentIndex = index
+            self.FragmentCount = count
+        else:
+            size = struct.calcsize(self.PackedFormat)
+            (ttl, seqno, aflag, rflag, senderid) = struct.unpack(
+                self.PackedFormat, databuf[:size])
 
         self.TimeToLive = ttl
         self.SequenceNumber = int(seqno)
@@ -148,8 +252,16 @@ class Packet(object):
 
         Returns:
             bytes: A packed object with a header conforming to
-                PackedFormat.
+                PackedFormat, or FragmentPackedFormat for a fragment.
         """
+        if self.IsFragment:
+            header = struct.pack(self.FragmentPackedFormat, self.TimeToLive,
+                                 self.SequenceNumber, PacketType.fragment,
+                                 self.IsReliable, str(self.SenderID),
+                                 self.FragmentID, self.FragmentIndex,
+                                 self.FragmentCount)
+            return header + self.Data
+
         header = struct.pack(self.PackedFormat, self.TimeToLive,
                              self.SequenceNumber, self.IsAcknowledgement,
                              self.IsReliable, str(self.SenderID))
@@ -157,6 +269,319 @@ class Packet(object):
         return header + self.Data
 
 
+class PacketBundle(object):
+    """The PacketBundle class packs the data of several packets for the
+    same peer into a single datagram. Each packet keeps its own sequence
+    number, time to live and reliability flag.
+
+    Attributes:
+        PackedFormat (str): A struct packed format string representing
+            the packed structure of the header, it has the same layout
+            as the Packet header.
+        EntryFormat (str): A struct packed format string representing
+            the packed structure that precedes the data of each packet.
+        SenderID (str): The identifier for the node that sent the bundle.
+        Packets (list): The packets in the bundle.
+    """
+
+    PackedFormat = '!LLBB36s'
+    EntryFormat = '!LLL?'
+
+    def __init__(self, sender=None):
+        """Constructor for the PacketBundle class.
+
+        Args:
+            sender (str): The identifier for the sending node.
+        """
+        self.SenderID = sender or '========================'
+        self.Packets = []
+        self._size = struct.calcsize(self.PackedFormat)
+
+    def __str__(self):
+        return "BDL:{0}:{1}".format(self.SenderID[:8], len(self.Packets))
+
+    def __len__(self):
+        return self._size
+
+    def size_with(self, data):
+        """Returns the size of the packed bundle if a packet with the
+        given data were added to it.
+
+        Args:
+            data (bytes): The data of the packet that would be added.
+
+        Returns:
+            int: The packed size of the bundle.
+        """
+        return self._size + struct.calcsize(self.EntryFormat) + len(data)
+
+    def add_packet(self, packet):
+        """Adds a packet to the bundle.
+
+        Args:
+            packet (Packet): The packet to add, its SenderID must be the
+                SenderID of the bundle.
+        """
+        self._size = self.size_with(packet.Data)
+        self.Packets.append(packet)
+
+    def unpack(self, databuf):
+        """Resets the bundle with the contents of a packed object.
+
+        Args:
+            databuf (bytes): A packed object with a header conforming
+                to PackedFormat.
+        """
+        offset = struct.calcsize(self.PackedFormat)
+        (count, _, _, _, senderid) = struct.unpack(self.PackedFormat,
+                                                   databuf[:offset])
+        self.SenderID = senderid.rstrip('\0')
+        self.Packets = []
+
+        entrysize = struct.calcsize(self.EntryFormat)
+        for _ in xrange(count):
+            (seqno, ttl, length, rflag) = struct.unpack(
+                self.EntryFormat, databuf[offset:offset + entrysize])
+            offset += entrysize
+
+            packet = Packet()
+            packet.TimeToLive = ttl
+            packet.SequenceNumber = int(seqno)
+            packet.IsReliable = rflag
+            packet.SenderID = self.SenderID
+            packet.Data = databuf[offset:offset + length]
+            offset += length
+
+            if len(packet.Data) != length:
+                raise ValueError('truncated packet bundle')
+            self.Packets.append(packet)
+
+        self._size = offset
+
+    def pack(self):
+        """Builds a packed object with a header conforming to PackedFormat
+        followed by each packet.
+
+        Returns:
+            bytes: A packed object with a header conforming to
+                PackedFormat.
+        """
+        parts = [struct.pack(self.PackedFormat, len(self.Packets), 0,
+                             PacketType.bundle, 0, str(self.SenderID))]
+        for packet in self.Packets:
+            parts.append(struct.pack(self.EntryFormat,
+                                     packet.SequenceNumber,
+                                     packet.TimeToLive,
+                                     len(packet.Data),
+                                     packet.IsReliable))
+            parts.append(packet.Data)
+
+        return ''.join(parts)
+
+    def create_ack(self, sender):
+        """Creates a BundleAck for the reliable packets in the bundle.
+
+        Args:
+            sender (str): An identifier for the sending node.
+
+        Returns:
+            BundleAck: The acknowledgement, or None if no packet in the
+                bundle uses reliable delivery.
+        """
+        seqnos = [p.SequenceNumber for p in self.Packets if p.IsReliable]
+        if not seqnos:
+            return None
+
+        return BundleAck(sender, seqnos)
+
+
+class BundleAck(object):
+    """The BundleAck class acknowledges the reliable packets of a bundle in
+    a single datagram. The sequence numbers are sent as the lowest sequence
+    number and a bitmap of the sequence numbers following it.
+
+    Attributes:
+        PackedFormat (str): A struct packed format string representing
+            the packed structure of the header, it has the same layout
+            as the Packet header.
+        SenderID (str): The identifier for the node that sent the ack.
+        SequenceNumbers (list): The sequence numbers acknowledged.
+    """
+
+    PackedFormat = '!LLBB36s'
+
+    def __init__(self, sender=None, seqnos=None):
+        """Constructor for the BundleAck class.
+
+        Args:
+            sender (str): The identifier for the sending node.
+            seqnos (list): The sequence numbers to acknowledge.
+        """
+        self.SenderID = sender or '========================'
+        self.SequenceNumbers = sorted(set(seqnos or []))
+
+    def __str__(self):
+        return "ACK:{0}:{1}".format(self.SenderID[:8],
+                                    len(self.SequenceNumbers))
+
+    def unpack(self, databuf):
+        """Resets the ack with the contents of a packed object.
+
+        Args:
+            databuf (bytes): A packed object with a header conforming
+                to PackedFormat.
+        """
+        size = struct.calcsize(self.PackedFormat)
+        (count, base, _, _, senderid) = struct.unpack(self.PackedFormat,
+                                                      databuf[:size])
+        self.SenderID = senderid.rstrip('\0')
+
+        bitmap = bytearray(databuf[size:])
+        self.SequenceNumbers = [base + i for i in xrange(len(bitmap) * 8)
+                                if bitmap[i // 8] & (1 << (i % 8))]
+        if len(self.SequenceNumbers) != count:
+            raise ValueError('malformed bundle acknowledgement')
+
+    def pack(self):
+        """Builds a packed object with a header conforming to PackedFormat
+        followed by the bitmap of acknowledged sequence numbers.
+
+        Returns:
+            bytes: A packed object with a header conforming to
+                PackedFormat.
+        """
+        base = self.SequenceNumbers[0] if self.SequenceNumbers else 0
+        bitmap = bytearray(
+            (self.SequenceNumbers[-1] - base) // 8 + 1
+            if self.SequenceNumbers else 0)
+        for seqno in self.SequenceNumbers:
+            bitmap[(seqno - base) // 8] |= 1 << ((seqno - base) % 8)
+
+        header = struct.pack(self.PackedFormat, len(self.SequenceNumbers),
+                             base, PacketType.bundle_ack, 0,
+                             str(self.SenderID))
+        return header + str(bitmap)
+
+
+class ReassemblyBuffer(object):
+    """The ReassemblyBuffer class collects the fragments of packets until
+    all of the fragments of a packet have arrived. The buffer holds at
+    most MaximumSize bytes of fragments, and the fragments of a packet
+    that is not complete within Timeout seconds are discarded.
+
+    Attributes:
+        MaximumSize (int): The maximum number of bytes held.
+        Timeout (float): The number of seconds to wait for the remaining
+            fragments of a packet.
+        Size (int): The number of bytes held.
+        Expired (int): The number of incomplete packets discarded.
+    """
+
+    MaximumSize = 32 * 1024 * 1024
+    Timeout = 30.0
+
+    def __init__(self, maxsize=None, timeout=None):
+        """Constructor for the ReassemblyBuffer class.
+
+        Args:
+            maxsize (int): The maximum number of bytes held.
+            timeout (float): The number of seconds to wait for the
+                remaining fragments of a packet.
+        """
+        if maxsize is not None:
+            self.MaximumSize = maxsize
+        if timeout is not None:
+            self.Timeout = timeout
+
+        self.Size = 0
+        self.Expired = 0
+
+        # (senderid, fragmentid) --> [expiration, {index: packet}]
+        self._pending = {}
+
+        # (senderid, fragmentid) --> expiration, for packets already
+        # reassembled so that retransmitted fragments are ignored
+        self._completed = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add_fragment(self, packet, now=None):
+        """Adds a fragment to the buffer.
+
+        Args:
+            packet (Packet): The fragment.
+            now (float): The current time.
+
+        Returns:
+            Packet: The reassembled packet if the fragment completes it,
+                otherwise None.
+        """
+        now = time.time() if now is None else now
+        key = (packet.SenderID, packet.FragmentID)
+        if key in self._completed:
+            return None
+
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = [now + self.Timeout, {}]
+            self._pending[key] = entry
+
+        fragments = entry[1]
+        if packet.FragmentIndex in fragments or \
+                packet.FragmentIndex >= packet.FragmentCount:
+            return None
+
+        # make room by discarding the incomplete packets that would
+        # expire first, the new fragment is dropped if it cannot fit
+        while self.Size + len(packet.Data) > self.MaximumSize:
+            victim = min(self._pending, key=lambda k: self._pending[k][0])
+            if victim == key:
+                if not fragments:
+                    del self._pending[key]
+                return None
+            self._discard(victim)
+
+        fragments[packet.FragmentIndex] = packet
+        self.Size += len(packet.Data)
+        if len(fragments) < packet.FragmentCount:
+            return None
+
+        self._discard(key, expired=False)
+        self._completed[key] = now + self.Timeout
+
+        result = Packet()
+        result.TimeToLive = packet.TimeToLive
+        result.SequenceNumber = packet.FragmentID
+        result.IsReliable = packet.IsReliable
+        result.SenderID = packet.SenderID
+        result.Data = ''.join(fragments[i].Data
+                              for i in xrange(packet.FragmentCount))
+        return result
+
+    def expire(self, now=None):
+        """Discards the fragments of packets that were not completed in
+        time.
+
+        Args:
+            now (float): The current time.
+        """
+        now = time.time() if now is None else now
+        for key in [k for k, e in self._pending.iteritems() if e[0] < now]:
+            self._discard(key)
+
+        for key in [k for k, e in self._completed.iteritems() if e < now]:
+            del self._completed[key]
+
+    def _discard(self, key, expired=True):
+        _, fragments = self._pending.pop(key)
+        self.Size -= sum(len(p.Data) for p in fragments.itervalues())
+        if expired:
+            logger.debug('discard %d fragments of packet %s from %s',
+                         len(fragments), key[1], key[0][:8])
+            self.Expired += 1
+
+
 def unpack_message_data(data):
     """Unpacks CBOR encoded data into a dict.
 
@@ -190,9 +615,13 @@ class Message(SignedObject):
         IsReliable (bool): Whether reliable delivery is required.
         TimeToLive (int): The configured number of hops that the message
             is considered alive.
+        DispatchLane (str): The lane of the incoming message queue the
+            message waits in, see gossip.message_queue. When None, system
+            messages use the system lane and others the default lane.
     """
     MessageType = "/gossip.Message/MessageBase"
     DefaultTimeToLive = 2 ** 31
+    DispatchLane = None
 
     def __init__(self, minfo=None):
         """Constructor for the Message class.
@@ -13,39 +13,197 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 import copy
+import logging
+import time
 
 from collections import deque
+from collections import OrderedDict
 from threading import Condition
 
+logger = logging.getLogger(__name__)
+
+
+class MessageLane(object):
+    """A lane of the message queue, holding the messages of one priority.
+
+    Attributes:
+        Name (str): The name of the lane.
+        Bound (int): The maximum number of messages held, 0 for no bound.
+        Policy (str): What happens to a message that arrives when the
+            lane is full, 'drop-newest' drops the arriving message and
+            'drop-oldest' drops the message that has waited longest.
+        Dropped (int): The number of messages dropped.
+        Messages (deque): The (time queued, message) pairs waiting, the
+            oldest at the right.
+        WaitTime (float): A moving average of the number of seconds
+            messages wait in the lane.
+        WaitSmoothing (float): The weight of each new wait in WaitTime.
+    """
+
+    Policies = ('drop-newest', 'drop-oldest')
+    WaitSmoothing = 0.1
+
+    def __init__(self, name, bound=0, policy='drop-newest'):
+        if policy not in self.Policies:
+            raise ValueError('unknown lane policy {0}'.format(policy))
+
+        self.Name = name
+        self.Bound = bound
+        self.Policy = policy
+        self.Dropped = 0
+        self.Messages = deque()
+
+        self.WaitTime = 0.0
+
+    def __len__(self):
+        return len(self.Messages)
+
+    @property
+    def IsFull(self):
+        """Returns whether the lane holds as many messages as it may.
+        """
+        return self.Bound > 0 and len(self.Messages) >= self.Bound
+
+    def record_wait(self, wait):
+        """Folds the time a message waited in the lane into WaitTime.
+
+        Args:
+            wait (float): The number of seconds the message waited.
+        """
+        self.WaitTime += self.WaitSmoothing * (wait - self.WaitTime)
+
 
 class MessageQueue(object):
-    """The message queue used internally by Gossip."""
+    """The message queue used internally by Gossip.
+
+    Messages are held in lanes which are served in priority order, so a
+    flood of transactions does not delay blocks or consensus messages
+    queued behind it. Within a lane messages are served in the order they
+    arrived. A lane may be bounded, see MessageLane.
+
+    Attributes:
+        Lanes (list): The names of the lanes, highest priority first.
+    """
+
+    Lanes = ['system', 'consensus', 'block', 'transfer', 'default',
+             'transaction']
+
+    def __init__(self, lanes=None):
+        """Constructor for the MessageQueue class.
 
-    def __init__(self):
-        self._queue = deque()
+        Args:
+            lanes (dict): Maps lane names to dicts with the 'Bound' and
+                'Policy' of the lane, lanes not listed are unbounded.
+        """
+        lanes = lanes or {}
+        for name in lanes:
+            if name not in self.Lanes:
+                raise ValueError('unknown message lane {0}'.format(name))
+
+        self._lanes = OrderedDict()
+        for name in self.Lanes:
+            config = lanes.get(name, {})
+            self._lanes[name] = MessageLane(
+                name,
+                config.get('Bound', 0),
+                config.get('Policy', 'drop-newest'))
+
+        self._count = 0
         self._condition = Condition()
 
+    def lane_of(self, msg):
+        """Returns the name of the lane a message is queued in.
+
+        Args:
+            msg (Message): The message, None is used to wake the consumer
+                and goes in the system lane.
+
+        Returns:
+            str: The lane name.
+        """
+        if msg is None:
+            return 'system'
+
+        lane = getattr(msg, 'DispatchLane', None)
+        if lane in self._lanes:
+            return lane
+        return 'system' if msg.IsSystemMessage else 'default'
+
+    def lane(self, name):
+        """Returns a lane of the queue.
+
+        Args:
+            name (str): The lane name.
+
+        Returns:
+            MessageLane: The lane.
+        """
+        return self._lanes[name]
+
+    def is_full(self, name):
+        """Returns whether a lane holds as many messages as it may.
+
+        Args:
+            name (str): The lane name.
+        """
+        return self._lanes[name].IsFull
+
     def pop(self):
         self._condition.acquire()
         try:
-            while len(self._queue) < 1:
+            while self._count < 1:
                 self._condition.wait()
-            return self._queue.pop()
+
+            for lane in self._lanes.itervalues():
+                if lane.Messages:
+                    (queued, msg) = lane.Messages.pop()
+                    lane.record_wait(time.time() - queued)
+                    self._count -= 1
+                    return msg
         finally:
             self._condition.release()
 
     def __len__(self):
-        return len(self._queue)
+        return self._count
 
     def __deepcopy__(self, memo):
         newmq = MessageQueue()
-        newmq._queue = copy.deepcopy(self._queue, memo)
+        for name, lane in self._lanes.iteritems():
+            newlane = newmq._lanes[name]
+            newlane.Bound = lane.Bound
+            newlane.Policy = lane.Policy
+            newlane.Messages = copy.deepcopy(lane.Messages, memo)
+        newmq._count = self._count
         return newmq
 
     def appendleft(self, msg):
+        """Queues a message in its lane.
+
+        Args:
+            msg (Message): The message.
+
+        Returns:
+            bool: Whether the message was queued, False if it was dropped
+                because its lane is full.
+        """
         self._condition.acquire()
         try:
-            self._queue.appendleft(msg)
+            lane = self._lanes[self.lane_of(msg)]
+            if msg is not None and lane.IsFull:
+                lane.Dropped += 1
+                if lane.Policy == 'drop-newest':
+                    logger.debug('%s lane is full, drop message %s',
+                                 lane.Name, msg)
+                    return False
+
+                (_, oldest) = lane.Messages.pop()
+                logger.debug('%s lane is full, drop message %s',
+                             lane.Name, oldest)
+                self._count -= 1
+
+            lane.Messages.appendleft((time.time(), msg))
+            self._count += 1
             self._condition.notify()
+            return True
         finally:
             self._condition.release()
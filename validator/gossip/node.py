@@ -20,6 +20,8 @@ by the Node implementation.
 
 import logging
 import random
+import socket
+import threading
 import time
 from threading import Lock
 
@@ -33,6 +35,17 @@ from gossip import token_bucket
 logger = logging.getLogger(__name__)
 
 
+def _is_ip_address(host):
+    """Returns True if a host is an IP address rather than a name."""
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            socket.inet_pton(family, host)
+            return True
+        except (socket.error, TypeError, ValueError):
+            pass
+    return False
+
+
 class Node(object):
     """The Node class represents network peers in the gossip protocol.
 
@@ -63,8 +76,19 @@ class Node(object):
             the uniform random value of FixedRandomDelay.
         DistributionLambda (float): the lambda value provided to the
             exponential random function if UsedFixedDelay is false.
+        PacketVersion (int): the packet format version the node is known
+            to understand, learned from the acknowledgements it sends.
+        ResolutionFailures (int): the number of failed attempts to
+            resolve the host name of the node.
+        AddressTTL (float): the number of seconds a resolved address is
+            used before it is resolved again.
+        ResolutionRetryInterval (float): the number of seconds to wait
+            before retrying a failed resolution.
 
     """
+    AddressTTL = 300.0
+    ResolutionRetryInterval = 10.0
+
     UseFixedDelay = True
     DelayRange = [0.1, 0.4]
     DistributionLambda = 10.0
@@ -120,6 +144,25 @@ class Node(object):
         self.Stats = None
 
         self.MissedTicks = 0
+        self.PacketVersion = 1
+
+        # the address most recently resolved for _resolved_host, replaced
+        # in the background once it is older than AddressTTL. an IP
+        # address is used as given, a host name is first resolved in the
+        # background so that creating a node never waits on the resolver
+        self._address_lock = Lock()
+        self._address = None
+        self._resolved_host = None
+        self._next_resolution = 0
+        self._resolving = False
+        self.ResolutionFailures = 0
+
+        if _is_ip_address(self.NetHost):
+            self._address = self._resolved_host = self.NetHost
+            self._next_resolution = float('inf')
+        elif self.NetHost is not None:
+            with self._address_lock:
+                self._refresh_address()
 
     @property
     def NetAddress(self):
@@ -128,6 +171,70 @@ class Node(object):
         """
         return (self.NetHost, self.NetPort)
 
+    @property
+    def ResolvedAddress(self):
+        """Returns an ordered pair containing the IP address and port number
+        of the node without waiting for the host name to be resolved. A
+        stale address is refreshed in the background.
+
+        Returns:
+            ordered pair of str, int: the address, or None if the host name
+                has not been resolved.
+        """
+        with self._address_lock:
+            host = self.NetHost
+            current = host == self._resolved_host
+            if not current or time.time() >= self._next_resolution:
+                self._refresh_address()
+
+            if not current or self._address is None:
+                return None
+            return (self._address, self.NetPort)
+
+    def resolve_address(self):
+        """Resolves the host name of the node, waiting for the result.
+
+        Returns:
+            str: the IP address of the node, or None if resolution failed.
+        """
+        host = self.NetHost
+        try:
+            address = socket.gethostbyname(host)
+        except (socket.error, TypeError) as e:
+            logger.warn('unable to resolve address %s of node %s; %s',
+                        host, self, e)
+            address = None
+
+        with self._address_lock:
+            if address is None:
+                self.ResolutionFailures += 1
+                self._next_resolution = \
+                    time.time() + self.ResolutionRetryInterval
+                # keep using the last address of the same host
+                if host != self._resolved_host:
+                    self._address = None
+            else:
+                self._next_resolution = time.time() + self.AddressTTL
+                self._address = address
+
+            self._resolved_host = host
+            self._resolving = False
+
+        return address
+
+    def _refresh_address(self):
+        """Starts resolving the host name in the background unless that is
+        already underway, the caller holds _address_lock.
+        """
+        if self._resolving:
+            return
+
+        self._resolving = True
+        thread = threading.Thread(target=self.resolve_address,
+                                  name='resolve-{0}'.format(self.Name))
+        thread.daemon = True
+        thread.start()
+
     @property
     def endpoint_host(self):
         """
@@ -185,6 +292,8 @@ class Node(object):
                                            lambda: self.MessageQ.Count))
         self.Stats.add_metric(stats.Sample('RoundTripEstimate',
                                            lambda: self.Estimator.RTO))
+        self.Stats.add_metric(stats.Sample('ResolutionFailures',
+                                           lambda: self.ResolutionFailures))
 
     def enqueue_message(self, msg, now):
         """Enqueue a message for future delivery.
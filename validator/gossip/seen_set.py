@@ -0,0 +1,189 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module defines the SeenSet class, which remembers the identifiers of
+handled messages until they expire, and the BloomFilter class it can use
+to bound the memory it takes.
+"""
+
+import hashlib
+import logging
+import math
+import struct
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter(object):
+    """A fixed size set that may report that it contains keys that were
+    never added to it, with a probability of ErrorRate once Capacity keys
+    have been added.
+
+    Attributes:
+        Capacity (int): The number of keys the filter is sized for.
+        ErrorRate (float): The false positive rate at capacity.
+    """
+
+    def __init__(self, capacity, error_rate=0.0001):
+        """Constructor for the BloomFilter class.
+
+        Args:
+            capacity (int): The number of keys the filter is sized for.
+            error_rate (float): The false positive rate at capacity.
+        """
+        self.Capacity = capacity
+        self.ErrorRate = error_rate
+
+        bits = -capacity * math.log(error_rate) / (math.log(2) ** 2)
+        self._bits = max(8, int(math.ceil(bits)))
+        self._hashes = max(
+            1, int(round(float(self._bits) / capacity * math.log(2))))
+        self._bitmap = bytearray((self._bits + 7) // 8)
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def _positions(self, key):
+        digest = hashlib.sha256(key).digest()
+        (first, second) = struct.unpack('!QQ', digest[:16])
+        return [(first + i * second) % self._bits
+                for i in xrange(self._hashes)]
+
+    def add(self, key):
+        """Adds a key to the filter.
+
+        Args:
+            key (str): The key.
+        """
+        for pos in self._positions(key):
+            self._bitmap[pos // 8] |= 1 << (pos % 8)
+        self._count += 1
+
+    def __contains__(self, key):
+        return all(self._bitmap[pos // 8] & (1 << (pos % 8))
+                   for pos in self._positions(key))
+
+
+class SeenSet(object):
+    """SeenSet remembers keys until their expiration times.
+
+    Keys are kept in generations, one for each Lifetime / Generations
+    seconds of expiration time, and a whole generation is dropped once
+    all of its keys have expired. Expiring the set therefore costs time
+    in proportion to the number of generations rather than the number of
+    keys. Keys are removed early, oldest generation first, when more than
+    MaximumSize are held.
+
+    When UseBloomFilter is set each generation is a BloomFilter sized for
+    MaximumSize / Generations keys, which bounds the memory the set takes
+    regardless of the size of the keys at the cost of occasionally
+    reporting a key that was not added.
+
+    Attributes:
+        Lifetime (float): The longest time in seconds keys are expected
+            to be kept.
+        Generations (int): The number of generations spanning Lifetime.
+        MaximumSize (int): The maximum number of keys held.
+        UseBloomFilter (bool): Whether generations are Bloom filters.
+        Evicted (int): The number of generations dropped before they
+            expired.
+    """
+
+    Lifetime = 300.0
+    Generations = 10
+    MaximumSize = 1000000
+    UseBloomFilter = False
+
+    def __init__(self, lifetime=None, maxsize=None, bloom_filter=None):
+        """Constructor for the SeenSet class.
+
+        Args:
+            lifetime (float): The longest time in seconds keys are
+                expected to be kept.
+            maxsize (int): The maximum number of keys held.
+            bloom_filter (bool): Whether generations are Bloom filters.
+        """
+        if lifetime is not None:
+            self.Lifetime = lifetime
+        if maxsize is not None:
+            self.MaximumSize = maxsize
+        if bloom_filter is not None:
+            self.UseBloomFilter = bloom_filter
+
+        self.Evicted = 0
+        self._width = float(self.Lifetime) / self.Generations
+        self._generations = {}
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, key):
+        for generation in self._generations.itervalues():
+            if key in generation:
+                return True
+        return False
+
+    def __setitem__(self, key, expiration):
+        self.add(key, expiration)
+
+    def add(self, key, expiration=None):
+        """Adds a key to the set.
+
+        Args:
+            key (str): The key.
+            expiration (float): The time after which the key may be
+                forgotten, defaults to Lifetime seconds from now.
+        """
+        if expiration is None:
+            expiration = time.time() + self.Lifetime
+
+        # round up so that keys are never forgotten early
+        genid = int(math.ceil(expiration / self._width))
+        generation = self._generations.get(genid)
+        if generation is None:
+            if self.UseBloomFilter:
+                generation = BloomFilter(
+                    max(1, self.MaximumSize // self.Generations))
+            else:
+                generation = set()
+            self._generations[genid] = generation
+
+        size = len(generation)
+        generation.add(key)
+        self._count += len(generation) - size
+
+        while self._count > self.MaximumSize and len(self._generations) > 1:
+            oldest = min(self._generations)
+            logger.debug('seen set is full, evict %d keys',
+                         len(self._generations[oldest]))
+            self._drop(oldest)
+            self.Evicted += 1
+
+    def expire(self, now=None):
+        """Forgets the keys that have expired.
+
+        Args:
+            now (float): The current time.
+        """
+        now = time.time() if now is None else now
+        for genid in [g for g in self._generations
+                      if g * self._width <= now]:
+            self._drop(genid)
+
+    def _drop(self, genid):
+        self._count -= len(self._generations.pop(genid))
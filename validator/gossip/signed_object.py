@@ -18,10 +18,12 @@ This module defines the SignedObject class which processes and validates
 objects signed by a signing key.
 """
 
-from collections import deque
+from collections import OrderedDict
 import hashlib
 import logging
+import multiprocessing
 from threading import Lock
+import time
 import pybitcointools
 
 from gossip.ECDSA import ECDSARecoverModule as nativeECDSA
@@ -34,32 +36,71 @@ class LruCache(object):
     """
     A simple thread-safe lru cache of the recovered public key and address.
     This prevents multiple key recoveries on signed objects during validation.
+
+    Entries are evicted when the cache holds max_size entries or when they
+    are older than ttl seconds. Hits, misses and evictions are counted so
+    they can be reported through the statistics of the validator.
     """
-    def __init__(self, max_size=100):
+    def __init__(self, max_size=100, ttl=None):
         self.max_size = max_size
-        self.order = deque(maxlen=self.max_size)
-        self.values = {}
+        self.ttl = ttl
+        self.values = OrderedDict()
         self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
 
     def __setitem__(self, key, value):
+        expires = time.time() + self.ttl if self.ttl else None
         with self.lock:
-            if key not in self.values:
-                while len(self.order) >= self.max_size:
-                    v = self.order.pop()
-                    del self.values[v]
-                self.values[key] = value
-                self.order.appendleft(key)
+            if key in self.values:
+                del self.values[key]
+            else:
+                self._evict(self.max_size - 1)
+            self.values[key] = (value, expires)
 
     def __getitem__(self, key):
         return self.get(key)
 
+    def __len__(self):
+        return len(self.values)
+
     def get(self, key, default=None):
         with self.lock:
-            result = self.values.get(key, default)
-            if result is not default:
-                self.order.remove(key)
-                self.order.appendleft(key)
-        return result
+            entry = self.values.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires = entry
+            if expires is not None and expires < time.time():
+                self.misses += 1
+                self.evictions += 1
+                return default
+
+            # move the entry to the most recently used end
+            self.values[key] = entry
+            self.hits += 1
+        return value
+
+    def resize(self, max_size, ttl=None):
+        """Changes the maximum number of entries, evicting the least
+        recently used entries if the cache is too large.
+
+        Args:
+            max_size (int): The maximum number of entries.
+            ttl (float): The time in seconds an entry is kept, entries
+                do not expire if this is None.
+        """
+        with self.lock:
+            self.max_size = max_size
+            self.ttl = ttl
+            self._evict(self.max_size)
+
+    def _evict(self, size):
+        while len(self.values) > max(size, 0):
+            self.values.popitem(last=False)
+            self.evictions += 1
 
 
 def generate_identifier(signingkey):
@@ -124,6 +165,92 @@ def get_verifying_key(serialized_msg, serialized_sig):
     return pubkey
 
 
+def _recover_verifying_key(args):
+    """Recovers the public key of a serialized message in a worker
+    process of the verification pool, None if the signature is malformed.
+    """
+    try:
+        return get_verifying_key(*args)
+    except Exception:
+        return None
+
+
+_verification_pool = None
+_verification_workers = 0
+
+
+def set_signature_verification_globals(cache_size=None, workers=None,
+                                       cache_ttl=None):
+    """Configures the signature cache shared by all signed objects and
+    the number of worker processes used by verify_signatures.
+
+    Args:
+        cache_size (int): The maximum number of recovered signatures
+            to keep.
+        workers (int): The number of worker processes used to recover
+            public keys, no pool is used if this is less than two.
+        cache_ttl (float): The time in seconds a recovered signature is
+            kept, signatures do not expire if this is None.
+    """
+    global _verification_pool
+    global _verification_workers
+
+    cache = SignedObject.signature_cache
+    if cache_size is not None or cache_ttl is not None:
+        cache.resize(
+            int(cache_size) if cache_size is not None else cache.max_size,
+            float(cache_ttl) if cache_ttl else None)
+
+    if workers is not None:
+        if _verification_pool is not None:
+            _verification_pool.terminate()
+            _verification_pool = None
+
+        _verification_workers = int(workers)
+        if _verification_workers > 1:
+            _verification_pool = multiprocessing.Pool(_verification_workers)
+
+
+def verify_signatures(signed_objects):
+    """Verifies the signatures of a list of signed objects, such as a
+    block and its transactions, in one call.
+
+    The public keys of objects that are not in the signature cache are
+    recovered together, in the verification pool when one is
+    configured, and added to the cache.
+
+    Args:
+        signed_objects (list): The signed objects to verify.
+
+    Returns:
+        list: A bool for each object, True if its signature is valid.
+    """
+    pending = []
+    for obj in signed_objects:
+        if obj.Signature and obj._originator_id is None:
+            serialized = obj.serialize(signable=True)
+            if not obj._load_verifying_key(serialized):
+                pending.append((obj, serialized))
+
+    args = [(serialized, obj.Signature) for obj, serialized in pending]
+    if _verification_pool is not None \
+            and len(args) >= 2 * _verification_workers:
+        pubkeys = _verification_pool.map(
+            _recover_verifying_key, args,
+            max(1, len(args) // (4 * _verification_workers)))
+    else:
+        pubkeys = [_recover_verifying_key(a) for a in args]
+
+    for (obj, serialized), pubkey in zip(pending, pubkeys):
+        # an object whose key cannot be recovered is left alone so that
+        # verify_signature reports the failure
+        if pubkey:
+            obj._store_verifying_key(serialized, pubkey)
+
+    return [obj.Signature is not None and obj.verify_signature()
+            for obj in signed_objects]
+
+
 class SignedObject(object):
     """Implements a base class for processing & validating signed objects.
 
@@ -133,7 +260,7 @@ class SignedObject(object):
             Used to build dict return types.
 
     """
-    signature_cache = LruCache()
+    signature_cache = LruCache(10000)
 
     def __init__(self, minfo=None, signkey='Signature'):
         """Constructor for the SignedObject class.
@@ -180,12 +307,32 @@ class SignedObject(object):
         assert self.Signature
 
         if not self._originator_id:
-            self._originator_id = \
-                self.signature_cache[self.Signature]
-            if not self._originator_id:
-                self._originator_id = \
-                    pybitcointools.pubtoaddr(self.originator_public_key)
-                self.signature_cache[self.Signature] = self._originator_id
+            serialized = self.serialize(signable=True)
+            if not self._load_verifying_key(serialized):
+                self._store_verifying_key(
+                    serialized,
+                    self._originator_public_key or
+                    get_verifying_key(serialized, self.Signature))
+
+    def _load_verifying_key(self, serialized):
+        # the cache entry is only used if it was recovered from the same
+        # message, a signature copied onto other content must not
+        # inherit the originator of the original
+        cached = self.signature_cache[self.Signature]
+        if cached is None or \
+                cached[0] != hashlib.sha256(serialized).digest():
+            return False
+
+        _, self._originator_id, self._originator_public_key = cached
+        return True
+
+    def _store_verifying_key(self, serialized, pubkey):
+        self._originator_public_key = pubkey
+        self._originator_id = pybitcointools.pubtoaddr(pubkey)
+        self.signature_cache[self.Signature] = (
+            hashlib.sha256(serialized).digest(),
+            self._originator_id,
+            self._originator_public_key)
 
     @property
     def originator_public_key(self):
@@ -274,6 +421,7 @@ class SignedObject(object):
         """
 
         self._originator_id = None
+        self._originator_public_key = None
         serialized = self.serialize(signable=True)
         self.Signature = pybitcointools.ecdsa_sign(serialized, signingkey)
 
@@ -0,0 +1,149 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module defines the TimerWheel class, a hierarchical timing wheel used
+to find the deadlines that have passed without scanning every deadline.
+"""
+
+import math
+import time
+
+
+class TimerWheel(object):
+    """A hierarchical timing wheel.
+
+    Deadlines are rounded up to ticks of Resolution seconds. Each level
+    of the wheel has Slots slots, a slot of the first level holds the
+    keys due in one tick and a slot of each following level covers a
+    whole turn of the level below it. When the wheel turns past a slot of
+    a higher level its keys move down, so expiring the wheel costs time
+    in proportion to the ticks that passed and the keys that expired
+    rather than to the number of keys.
+
+    Keys are cancelled lazily, their entries are skipped when the slot
+    holding them is reached.
+
+    Attributes:
+        Resolution (float): The length of a tick in seconds.
+        Slots (int): The number of slots in each level.
+        Levels (int): The number of levels.
+    """
+
+    Resolution = 0.1
+    Slots = 64
+    Levels = 4
+
+    def __init__(self, resolution=None, now=None):
+        """Constructor for the TimerWheel class.
+
+        Args:
+            resolution (float): The length of a tick in seconds.
+            now (float): The current time.
+        """
+        if resolution is not None:
+            self.Resolution = resolution
+
+        self._wheels = [[[] for _ in xrange(self.Slots)]
+                        for _ in xrange(self.Levels)]
+        self._deadlines = {}
+        self._tick = self._to_tick(time.time() if now is None else now)
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def __contains__(self, key):
+        return key in self._deadlines
+
+    def _to_tick(self, when, deadline=False):
+        # deadlines round up so that keys never expire early
+        if deadline:
+            return int(math.ceil(when / self.Resolution))
+        return int(math.floor(when / self.Resolution))
+
+    def _insert(self, key, tick):
+        delta = tick - self._tick
+        span = self.Slots
+        for level in xrange(self.Levels):
+            if delta < span or level == self.Levels - 1:
+                slot = (tick // (span // self.Slots)) % self.Slots
+                self._wheels[level][slot].append((key, tick))
+                return
+            span *= self.Slots
+
+    def schedule(self, key, deadline):
+        """Schedules a key to expire at a deadline, replacing any deadline
+        already scheduled for the key.
+
+        Args:
+            key: The key, it must be hashable.
+            deadline (float): The time at which the key expires.
+        """
+        tick = max(self._to_tick(deadline, True), self._tick)
+        self._deadlines[key] = tick
+        self._insert(key, tick)
+
+    def cancel(self, key):
+        """Cancels the deadline of a key if there is one.
+
+        Args:
+            key: The key.
+        """
+        self._deadlines.pop(key, None)
+
+    def expire(self, now=None):
+        """Turns the wheel to the current time.
+
+        Args:
+            now (float): The current time.
+
+        Returns:
+            list: The keys whose deadlines have passed, in the order of
+                their deadlines.
+        """
+        target = self._to_tick(time.time() if now is None else now)
+        expired = []
+
+        while self._tick <= target:
+            if not self._deadlines:
+                self._tick = target + 1
+                break
+
+            # move the keys of the higher level slots that start at this
+            # tick down the wheel, highest level first
+            for level in xrange(self.Levels - 1, 0, -1):
+                span = self.Slots ** level
+                if self._tick % span == 0:
+                    slot = (self._tick // span) % self.Slots
+                    entries = self._wheels[level][slot]
+                    self._wheels[level][slot] = []
+                    for key, tick in entries:
+                        if self._deadlines.get(key) == tick:
+                            self._insert(key, tick)
+
+            slot = self._tick % self.Slots
+            entries = self._wheels[0][slot]
+            self._wheels[0][slot] = []
+            for key, tick in entries:
+                if self._deadlines.get(key) != tick:
+                    continue
+                if tick <= self._tick:
+                    del self._deadlines[key]
+                    expired.append(key)
+                else:
+                    self._insert(key, tick)
+
+            self._tick += 1
+
+        return expired
@@ -80,11 +80,14 @@ class TokenBucket(object):
         Returns:
             bool: If more tokens are requested than are available, returns
                 False, otherwise subtracts the tokens and returns True.
+                A request larger than the capacity of the bucket succeeds
+                once the bucket is full, leaving the bucket in debt.
 
         """
         self.drip()
 
-        if amount > self.Tokens:
+        if amount > self.Tokens and \
+                not (amount > self.Capacity and self.Tokens >= self.Capacity):
             return False
         self.Tokens -= amount
         return True
@@ -0,0 +1,235 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import os
+import threading
+
+import lmdb
+
+from gossip.common import cbor2dict
+from gossip.common import dict2cbor
+from journal.database import database
+
+
+class CBORLMDBDatabase(database.Database):
+    """CBORLMDBDatabase is a thread-safe implementation of the
+    journal.database.Database interface which uses LMDB for the
+    underlying persistence and CBOR for the encoding of values.
+
+    Transactions and blocks are stored in the wire form of the message
+    that carries them along with the attributes the local node keeps
+    about them, listed in their LocalAttributes, and are rebuilt through
+    the registered message types when they are read. Other values are
+    stored as plain CBOR. Nothing is pickled.
+
+    Readers use their own LMDB read transactions so they run concurrently
+    with each other and with the writer. Writes made between
+    begin_batch() and commit_batch() share one write transaction.
+
+    Attributes:
+        lmdb (lmdb.Environment): The underlying lmdb database.
+        unpack_message (function): Builds a message from its type name
+            and the dict of its fields.
+    """
+
+    def __init__(self, filename, flag, unpack_message):
+        """Constructor for the CBORLMDBDatabase class.
+
+        Args:
+            filename (str): The filename of the database file.
+            flag (str): a flag indicating the mode for opening the database.
+                Refer to the documentation for anydbm.open().
+            unpack_message (function): Builds a message from its type
+                name and the dict of its fields, generally the
+                unpack_message method of the journal dispatcher.
+        """
+        super(CBORLMDBDatabase, self).__init__()
+        self.unpack_message = unpack_message
+
+        # serializes writers only, readers do not take the lock
+        self._write_lock = threading.RLock()
+        self._batch = None
+
+        create = bool(flag == 'c')
+
+        if flag == 'n':
+            if os.path.isfile(filename):
+                os.remove(filename)
+            create = True
+
+        self._lmdb = lmdb.Environment(path=filename,
+                                      map_size=1024**4,
+                                      subdir=False,
+                                      create=create,
+                                      lock=True,
+                                      max_spare_txns=8)
+
+    def encode(self, value):
+        """Encodes a value into CBOR.
+
+        Args:
+            value: A transaction, a block or a value that can be
+                represented in CBOR.
+
+        Returns:
+            bytes: The encoded value.
+        """
+        if hasattr(value, 'build_message'):
+            msg = value.build_message()
+            attribute = 'TransactionBlock' \
+                if getattr(msg, 'TransactionBlock', None) is value \
+                else 'Transaction'
+            return dict2cbor({
+                'MessageType': msg.MessageType,
+                'Attribute': attribute,
+                'Object': value.dump(),
+                'Local': dict((a, getattr(value, a))
+                              for a in value.LocalAttributes)})
+
+        return dict2cbor({'Value': value})
+
+    def decode(self, data):
+        """Decodes a value encoded by encode().
+
+        Args:
+            data (bytes): The encoded value.
+
+        Returns:
+            The transaction, block or plain value.
+        """
+        record = cbor2dict(data)
+        if 'Value' in record:
+            return record['Value']
+
+        msg = self.unpack_message(
+            record['MessageType'], {record['Attribute']: record['Object']})
+        value = getattr(msg, record['Attribute'])
+        for attribute, attrvalue in record['Local'].iteritems():
+            setattr(value, attribute, attrvalue)
+        return value
+
+    def _in_batch(self):
+        return self._batch is not None and \
+            self._batch[1] == threading.current_thread()
+
+    def _read(self, key):
+        if self._in_batch():
+            return self._batch[0].get(key)
+
+        with self._lmdb.begin() as txn:
+            return txn.get(key)
+
+    def __len__(self):
+        if self._in_batch():
+            return self._batch[0].stat(self._lmdb.open_db())['entries']
+
+        with self._lmdb.begin() as txn:
+            return txn.stat(self._lmdb.open_db())['entries']
+
+    def __contains__(self, key):
+        return self._read(key) is not None
+
+    def get(self, key):
+        """Retrieves a value associated with a key from the database
+
+        Args:
+            key (str): The key to retrieve
+        """
+        data = self._read(key)
+        if data is not None:
+            return self.decode(data)
+
+    def set(self, key, value):
+        """Sets a value associated with a key in the database
+
+        Args:
+            key (str): The key to set.
+            value (str): The value to associate with the key.
+        """
+        self.set_batch([(key, value)])
+
+    def delete(self, key):
+        """Removes a key:value from the database
+
+        Args:
+            key (str): The key to remove.
+        """
+        self.set_batch([], [key])
+
+    def set_batch(self, add_pairs, del_keys=None):
+        """Sets and removes multiple key:value pairs in a single write
+        transaction.
+
+        Args:
+            add_pairs (list): The (key, value) pairs to set.
+            del_keys (list): The keys to remove.
+        """
+        encoded = [(k, self.encode(v)) for k, v in add_pairs]
+        with self._write_lock:
+            if self._in_batch():
+                self._write(self._batch[0], encoded, del_keys)
+                return
+
+            with self._lmdb.begin(write=True) as txn:
+                self._write(txn, encoded, del_keys)
+
+    @staticmethod
+    def _write(txn, encoded, del_keys):
+        for key, data in encoded:
+            txn.put(key, data, overwrite=True)
+        for key in del_keys or []:
+            txn.delete(key)
+
+    def begin_batch(self):
+        """Starts a write transaction that is used by the writes made by
+        the calling thread until commit_batch() is called. Writes from
+        other threads wait for the batch to be committed.
+        """
+        self._write_lock.acquire()
+        if self._batch is not None:
+            self._write_lock.release()
+            raise ValueError('a batch is already in progress')
+        self._batch = (self._lmdb.begin(write=True),
+                       threading.current_thread())
+
+    def commit_batch(self):
+        """Commits the write transaction started by begin_batch().
+        """
+        txn, _ = self._batch
+        self._batch = None
+        try:
+            txn.commit()
+        finally:
+            self._write_lock.release()
+
+    def sync(self):
+        """Ensures that pending writes are flushed to disk
+        """
+        self._lmdb.sync()
+
+    def close(self):
+        """Closes the connection to the database
+        """
+        with self._write_lock:
+            self._lmdb.close()
+
+    def keys(self):
+        """Returns a list of keys in the database
+        """
+        if self._in_batch():
+            return [key for key, _ in self._batch[0].cursor()]
+
+        with self._lmdb.begin() as txn:
+            return [key for key, _ in txn.cursor()]
@@ -66,6 +66,31 @@ class Database(object):
         """
         raise NotImplementedError()
 
+    def set_batch(self, add_pairs, del_keys=None):
+        """Sets and removes multiple key:value pairs. Implementations
+        that support transactions apply the whole batch at once.
+
+        Args:
+            add_pairs (list): The (key, value) pairs to set.
+            del_keys (list): The keys to remove.
+        """
+        for key, value in add_pairs:
+            self.set(key, value)
+        for key in del_keys or []:
+            self.delete(key)
+
+    def begin_batch(self):
+        """Starts grouping the following writes so they are applied
+        together when commit_batch() is called. Implementations that do
+        not support batches apply each write immediately.
+        """
+        pass
+
+    def commit_batch(self):
+        """Applies the writes made since begin_batch() was called.
+        """
+        pass
+
     def sync(self):
         """Ensures that pending writes are flushed to disk
         """
@@ -86,72 +111,121 @@ class CachedDatabase(object):
     """
     Takes Database subclasses as argument to constructor
     and implements a caching mechanism
+
+    The cache is a read-through LRU. Values that are set are kept in the
+    cache and marked dirty, the dirty values are written to the database
+    in one batch when the database is synced or closed, or individually
+    when they are evicted.
+
     Attributes:
         _database: journal.database.database.Database instance of subclass
-        _cache: dict
+        _cache: OrderedDict, least recently used first
+        _dirty: set of keys set since the last flush
         _rlock: Threading.Rlock
+        hits (int): The number of reads served from the cache.
+        misses (int): The number of reads served from the database.
     """
 
     def __init__(self, database, cache_limit=1000):
 
         self._database = database
         self._cache = OrderedDict()
+        self._dirty = set()
         self._rlock = RLock()
         self._cachelimit = cache_limit
+        self.hits = 0
+        self.misses = 0
 
     def __getitem__(self, item):
-        with self._rlock:
-            if item in self._cache:
-                return self._cache[item]
-            return self._database[item]
+        return self.get(item)
 
     def __setitem__(self, key, value):
-        with self._rlock:
-            self._database[key] = value
-            self._cache[key] = value
-
-            if len(self._cache) > self._cachelimit:
-                self._cache.popitem(last=False)
+        self.set(key, value)
 
     def __delitem__(self, key):
-        with self._rlock:
-            if key in self._cache:
-                del self._cache[key]
-            del self._database[key]
+        self.delete(key)
 
     def __len__(self):
         with self._rlock:
+            self.flush()
             return len(self._database)
 
     def __contains__(self, item):
         with self._rlock:
             return item in self._cache or item in self._database
 
+    @property
+    def hit_ratio(self):
+        """Returns the fraction of reads served from the cache.
+        """
+        reads = self.hits + self.misses
+        return float(self.hits) / reads if reads else 0.0
+
+    def _cache_value(self, key, value):
+        self._cache[key] = value
+        while len(self._cache) > self._cachelimit:
+            evicted, evictedvalue = self._cache.popitem(last=False)
+            if evicted in self._dirty:
+                self._dirty.discard(evicted)
+                self._database.set(evicted, evictedvalue)
+
     def get(self, key):
         with self._rlock:
             if key in self._cache:
-                return self._cache[key]
-            return self._database.get(key)
+                self.hits += 1
+                value = self._cache.pop(key)
+                self._cache[key] = value
+                return value
+
+            self.misses += 1
+            value = self._database.get(key)
+            if value is not None:
+                self._cache_value(key, value)
+            return value
 
     def set(self, key, value):
         with self._rlock:
-            self._cache[key] = value
-            self._database.set(key, value)
+            self._cache.pop(key, None)
+            self._dirty.add(key)
+            self._cache_value(key, value)
 
     def delete(self, key):
         with self._rlock:
-            if key in self._cache:
-                del self._cache[key]
+            self._cache.pop(key, None)
+            if key in self._dirty:
+                # the value may never have been written
+                self._dirty.discard(key)
+                if key not in self._database:
+                    return
             self._database.delete(key)
 
+    def flush(self):
+        """Writes the dirty values to the database in one batch.
+        """
+        with self._rlock:
+            if self._dirty:
+                self._database.set_batch(
+                    [(k, self._cache[k]) for k in self._dirty])
+                self._dirty = set()
+
+    def begin_batch(self):
+        # writes are kept in the cache until the next flush
+        pass
+
+    def commit_batch(self):
+        pass
+
     def sync(self):
         with self._rlock:
+            self.flush()
             self._database.sync()
 
     def close(self):
         with self._rlock:
+            self.flush()
             self._database.close()
 
     def keys(self):
         with self._rlock:
+            self.flush()
             return self._database.keys()
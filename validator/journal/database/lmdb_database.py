@@ -90,6 +90,22 @@ class LMDBDatabase(database.Database):
             with self._lmdb.begin(write=True, buffers=True) as txn:
                 txn.put(key, pickled, overwrite=True)
 
+    def set_batch(self, add_pairs, del_keys=None):
+        """Sets and removes multiple key:value pairs in a single write
+        transaction.
+
+        Args:
+            add_pairs (list): The (key, value) pairs to set.
+            del_keys (list): The keys to remove.
+        """
+        pickled = [(k, pickle.dumps(v)) for k, v in add_pairs]
+        with self._lock:
+            with self._lmdb.begin(write=True, buffers=True) as txn:
+                for key, value in pickled:
+                    txn.put(key, value, overwrite=True)
+                for key in del_keys or []:
+                    txn.delete(key)
+
     def delete(self, key):
         """Removes a key:value from the database
 
@@ -0,0 +1,69 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import os
+import lmdb
+
+from journal.database import state_database
+
+
+class LMDBStateDatabase(state_database.StateDatabase):
+    """LMDBStateDatabase implements the StateDatabase interface using
+    one LMDB named database per table. Each batch of updates is written
+    in a single LMDB write transaction.
+    """
+
+    def __init__(self, filename, flag):
+        """Constructor for the LMDBStateDatabase class.
+
+        Args:
+            filename (str): The filename of the database file.
+            flag (str): a flag indicating the mode for opening the database.
+                Refer to the documentation for anydbm.open().
+        """
+        create = bool(flag == 'c')
+
+        if flag == 'n':
+            if os.path.isfile(filename):
+                os.remove(filename)
+            create = True
+
+        self._lmdb = lmdb.Environment(path=filename,
+                                      map_size=1024**4,
+                                      subdir=False,
+                                      create=create,
+                                      max_dbs=len(self.Tables))
+        self._tables = {}
+        for table in self.Tables:
+            self._tables[table] = self._lmdb.open_db(table)
+
+    def get(self, table, key):
+        with self._lmdb.begin(db=self._tables[table]) as txn:
+            return txn.get(key)
+
+    def contains(self, table, key):
+        return self.get(table, key) is not None
+
+    def keys(self, table):
+        with self._lmdb.begin(db=self._tables[table]) as txn:
+            return [key for key, _ in txn.cursor()]
+
+    def write_batch(self, updates):
+        with self._lmdb.begin(write=True) as txn:
+            for table, key, value in updates:
+                txn.put(key, value, db=self._tables[table])
+
+    def close(self):
+        self._lmdb.close()
@@ -0,0 +1,120 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import anydbm
+from threading import RLock
+
+
+class StateDatabase(object):
+    """The StateDatabase interface used by the GlobalStoreManager to
+    persist ledger state. Records are grouped into a fixed set of
+    tables and updates are written in batches, one batch per block.
+
+    Attributes:
+        Tables (list): The names of the tables held in the database.
+    """
+
+    Tables = ['blocks', 'checkpoints', 'index']
+
+    def get(self, table, key):
+        """Retrieves the value associated with a key.
+
+        Args:
+            table (str): The table to read from.
+            key (str): The key to retrieve.
+
+        Returns:
+            bytes: The value, or None if the key does not exist.
+        """
+        raise NotImplementedError()
+
+    def contains(self, table, key):
+        """Determines whether a key exists in a table.
+
+        Args:
+            table (str): The table to search.
+            key (str): The key to search for.
+        """
+        raise NotImplementedError()
+
+    def keys(self, table):
+        """Returns a list of the keys in a table.
+
+        Args:
+            table (str): The table to list.
+        """
+        raise NotImplementedError()
+
+    def write_batch(self, updates):
+        """Writes a batch of updates and flushes them to disk.
+
+        Args:
+            updates (list): (table, key, value) tuples to write.
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        """Closes the connection to the database
+        """
+        raise NotImplementedError()
+
+
+class DbmStateDatabase(StateDatabase):
+    """DbmStateDatabase implements the StateDatabase interface on top
+    of a single anydbm file. Block records are stored under their own
+    key so files written before checkpoints were introduced can still
+    be read; the other tables are stored under prefixed keys.
+    """
+
+    def __init__(self, filename, flag):
+        """Constructor for the DbmStateDatabase class.
+
+        Args:
+            filename (str): The filename of the database file.
+            flag (str): a flag indicating the mode for opening the database.
+                Refer to the documentation for anydbm.open().
+        """
+        self._lock = RLock()
+        self._dbm = anydbm.open(filename, flag)
+
+    @staticmethod
+    def _key(table, key):
+        return key if table == 'blocks' else '{0}:{1}'.format(table, key)
+
+    def get(self, table, key):
+        with self._lock:
+            return self._dbm.get(self._key(table, key))
+
+    def contains(self, table, key):
+        with self._lock:
+            return self._key(table, key) in self._dbm
+
+    def keys(self, table):
+        with self._lock:
+            if table == 'blocks':
+                return [k for k in self._dbm.keys() if ':' not in k]
+            prefix = self._key(table, '')
+            return [k[len(prefix):] for k in self._dbm.keys()
+                    if k.startswith(prefix)]
+
+    def write_batch(self, updates):
+        with self._lock:
+            for table, key, value in updates:
+                self._dbm[self._key(table, key)] = value
+            self._dbm.sync()
+
+    def close(self):
+        with self._lock:
+            self._dbm.close()
@@ -0,0 +1,208 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+
+class DependencyGraph(object):
+    """The DependencyGraph class indexes the dependencies between
+    pending transactions.
+
+    Each transaction in the graph records the dependencies that have not
+    been committed, and each dependency records the transactions waiting
+    for it, so committing or discarding a transaction only touches its
+    dependents. Dependencies that are not in the graph are missing;
+    requests for them are scheduled with exponential backoff.
+
+    Attributes:
+        retry_interval (float): Time in seconds before the first repeated
+            request for a missing dependency.
+        maximum_retry_interval (float): Upper bound on the time between
+            requests for a missing dependency.
+    """
+
+    def __init__(self, retry_interval=30.0, maximum_retry_interval=300.0):
+        """Constructor for the DependencyGraph class.
+
+        Args:
+            retry_interval (float): Time in seconds before the first
+                repeated request for a missing dependency.
+            maximum_retry_interval (float): Upper bound on the time
+                between requests for a missing dependency.
+        """
+        self.retry_interval = retry_interval
+        self.maximum_retry_interval = maximum_retry_interval
+
+        self._waiting = {}
+        self._dependents = {}
+        self._missing = {}
+
+    def __contains__(self, txnid):
+        return txnid in self._waiting
+
+    def __len__(self):
+        return len(self._waiting)
+
+    def add(self, txnid, dependencies):
+        """Adds a transaction to the graph.
+
+        Args:
+            txnid (str): The identifier of the transaction.
+            dependencies (list): Identifiers of the dependencies of the
+                transaction that have not been committed.
+        """
+        if txnid in self._waiting:
+            return
+
+        self._waiting[txnid] = set(dependencies)
+        for depid in dependencies:
+            self._dependents.setdefault(depid, set()).add(txnid)
+            if depid not in self._waiting and depid not in self._missing:
+                self._missing[depid] = (0.0, self.retry_interval, 0)
+        self._missing.pop(txnid, None)
+
+    def waiting(self, txnid):
+        """Returns the uncommitted dependencies of a transaction.
+
+        Args:
+            txnid (str): The identifier of the transaction.
+
+        Returns:
+            set: The identifiers of the uncommitted dependencies.
+        """
+        return self._waiting.get(txnid, set())
+
+    def dependents(self, txnid):
+        """Returns the transactions waiting for a transaction.
+
+        Args:
+            txnid (str): The identifier of the transaction.
+
+        Returns:
+            set: The identifiers of the dependent transactions.
+        """
+        return self._dependents.get(txnid, set())
+
+    def missing(self, txnid):
+        """Returns the dependencies of a transaction that are not in
+        the graph.
+
+        Args:
+            txnid (str): The identifier of the transaction.
+
+        Returns:
+            list: The identifiers of the missing dependencies.
+        """
+        return [d for d in self.waiting(txnid) if d not in self._waiting]
+
+    def has_cycle(self, txnid):
+        """Determines whether a transaction depends, directly or
+        indirectly, on itself.
+
+        Args:
+            txnid (str): The identifier of the transaction.
+
+        Returns:
+            bool: Whether the transaction is part of a cycle.
+        """
+        visited = set()
+        stack = list(self.waiting(txnid))
+        while stack:
+            depid = stack.pop()
+            if depid == txnid:
+                return True
+            if depid not in visited:
+                visited.add(depid)
+                stack.extend(self.waiting(depid))
+        return False
+
+    def resolve(self, txnid):
+        """Removes a transaction that has been committed. Transactions
+        waiting for it no longer depend on it.
+
+        Args:
+            txnid (str): The identifier of the committed transaction.
+        """
+        self._remove(txnid)
+        for dependent in self._dependents.pop(txnid, set()):
+            if dependent in self._waiting:
+                self._waiting[dependent].discard(txnid)
+        self._missing.pop(txnid, None)
+
+    def discard(self, txnid):
+        """Removes a transaction that will never be valid along with
+        every transaction that depends on it.
+
+        Args:
+            txnid (str): The identifier of the invalid transaction.
+
+        Returns:
+            list: The identifiers of the removed transactions, including
+                txnid if it was in the graph.
+        """
+        removed = []
+        stack = [txnid]
+        seen = set(stack)
+        while stack:
+            current = stack.pop()
+            if current in self._waiting:
+                removed.append(current)
+            self._remove(current)
+            self._missing.pop(current, None)
+            for dependent in self._dependents.pop(current, set()):
+                if dependent not in seen:
+                    seen.add(dependent)
+                    stack.append(dependent)
+        return removed
+
+    def _remove(self, txnid):
+        for depid in self._waiting.pop(txnid, set()):
+            dependents = self._dependents.get(depid)
+            if dependents is not None:
+                dependents.discard(txnid)
+                if not dependents and depid not in self._waiting:
+                    del self._dependents[depid]
+                    self._missing.pop(depid, None)
+
+    def clear(self):
+        """Removes all transactions from the graph.
+        """
+        self._waiting = {}
+        self._dependents = {}
+        self._missing = {}
+
+    def due_requests(self, now):
+        """Returns the missing dependencies that should be requested.
+
+        A missing dependency is due immediately the first time it is
+        seen, after which the interval between requests doubles up to
+        maximum_retry_interval.
+
+        Args:
+            now (float): The current time.
+
+        Returns:
+            list: (dependency identifier, retry count) tuples for the
+                dependencies to request.
+        """
+        due = []
+        for depid, (nexttime, interval, count) in self._missing.items():
+            if now < nexttime:
+                continue
+
+            self._missing[depid] = (
+                now + interval,
+                min(interval * 2, self.maximum_retry_interval),
+                count + 1)
+            due.append((depid, count))
+        return due
@@ -13,13 +13,14 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 
-import anydbm
 import logging
 import copy
 
 import cbor
 
 from gossip.common import cbor2dict, dict2cbor, NullIdentifier
+from journal.database import state_database
+from journal.persistent_map import PersistentMap
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +31,77 @@ class ReadOnlyException(BaseException):
     pass
 
 
+class FrozenDict(dict):
+    """A dictionary that cannot be modified once it has been created.
+
+    Stores running in immutable value mode hold FrozenDict values so
+    they can be handed out without being copied. Copying a FrozenDict
+    returns the same object.
+    """
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError('attempt to modify a frozen value')
+
+    __setitem__ = __delitem__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self), ))
+
+
+class FrozenList(list):
+    """A list that cannot be modified once it has been created.
+    """
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError('attempt to modify a frozen value')
+
+    __setitem__ = __delitem__ = __setslice__ = __delslice__ = _immutable
+    __iadd__ = __imul__ = _immutable
+    append = extend = insert = pop = remove = reverse = sort = _immutable
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (FrozenList, (list(self), ))
+
+
+def freeze_value(value):
+    """Creates an immutable equivalent of a store value.
+
+    Dictionaries, lists, tuples and sets are converted recursively;
+    scalars and values that are already frozen are returned unchanged.
+
+    Args:
+        value (object): The value to freeze.
+
+    Returns:
+        object: The frozen value.
+    """
+    if isinstance(value, (basestring, int, long, float, FrozenDict,
+                          FrozenList, frozenset)) or value is None:
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze_value(v)) for k, v in value.iteritems())
+    if isinstance(value, list):
+        return FrozenList(freeze_value(v) for v in value)
+    if isinstance(value, tuple):
+        return tuple(freeze_value(v) for v in value)
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
 class GlobalStoreManager(object):
     """The GlobalStoreManager class encapsulates persistent management
     of state associated with blocks in the ledger.
@@ -46,7 +118,8 @@ class GlobalStoreManager(object):
 
     RootBlockID = NullIdentifier
 
-    def __init__(self, blockstorefile='blockstore', dbmode='c'):
+    def __init__(self, blockstorefile='blockstore', dbmode='c',
+                 db_type='dbm', checkpoint_interval=None):
         """Initialize a GlobalStoreManager, opening the database file.
 
         Args:
@@ -54,28 +127,51 @@ class GlobalStoreManager(object):
                 persistent data.
             dbmode (str): The mode used to open the file (see anydbm
                 parameters).
+            db_type (str): The type of database used for persistence,
+                either 'dbm' or 'lmdb'.
+            checkpoint_interval (int): The maximum number of blocks
+                between full checkpoints of the state.
         """
         logger.info('create blockstore from file %s with flag %s',
                     blockstorefile, dbmode)
 
+        if checkpoint_interval is not None:
+            self.checkpoint_interval = int(checkpoint_interval)
+        else:
+            self.checkpoint_interval = 100
+
         self._blockmap = {}
-        self._persistmap = anydbm.open(blockstorefile, dbmode)
+        if db_type == 'lmdb':
+            from journal.database import lmdb_state_database
+            self._persistmap = lmdb_state_database.LMDBStateDatabase(
+                blockstorefile, dbmode)
+        else:
+            self._persistmap = state_database.DbmStateDatabase(
+                blockstorefile, dbmode)
 
         rootstore = BlockStore()
         rootstore.commit_block(self.RootBlockID)
         self._blockmap[self.RootBlockID] = rootstore
-        self._persistmap[self.RootBlockID] = \
-            dict2cbor(rootstore.dump_block(True))
-        self._persistmap.sync()
+        self._persist_root_store()
 
-        logger.debug('the persistent block store has %s keys',
-                     len(self._persistmap))
+        logger.debug('the persistent block store has %s blocks',
+                     len(self._persistmap.keys('blocks')))
 
     def close(self):
         """Close the database file.
         """
         self._persistmap.close()
 
+    def _persist_root_store(self):
+        # the root store is always loaded, so it acts as the checkpoint
+        # for the blocks that follow it
+        rootstore = self._blockmap[self.RootBlockID]
+        index = {'CheckpointID': self.RootBlockID, 'Depth': 0}
+        self._persistmap.write_batch([
+            ('blocks', self.RootBlockID,
+             dict2cbor(rootstore.dump_block(True))),
+            ('index', self.RootBlockID, dict2cbor(index))])
+
     def add_transaction_store(self, tname, tstore):
         """Registers a data store type with a particular transaction type.
 
@@ -95,9 +191,7 @@ class GlobalStoreManager(object):
 
         rootstore.commit_block(self.RootBlockID)
         self._blockmap[self.RootBlockID] = rootstore
-        self._persistmap[self.RootBlockID] = \
-            dict2cbor(rootstore.dump_block(True))
-        self._persistmap.sync()
+        self._persist_root_store()
 
     def get_transaction_store(self, transaction_name, block_id):
         """Retrieves teh data store for a particular transaction type.
@@ -117,7 +211,10 @@ class GlobalStoreManager(object):
         """Associates the blockstore with the blockid and commits
         the blockstore to disk.
 
-        Marks the blockstore read only as part of the process.
+        Marks the blockstore read only as part of the process. The
+        changes made by the block are written together with an index
+        entry for the block; every checkpoint_interval blocks the
+        complete state is written as a checkpoint as well.
 
         Args:
             blockid (str): The identifier to associate with the block.
@@ -127,16 +224,42 @@ class GlobalStoreManager(object):
 
         # if we commit a block then we know that either this is the genesis
         # block or that the previous block is committed already
-        assert blockstore.PreviousBlockID in self._persistmap
+        assert self._persistmap.contains('blocks', blockstore.PreviousBlockID)
 
         blockstore.commit_block(blockid)
         self._blockmap[blockid] = blockstore
-        self._persistmap[blockid] = dict2cbor(blockstore.dump_block(True))
-        self._persistmap.sync()
+
+        updates = [('blocks', blockid, dict2cbor(blockstore.dump_block(True)))]
+
+        # blocks written before the index existed have no entry, so
+        # start a new checkpoint
+        previndex = self._get_index(blockstore.PreviousBlockID)
+        depth = previndex['Depth'] + 1 if previndex \
+            else self.checkpoint_interval
+        if depth >= self.checkpoint_interval:
+            logger.debug('checkpoint state for block %s', blockid)
+            updates.append(
+                ('checkpoints', blockid,
+                 dict2cbor(blockstore.dump_block(True, full=True))))
+            index = {'CheckpointID': blockid, 'Depth': 0}
+        else:
+            index = {'CheckpointID': previndex['CheckpointID'],
+                     'Depth': depth}
+        updates.append(('index', blockid, dict2cbor(index)))
+
+        self._persistmap.write_batch(updates)
+
+    def _get_index(self, blockid):
+        index = self._persistmap.get('index', blockid)
+        return cbor2dict(index) if index is not None else None
 
     def require_store(self, blockid):
         """Ensure that the store for this block (including all dependent
         blocks) is loaded into the _blockmap
+
+        At most the blocks since the most recent checkpoint need to be
+        replayed, fewer if an intermediate block is already loaded.
+
         :param str blockid: identifier to associate with the block
         """
 
@@ -145,29 +268,96 @@ class GlobalStoreManager(object):
         # and since this might go through the entire chain of blocks... seems
         # like avoiding recursion is a very useful thing
 
+        index = self._get_index(blockid)
+        checkpointid = index['CheckpointID'] if index else None
+
         # pass 1... build the list of blocks that we need to load in order
         # to load the current block
         blocklist = []
         while blockid not in self._blockmap:
+            if blockid == checkpointid and \
+                    self._persistmap.contains('checkpoints', blockid):
+                self._load_checkpoint(blockid)
+                break
+
             logger.info('add block %s to the queue for loading', blockid)
-            blocklist.insert(0, blockid)
 
-            if blockid not in self._persistmap:
+            persisted = self._persistmap.get('blocks', blockid)
+            if persisted is None:
                 raise KeyError('unknown block', blockid)
 
-            blockinfo = cbor2dict(self._persistmap[blockid])
-            blockid = blockinfo['PreviousBlockID']
+            blockinfo = cbor.loads(persisted)
+            blocklist.append((blockid, blockinfo))
+            blockid = str(blockinfo['PreviousBlockID'])
 
         # pass 2... starting with the oldest block, begin to load
         # the stores
-        for blockid in blocklist:
+        for blockid, blockinfo in reversed(blocklist):
             logger.info('load block %s from storage', blockid)
-            blockinfo = cbor.loads(self._persistmap[blockid])
             prevstore = self._blockmap[blockinfo['PreviousBlockID']]
             blockstore = prevstore.clone_block(blockinfo, True)
             blockstore.commit_block(blockid)
             self._blockmap[blockid] = blockstore
 
+    def _load_checkpoint(self, blockid):
+        logger.info('load checkpoint for block %s from storage', blockid)
+        blockinfo = cbor.loads(self._persistmap.get('checkpoints', blockid))
+
+        # the checkpoint holds the complete state so it is applied to
+        # the (empty) stores of the root block and then detached
+        rootstore = self._blockmap[self.RootBlockID]
+        blockstore = rootstore.clone_block(blockinfo, True)
+        blockstore.commit_block(blockid)
+        blockstore.flatten()
+        self._blockmap[blockid] = blockstore
+
+    def snapshot(self, blockid):
+        """Serializes the complete state associated with a block.
+
+        The snapshot has the format of a checkpoint, it can be installed
+        with install_snapshot by a node that does not have the blocks
+        preceding it.
+
+        Args:
+            blockid (str): Identifier associated with the block.
+
+        Returns:
+            bytes: The serialized state.
+        """
+        blockstore = self.get_block_store(blockid)
+        return dict2cbor(blockstore.dump_block(True, full=True))
+
+    def install_snapshot(self, blockid, snapshot):
+        """Installs the state of a block serialized by snapshot as a
+        checkpoint, the blocks that follow it are committed as usual.
+
+        Args:
+            blockid (str): Identifier associated with the block.
+            snapshot (bytes): The serialized state.
+
+        Raises:
+            ValueError: If the snapshot is not the state of the block or
+                lacks the state of a registered transaction family.
+        """
+        blockinfo = cbor.loads(snapshot)
+        if str(blockinfo['BlockID']) != blockid:
+            raise ValueError('snapshot is for block {0}'.format(
+                blockinfo['BlockID']))
+
+        rootstore = self._blockmap[self.RootBlockID]
+        missing = set(rootstore.TransactionStores) - \
+            set(str(t) for t in blockinfo['TransactionStores'])
+        if missing:
+            raise ValueError('snapshot has no state for {0}'.format(
+                ', '.join(sorted(missing))))
+
+        index = {'CheckpointID': blockid, 'Depth': 0}
+        self._persistmap.write_batch([
+            ('blocks', blockid, snapshot),
+            ('checkpoints', blockid, snapshot),
+            ('index', blockid, dict2cbor(index))])
+        self._load_checkpoint(blockid)
+
     def get_block_store(self, blockid):
         """Gets the blockstore associated with a particular blockid.
 
@@ -227,7 +417,7 @@ class GlobalStoreManager(object):
         '''
         Returns: a list of the block ids in the persistent store
         '''
-        return self._persistmap.keys()
+        return self._persistmap.keys('blocks')
 
 
 class BlockStore(object):
@@ -264,6 +454,11 @@ class BlockStore(object):
         self.BlockID = GlobalStoreManager.RootBlockID
         self.TransactionStores = {}
 
+        # blocks loaded from a checkpoint or flattened no longer hold a
+        # reference to the previous block, only its identifier
+        self._previous_block_id = str(blockinfo['PreviousBlockID']) \
+            if blockinfo else None
+
         if self.PrevBlock:
             for tname, tstore in self.PrevBlock.TransactionStores.iteritems():
                 storeinfo = blockinfo['TransactionStores'][
@@ -278,6 +473,8 @@ class BlockStore(object):
         NullIdentifier if this is the root block (ie there is no previous
         block)
         """
+        if self._previous_block_id is not None:
+            return self._previous_block_id
         return self.PrevBlock.BlockID if self.PrevBlock else NullIdentifier
 
     def add_transaction_store(self, tname, tstore):
@@ -330,9 +527,18 @@ class BlockStore(object):
         for tstore in self.TransactionStores.itervalues():
             tstore.flatten()
 
-    def dump_block(self, readonly=True):
+        self._previous_block_id = self.PreviousBlockID
+        self.PrevBlock = None
+
+    def dump_block(self, readonly=True, full=False):
         """Serialize the stores associated with this block.
 
+        Args:
+            readonly (bool): Whether or not the copy will be read only,
+                in which case a deep copy is not performed.
+            full (bool): Whether to serialize the complete state rather
+                than the changes made since the previous block.
+
         Returns:
             dict: Information about the stores associated with this
                 block.
@@ -342,7 +548,12 @@ class BlockStore(object):
         result['PreviousBlockID'] = self.PreviousBlockID
         result['TransactionStores'] = {}
         for tname, tstore in self.TransactionStores.iteritems():
-            result['TransactionStores'][tname] = tstore.dump(readonly)
+            if full:
+                result['TransactionStores'][tname] = {
+                    'Store': tstore.compose(readonly),
+                    'DeletedKeys': []}
+            else:
+                result['TransactionStores'][tname] = tstore.dump(readonly)
 
         return result
 
@@ -352,12 +563,23 @@ class KeyValueStore(object):
     The KeyValueStore class implements a journaling dictionary that
     enables rollback through generational updates.
 
-    For optimization the chain of stores can be flattened to limit
-    traversal of the chain.
+    Each checkpoint records the changes made since the previous
+    checkpoint (used for persistence) and a PersistentMap holding the
+    complete state, which shares structure with the previous
+    checkpoint. Lookups, updates and cloning therefore do not depend
+    on the length of the chain of stores.
+
+    By default values are copied on every get and set so callers may
+    modify them freely. A store with ImmutableValues set freezes values
+    when they are written and returns them without copying; it is
+    intended for transaction families that never modify a value
+    retrieved from the store in place. The mode is inherited by clones.
 
     Attributes:
         ReadOnly (bool): Whether or not the store is read only.
         PrevStore (KeyValueStore): The previous checkpoint of the store.
+        ImmutableValues (bool): Whether values are frozen on write and
+            returned without copying.
     """
 
     def __init__(self, prevstore=None, storeinfo=None, readonly=False):
@@ -372,15 +594,26 @@ class KeyValueStore(object):
 
         self.ReadOnly = False
         self.PrevStore = prevstore
+        self.ImmutableValues = prevstore.ImmutableValues \
+            if prevstore is not None else False
         copyfn = copy.copy if readonly else copy.deepcopy
 
-        if storeinfo:
+        if storeinfo and self.ImmutableValues:
+            self._store = dict((k, freeze_value(v))
+                               for k, v in storeinfo['Store'].iteritems())
+            self._deletedkeys = set(storeinfo['DeletedKeys'])
+        elif storeinfo:
             self._store = copyfn(storeinfo['Store'])
             self._deletedkeys = set(storeinfo['DeletedKeys'])
         else:
             self._store = dict()
             self._deletedkeys = set()
 
+        self._state = prevstore._state if prevstore is not None \
+            else PersistentMap()
+        if self._store or self._deletedkeys:
+            self._state = self._state.update(self._store, self._deletedkeys)
+
     def clone_store(self, storeinfo=None, readonly=False):
         """Creates a new checkpoint that can be modified.
 
@@ -415,57 +648,37 @@ class KeyValueStore(object):
         Returns:
             dict: A dictionary with a copy of all items in the store.
         """
-        copyfn = copy.copy if readonly else copy.deepcopy
-
-        storelist = []
-        store = self
-        while store:
-            storelist.insert(0, store)
-            store = store.PrevStore
-
-        result = dict()
-        for store in storelist:
-            # copy our dictionary into the result
-            result.update(copyfn(store._store))
-            # remove the deleted keys from the store
-            for k in store._deletedkeys:
-                result.pop(k, None)
-
-        # it would be possible to flatten the store here since
-        # we've already done all the work; however, that would still
-        # use too much memory. we only want to flatten if we are
-        # flushing previous state
-
-        return result
+        result = self._state.to_dict()
+        if readonly or self.ImmutableValues:
+            return result
+        return copy.deepcopy(result)
 
     def flatten(self):
         """Truncates the journal history at this point.
 
-        Collapse all previous stores into this one and remove any
-        reverse references.
+        The complete state is already held by this checkpoint, so
+        flattening only removes the reverse reference; nodes that are
+        no longer shared with a later checkpoint are released.
         """
         if self.ReadOnly:
-            self._store = self.compose(readonly=True)
-            self._deletedkeys = set()
             self.PrevStore = None
 
     def get(self, key):
-        """Gets the value associated with a key, cascading the
-        request through the chain of stores.
+        """Gets the value associated with a key.
 
         Args:
             key (str): The key to lookup.
 
         Returns:
-            object: The value associated with the key.
+            object: The value associated with the key. The value is a
+                copy unless the store holds immutable values.
         """
-        store = self
-        while store is not None and key not in store._deletedkeys:
-            if key in store._store:
-                return copy.deepcopy(store._store[key])
-
-            store = store.PrevStore
-        raise KeyError('attempt to access missing key', key)
+        try:
+            if self.ImmutableValues:
+                return self._state[key]
+            return copy.deepcopy(self._state[key])
+        except KeyError:
+            raise KeyError('attempt to access missing key', key)
 
     def __getitem__(self, key):
         return self.get(key)
@@ -479,13 +692,19 @@ class KeyValueStore(object):
         Args:
             key (str): The key to set.
             value (str): The value to bind to the key. A deepcopy is
-                made.
+                made, or a frozen copy if the store holds immutable
+                values.
         """
         if self.ReadOnly:
             raise ReadOnlyException("Attempt to modify readonly store")
 
-        self._store[key] = copy.deepcopy(value)
+        if self.ImmutableValues:
+            value = freeze_value(value)
+        else:
+            value = copy.deepcopy(value)
+        self._store[key] = value
         self._deletedkeys.discard(key)
+        self._state = self._state.set(key, value)
 
     def __setitem__(self, key, value):
         self.set(key, value)
@@ -504,12 +723,13 @@ class KeyValueStore(object):
 
         self._store.pop(key, None)
         self._deletedkeys.add(key)
+        self._state = self._state.delete(key)
 
     def __delitem__(self, key):
         self.delete(key)
 
     def has_key(self, key):
-        """Walks the chain to determine if the key exists in the store.
+        """Determines if the key exists in the store.
 
         Args:
             key (str): The key to search for.
@@ -517,13 +737,7 @@ class KeyValueStore(object):
         Returns:
             bool: Whether or not the key exists in the store.
         """
-        if key in self._store:
-            return True
-
-        if self.PrevStore and key not in self._deletedkeys:
-            return key in self.PrevStore
-
-        return False
+        return key in self._state
 
     def _keys(self):
         """Computes the set of valid keys used in the store.
@@ -531,19 +745,7 @@ class KeyValueStore(object):
         Returns:
             set: The set of valid keys in the store.
         """
-        # construct and reverse historical references
-        stores = []
-        store = self
-        while store is not None:
-            stores.append(store)
-            store = store.PrevStore
-        stores.reverse()
-        # reconstruct history
-        retval = set()
-        for store in stores:
-            retval -= store._deletedkeys
-            retval |= set(store._store.keys())
-        return retval
+        return set(self._state.iterkeys())
 
     def keys(self):
         """Computes the set of valid keys used in the store.
@@ -551,7 +753,7 @@ class KeyValueStore(object):
         Returns:
             list: A list of valid keys in the store.
         """
-        return list(self._keys())
+        return self._state.keys()
 
     def __iter__(self):
         """Create an iterator for the keys.
@@ -574,16 +776,7 @@ class KeyValueStore(object):
         Returns:
             bool: Whether the key exists in the store.
         """
-        retval = False
-        store = self
-        while store is not None:
-            if key in store._store:
-                retval = True
-                break
-            if key in self._deletedkeys:
-                break
-            store = store.PrevStore
-        return retval
+        return key in self._state
 
     def dump(self, readonly=False):
         """Returns a dict containing information about the store.
@@ -591,7 +784,8 @@ class KeyValueStore(object):
         Returns:
             dict: A dict containing information about the store.
         """
-        copyfn = copy.copy if readonly else copy.deepcopy
+        copyfn = copy.copy if readonly or self.ImmutableValues \
+            else copy.deepcopy
 
         result = dict()
         result['Store'] = copyfn(self._store)
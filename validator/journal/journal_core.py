@@ -17,22 +17,28 @@ import logging
 from threading import RLock
 import time
 from collections import OrderedDict
+from collections import deque
 import os
+import random
 
 from gossip import common
 from gossip import event_handler
+from gossip import signed_object
 from gossip.message_dispatcher import MessageDispatcher
 from gossip import stats
 
 from journal import journal_store
 from journal import transaction
 from journal import transaction_block
+from journal.dependency_graph import DependencyGraph
 from journal.global_store_manager import GlobalStoreManager
 from journal.messages import journal_debug
 from journal.messages import journal_transfer
 from journal.messages import transaction_block_message
 from journal.messages import transaction_message
+from journal.transaction_executor import TransactionExecutor
 
+from sawtooth.exceptions import InvalidTransactionError
 from sawtooth.exceptions import NotAvailableException
 from sawtooth_validator.consensus.consensus_base import Consensus
 
@@ -49,8 +55,10 @@ class Journal(object):
             per block.
         maximum_transactions_per_block (int): Maximum number of transactions
             per block.
-        missing_request_interval (float): Time in seconds between sending
-            requests for a missing transaction block.
+        missing_request_interval (float): Maximum time in seconds between
+            sending requests for a missing transaction or block.
+        missing_request_retry_interval (float): Time in seconds before
+            the first repeated request for a missing transaction or block.
         block_retry_interval (float): Time in seconds between retrying
             block validations that
         start_time (float): The initialization time of the journal in
@@ -78,20 +86,36 @@ class Journal(object):
             to call when processing a block test.
         pending_transactions (dict): A dict of pending, unprocessed
             transactions.
+        transaction_enqueue_time (float): The time at which the oldest
+            transaction that has not been placed in a block arrived.
         transaction_store (JournalStore): A dict-like object representing
             the persisted copy of the transaction store.
         block_store (JournalStore): A dict-like object representing the
             persisted copy of the block store.
         chain_store (JournalStore): A dict-like object representing the
-            persisted copy of the chain store.
+            persisted copy of the chain store, it holds the head of the
+            committed chain and an index of the committed blocks by
+            height.
         local_store (JournalStore): A dict-like object representing the
             persisted local state of the journal.
         requested_transactions (dict): A dict of transactions which are
             not in the local cache, the details of which have been
-            requested from peers.
+            requested from peers, mapped to the time the request may be
+            repeated and the interval before it. A request that is not
+            repeated expires.
         requested_blocks (dict): A dict of blocks which are not in the
             local cache, the details of which have been requested
-            from peers.
+            from peers, mapped like requested_transactions.
+        transaction_gossip (str): How new transactions are sent to peers,
+            'push' forwards every transaction to every peer, 'inventory'
+            periodically announces the identifiers of new transactions
+            and peers request the ones they lack.
+        inventory_interval (float): Time in seconds between transaction
+            announcements.
+        inventory_request_timeout (float): Time in seconds to wait for a
+            requested transaction before requesting it from another peer.
+        maximum_inventory_size (int): Maximum number of transaction
+            identifiers in an announcement or request.
         most_recent_committed_block_id (str): The block ID of the most
             recently committed block.
         pending_block (TransactionBlock): The constructed
@@ -114,7 +138,11 @@ class Journal(object):
                  max_transactions_per_block=None,
                  max_txn_age=None,
                  data_directory=None,
-                 store_type=None):
+                 store_type=None,
+                 state_checkpoint_interval=None,
+                 parallel_validation_workers=None,
+                 store_cache_sizes=None,
+                 transaction_gossip=None):
         """Constructor for the Journal class.
 
         Args:
@@ -160,8 +188,11 @@ class Journal(object):
         else:
             self.maximum_transactions_per_block = 1000
 
-        # Time between sending requests for a missing transaction block
+        # Time between sending requests for a missing transaction block,
+        # the first request is repeated after missing_request_retry_interval
+        # and the interval doubles up to missing_request_interval
         self.missing_request_interval = 30.0
+        self.missing_request_retry_interval = 2.0
 
         # Time between sending requests for a missing transaction block
         self.block_retry_interval = 10.0
@@ -185,21 +216,88 @@ class Journal(object):
         self._txn_lock = RLock()
         self.pending_transactions = OrderedDict()
         self.transaction_enqueue_time = None
+        self._dependency_graph = DependencyGraph(
+            self.missing_request_interval)
+
+        # the block candidate is the validated prefix of the pending
+        # transactions applied to a speculative copy of the global
+        # store, it is extended as transactions arrive and discarded
+        # when the head of the chain changes
+        self._candidate_base_id = None
+        self._candidate_store = None
+        self._candidate_txns = []
+        self._candidate_set = set()
+        self._candidate_ready = deque()
+        self._candidate_arrivals = []
+
+        # the pending state is a speculative copy of the global store
+        # with every valid pending transaction applied, submitted
+        # transactions are checked against it. it is brought up to date
+        # when it is used and rebuilt when the head of the chain changes.
+        # transactions accepted from local clients are applied as well
+        # while they wait in the incoming queue to be dispatched
+        self._pending_state_base_id = None
+        self._pending_state = None
+        self._pending_state_arrivals = []
+        self._pending_state_applied = set()
+        self._pending_state_submitted = OrderedDict()
+
+        # transactions in blocks received from peers are validated in a
+        # pool of worker processes when more than one worker is configured
+        self._transaction_executor = TransactionExecutor(
+            int(parallel_validation_workers or 0))
 
         self.transaction_store = None
         self.block_store = None
         self.chain_store = None
         self.local_store = None
         self.global_store_map = None
-        self.open_databases(store_type, data_directory)
+        self.cached_databases = {}
+        self.open_databases(store_type, data_directory,
+                            state_checkpoint_interval, store_cache_sizes)
+
+        # the number of blocks in the committed chain, the chain store
+        # maps the height of each committed block to its identifier and
+        # back
+        self._chain_length = 0
 
         self.requested_transactions = {}
         self.requested_blocks = {}
+        self._missing_txns = []
+        self._missing_blocks = []
+
+        # the peer each missing transaction and block was last requested
+        # from in a batch, its reply is not forwarded
+        self._txn_requested_from = {}
+        self._block_requested_from = {}
 
         self.next_block_retry = time.time() + self.block_retry_interval
 
+        if transaction_gossip not in (None, 'push', 'inventory'):
+            raise ValueError(
+                'unknown transaction gossip {0}'.format(transaction_gossip))
+        self.transaction_gossip = transaction_gossip or 'push'
+        self.inventory_interval = 0.5
+        self.inventory_request_timeout = 5.0
+        self.maximum_inventory_size = 500
+
+        # the transactions to announce with the peers known to have them,
+        # and the transactions requested from a peer in the order their
+        # requests time out
+        self._inventory = OrderedDict()
+        self._inventory_requests = OrderedDict()
+
+        # the most recent state snapshot served to peers, they request it
+        # in chunks
+        self._snapshot = None
+        self.next_inventory = time.time() + self.inventory_interval
+
         self.dispatcher.on_heartbeat += self._trigger_retry_blocks
         self.dispatcher.on_heartbeat += self._check_claim_block
+        self.dispatcher.on_heartbeat += self._request_missing_dependencies
+        self.dispatcher.on_heartbeat += self._announce_transactions
+        self.dispatcher.on_heartbeat += self._send_missing_requests
+        self.dispatcher.on_heartbeat += self._expire_requests
 
         self.most_recent_committed_block_id = common.NullIdentifier
         self.pending_block = None
@@ -226,30 +324,40 @@ class Journal(object):
         postfix = '.shelf'
         if store_type in ['lmdb', 'cached-lmdb']:
             postfix = '.lmdb'
+        if store_type in ['cbor-lmdb']:
+            postfix = '.cbor.lmdb'
         if store_type in ['dbm']:
             postfix = '.dbm'
         return prefix + '_' + store_name + postfix
 
-    def open_databases(self, store_type, data_directory):
+    def open_databases(self, store_type, data_directory,
+                       state_checkpoint_interval=None,
+                       store_cache_sizes=None):
         # this flag indicates whether we should create a completely new
         # database file or reuse an existing file
         store_type = 'shelf' if store_type is None else store_type
-        if store_type in ['shelf', 'cached-shelf', 'lmdb', 'cached-lmdb']:
+        if store_type in ['shelf', 'cached-shelf', 'lmdb', 'cached-lmdb',
+                          'cbor-lmdb']:
             def get_store(db_name, db_type):
                 file_name = self.get_store_file(self.local_node, db_name,
                                                 data_directory, db_type)
                 db_flag = 'c' if os.path.isfile(file_name) else 'n'
-                db_cls = None
+                db = None
                 if db_type in ['shelf', 'cached-shelf']:
                     from journal.database import shelf_database
-                    db_cls = shelf_database.ShelfDatabase
+                    db = shelf_database.ShelfDatabase(file_name, db_flag)
                 elif db_type in ['lmdb', 'cached-lmdb']:
                     from journal.database import lmdb_database
-                    db_cls = lmdb_database.LMDBDatabase
-                db = db_cls(file_name, db_flag)
+                    db = lmdb_database.LMDBDatabase(file_name, db_flag)
+                elif db_type in ['cbor-lmdb']:
+                    from journal.database import cbor_lmdb_database
+                    db = cbor_lmdb_database.CBORLMDBDatabase(
+                        file_name, db_flag, self.dispatcher.unpack_message)
                 if db_type in ['cached-shelf', 'cached-lmdb']:
                     from journal.database.database import CachedDatabase
-                    db = CachedDatabase(db)
+                    cache_limit = (store_cache_sizes or {}).get(db_name)
+                    db = CachedDatabase(db, int(cache_limit or 1000))
+                    self.cached_databases[db_name] = db
                 return journal_store.JournalStore(db)
 
             self.transaction_store = get_store('txn', store_type)
@@ -259,11 +367,21 @@ class Journal(object):
         else:
             raise KeyError("%s is not a supported StoreType", store_type)
 
-        # Set up the global store and transaction handlers
+        # Set up the global store and transaction handlers, the state is
+        # kept in lmdb along with the other stores unless a dbm state
+        # file from an earlier run exists
+        gsm_type = 'dbm'
         gsm_fname = self.get_store_file(self.local_node, 'state',
-                                        data_directory, 'dbm')
+                                        data_directory, gsm_type)
+        if store_type in ['lmdb', 'cached-lmdb', 'cbor-lmdb'] and \
+                not os.path.isfile(gsm_fname):
+            gsm_type = 'lmdb'
+            gsm_fname = self.get_store_file(self.local_node, 'state',
+                                            data_directory, gsm_type)
         db_flag = 'c' if os.path.isfile(gsm_fname) else 'n'
-        self.global_store_map = GlobalStoreManager(gsm_fname, db_flag)
+        self.global_store_map = GlobalStoreManager(gsm_fname, db_flag,
+                                                   gsm_type,
+                                                   state_checkpoint_interval)
 
     @property
     def committed_block_count(self):
@@ -317,6 +435,8 @@ class Journal(object):
         self.chain_store.close()
         self.local_store.close()
 
+        self._transaction_executor.close()
+
     def add_transaction_store(self, family):
         """Add a transaction type-specific store to the global store.
 
@@ -325,6 +445,7 @@ class Journal(object):
         """
         tname = family.TransactionTypeName
         tstore = family.TransactionStoreType()
+        tstore.ImmutableValues = not family.MutatesStoreValues
         self.global_store_map.add_transaction_store(tname, tstore)
 
     def get_transaction_store(self, family, block_id):
@@ -362,6 +483,49 @@ class Journal(object):
         """
         return self.block_store.get(self.most_recent_committed_block_id)
 
+    @property
+    def committed_chain_length(self):
+        """Returns the number of blocks in the committed chain.
+
+        Returns:
+            int: The number of committed blocks.
+        """
+        return self._chain_length
+
+    def committed_block_id(self, height):
+        """Returns the identifier of the committed block at a height, the
+        genesis block is at height zero.
+
+        Args:
+            height (int): The height of the block.
+
+        Returns:
+            str: The block identifier or None if there is no committed
+                block at the height.
+        """
+        with self._txn_lock:
+            if 0 <= height < self._chain_length:
+                return str(self.chain_store.get(
+                    'ChainIndex/{0}'.format(height)))
+            return None
+
+    def committed_block_height(self, block_id):
+        """Returns the height of a block in the committed chain.
+
+        Args:
+            block_id (str): The identifier of the block.
+
+        Returns:
+            int: The height of the block or None if the block is not
+                committed.
+        """
+        with self._txn_lock:
+            height = self.chain_store.get('ChainHeight/{0}'.format(block_id))
+            if height is not None and \
+                    self.committed_block_id(height) == block_id:
+                return height
+            return None
+
     def committed_block_ids(self, count=0):
         """Returns the list of block identifiers starting from the
         most recently committed block.
@@ -372,17 +536,59 @@ class Journal(object):
         Returns:
             list: A list of committed block ids.
         """
-        if count == 0:
-            count = len(self.block_store)
+        with self._txn_lock:
+            length = self._chain_length
+            if count == 0 or count > length:
+                count = length
+            return [self.committed_block_id(h)
+                    for h in xrange(length - 1, length - count - 1, -1)]
 
-        block_ids = []
+    def committed_block_range(self, height, count):
+        """Returns the identifiers of the committed blocks starting from
+        a height, oldest first.
 
-        blkid = self.most_recent_committed_block_id
-        while blkid != common.NullIdentifier and len(block_ids) < count:
-            block_ids.append(blkid)
-            blkid = self.block_store[blkid].PreviousBlockID
+        Args:
+            height (int): The height of the first block.
+            count (int): The maximum number of identifiers to return.
 
-        return block_ids
+        Returns:
+            list: A list of committed block ids.
+        """
+        with self._txn_lock:
+            end = min(height + count, self._chain_length)
+            return [self.committed_block_id(h)
+                    for h in xrange(max(height, 0), end)]
+
+    def _index_committed_block(self, block_id, previous_block_id):
+        height = 0
+        if previous_block_id != common.NullIdentifier:
+            height = self.committed_block_height(previous_block_id) + 1
+        self.chain_store['ChainIndex/{0}'.format(height)] = block_id
+        self.chain_store['ChainHeight/{0}'.format(block_id)] = height
+        self.chain_store['ChainLength'] = height + 1
+        self._chain_length = height + 1
+
+    def _unindex_committed_block(self, block_id):
+        height = self._chain_length - 1
+        del self.chain_store['ChainIndex/{0}'.format(height)]
+        del self.chain_store['ChainHeight/{0}'.format(block_id)]
+        self.chain_store['ChainLength'] = height
+        self._chain_length = height
+
+    def _rebuild_chain_index(self, block_ids):
+        """
+        Replace the index of the committed chain, block_ids lists the
+        committed blocks from the genesis block to the head.
+        """
+        self.chain_store.begin_batch()
+        try:
+            self._chain_length = 0
+            previous = common.NullIdentifier
+            for blkid in block_ids:
+                self._index_committed_block(blkid, previous)
+                previous = blkid
+        finally:
+            self.chain_store.commit_batch()
 
     def compute_chain_root(self):
         """
@@ -436,9 +642,77 @@ class Journal(object):
             self.global_store_map.get_block_store(head)
             logger.info('commit head: %s', head)
             self.restored = True
+
+            # the chain index is rebuilt when it is missing, written by an
+            # older version, or it does not end at the head
+            self._chain_length = int(self.chain_store.get('ChainLength') or 0)
+            if self.committed_block_id(self._chain_length - 1) != head:
+                logger.info('rebuild the committed chain index')
+                block_ids = []
+                blkid = head
+                while blkid != common.NullIdentifier:
+                    block_ids.append(blkid)
+                    blkid = self.block_store[blkid].PreviousBlockID
+                block_ids.reverse()
+                self._rebuild_chain_index(block_ids)
         else:
             logger.warn('unable to restore ledger state')
 
+    def get_snapshot(self, block_id):
+        """Returns the serialized state of a committed block for a peer
+        that syncs from a snapshot.
+
+        Args:
+            block_id (str): The identifier of the block.
+
+        Returns:
+            bytes: The serialized state.
+        """
+        with self._txn_lock:
+            if self._snapshot is None or self._snapshot[0] != block_id:
+                self._snapshot = (
+                    block_id, self.global_store_map.snapshot(block_id))
+            return self._snapshot[1]
+
+    def install_snapshot(self, blocks, snapshot):
+        """Installs the state of a committed block received from a peer,
+        the blocks leading to it are recorded as committed without
+        replaying their transactions, which are not retrieved.
+
+        Args:
+            blocks (list): The committed blocks from the genesis block
+                to the block of the snapshot.
+            snapshot (bytes): The serialized state of the last block.
+
+        Raises:
+            ValueError: If the blocks do not form a valid chain or the
+                snapshot is not the state of the last block.
+        """
+        previous = common.NullIdentifier
+        for blk in blocks:
+            if blk.PreviousBlockID != previous:
+                raise ValueError('blkid: {0} - does not follow {1}'.format(
+                    blk.Identifier[:8], previous[:8]))
+            previous = blk.Identifier
+        if not all(signed_object.verify_signatures(blocks)):
+            raise ValueError('invalid block signature in snapshot chain')
+
+        with self._txn_lock:
+            self.global_store_map.install_snapshot(previous, snapshot)
+            for blk in blocks:
+                blk.Status = transaction_block.Status.valid
+                self.block_store[blk.Identifier] = blk
+
+            self.most_recent_committed_block_id = previous
+            self._rebuild_chain_index([b.Identifier for b in blocks])
+            self.chain_store['MostRecentBlockID'] = previous
+            self.JournalStats.PreviousBlockID.Value = previous
+            self.JournalStats.CommittedBlockCount.Value = \
+                self.committed_block_count + 1
+
+        logger.info('installed snapshot of block %s with %d blocks',
+                    previous[:8], len(blocks))
+
     def initialization_complete(self):
         """Processes all invocations that arrived while the ledger was
         being initialized.
@@ -497,9 +771,17 @@ class Journal(object):
                 self.initial_transactions.append(txn)
                 return
 
+            # a locally submitted transaction has been dispatched, from
+            # now on the pending list holds it
+            submitted = self._pending_state_submitted.pop(txn.Identifier,
+                                                          None)
+
             # if we already have the transaction there is nothing to do
             if txn.Identifier in self.transaction_store:
                 assert self.transaction_store[txn.Identifier]
+                if submitted and \
+                        txn.Identifier in self._pending_state_applied:
+                    self._invalidate_pending_state()
                 return
 
             # add it to the transaction store
@@ -511,11 +793,25 @@ class Journal(object):
                     pending[txn.Identifier] = True
                     pending.update(self.pending_transactions)
                     self.pending_transactions = pending
+                    self._invalidate_block_candidate()
+                    self._invalidate_pending_state()
                 else:
                     self.pending_transactions[txn.Identifier] = True
+                    self._candidate_arrivals.append(txn.Identifier)
+                    if self._pending_state is not None:
+                        self._pending_state_arrivals.append(txn.Identifier)
                 if self.transaction_enqueue_time is None:
                     self.transaction_enqueue_time = time.time()
 
+                self._add_to_dependency_graph(txn)
+                if self._dependency_graph.dependents(txn.Identifier) and \
+                        self._dependency_graph.has_cycle(txn.Identifier):
+                    logger.warn('txnid: %s - dependency cycle, dropping',
+                                txn.Identifier[:8])
+                    self._discard_transaction(txn.Identifier)
+            elif submitted and txn.Identifier in self._pending_state_applied:
+                self._invalidate_pending_state()
+
             # if this is a transaction we requested, then remove it from
             # the list and look for any blocks that might be completed
             # as a result of processing the transaction
@@ -523,6 +819,7 @@ class Journal(object):
                 logger.info('txnid %s - catching up',
                             txn.Identifier[:8])
                 del self.requested_transactions[txn.Identifier]
+                self._txn_requested_from.pop(txn.Identifier, None)
                 txn.InBlock = "Uncommitted"
                 self.transaction_store[txn.Identifier] = txn
 
@@ -553,8 +850,11 @@ class Journal(object):
                      tblock.Identifier[:8])
 
         # Make sure this is a valid block, for now this will just check the
-        # signature... more later
-        if not tblock.verify_signature():
+        # signature... more later. The signatures of the transactions we
+        # already have are verified in the same batch so they are cached
+        # when the block is tested
+        txns = tblock.known_transactions(self)
+        if not signed_object.verify_signatures([tblock] + txns)[0]:
             logger.warn('blkid: %s - invalid block received from %s',
                         tblock.Identifier,
                         tblock.OriginatorID)
@@ -583,6 +883,7 @@ class Journal(object):
         # If this is a block we requested, then remove it from the list
         if tblock.Identifier in self.requested_blocks:
             del self.requested_blocks[tblock.Identifier]
+            self._block_requested_from.pop(tblock.Identifier, None)
 
         # Make sure that we have not already processed this block
         if tblock.Identifier in self.block_store:
@@ -634,8 +935,10 @@ class Journal(object):
         """Requests neighbors to send a transaction block.
 
         This method is called when one block references another block
-        that is not currently in the local cache. Only send the request
-        periodically to avoid spamming the network with duplicate requests.
+        that is not currently in the local cache. Requests are batched
+        and sent to a single peer on the next heartbeat, a block that is
+        still missing is requested again after an interval that doubles
+        up to missing_request_interval.
 
         Args:
             block_id (str): The identifier of the missing block.
@@ -646,20 +949,14 @@ class Journal(object):
         """
         if exceptions is None:
             exceptions = []
-        now = time.time()
 
-        if block_id in self.requested_blocks and now < self.requested_blocks[
-                block_id]:
+        if not self._schedule_request(self.requested_blocks, block_id):
             return
 
-        self.requested_blocks[block_id] = now + self.missing_request_interval
-
         # if the request for the missing block came from another node, then
         # we need to reuse the request or we'll process multiple copies
         if not request:
-            request = transaction_block_message.BlockRequestMessage(
-                {'BlockID': block_id})
-            self.gossip.forward_message(request, exceptions=exceptions)
+            self._missing_blocks.append(block_id)
         else:
             self.gossip.forward_message(request,
                                         exceptions=exceptions,
@@ -669,8 +966,10 @@ class Journal(object):
         """Requests that neighbors send a transaction.
 
         This method is called when a block references a transaction
-        that is not currently in the local cache. Only send the request
-        periodically to avoid spamming the network with duplicate requests.
+        that is not currently in the local cache. Requests are batched
+        and sent to a single peer on the next heartbeat, a transaction
+        that is still missing is requested again after an interval that
+        doubles up to missing_request_interval.
 
         Args:
             txn_id (str): The identifier of the missing transaction.
@@ -679,28 +978,18 @@ class Journal(object):
             request (message.Message): A previously initialized message for
                 sending the request; avoids duplicates.
         """
-        logger.info('txnid: %s - missing_txn called', txn_id[:8])
+        logger.debug('txnid: %s - missing_txn called', txn_id[:8])
 
-        now = time.time()
-
-        if txn_id in self.requested_transactions and now < \
-                self.requested_transactions[txn_id]:
-            logger.info('txnid: %s - already in RequestedTxn', txn_id[:8])
+        if not self._schedule_request(self.requested_transactions, txn_id):
+            logger.debug('txnid: %s - already in RequestedTxn', txn_id[:8])
             return
 
-        self.requested_transactions[txn_id] = now + \
-            self.missing_request_interval
-
         self.JournalStats.MissingTxnRequestCount.increment()
 
         # if the request for the missing block came from another node, then
         # we need to reuse the request or we'll process multiple copies
         if not request:
-            logger.info('txnid: %s - new request from same node(%s)',
-                        txn_id[:8], self.local_node.Name)
-            request = transaction_message.TransactionRequestMessage(
-                {'TransactionID': txn_id})
-            self.gossip.forward_message(request, exceptions=exceptions)
+            self._missing_txns.append(txn_id)
         else:
             logger.info('txnid: %s - new request from another node(%s)  ',
                         txn_id[:8],
@@ -709,6 +998,148 @@ class Journal(object):
                                         exceptions=exceptions,
                                         initialize=False)
 
+    def _schedule_request(self, requested, item_id):
+        """
+        Record a request for a missing transaction or block, returns False
+        if the previous request for it has not timed out yet.
+        """
+        now = time.time()
+        (nexttime, interval) = requested.get(item_id, (0.0, None))
+        if now < nexttime:
+            return False
+
+        if interval is None:
+            interval = self.missing_request_retry_interval
+        else:
+            interval = min(interval * 2, self.missing_request_interval)
+        requested[item_id] = (now + interval, interval)
+        return True
+
+    def _send_missing_requests(self, now):
+        """
+        Send the batched requests for missing transactions and blocks to
+        a peer, each repeated request goes to a randomly chosen peer so
+        that a peer lacking an item does not stall it.
+        """
+        with self._txn_lock:
+            if not self._missing_txns and not self._missing_blocks:
+                return
+            (txn_ids, self._missing_txns) = (self._missing_txns, [])
+            (block_ids, self._missing_blocks) = (self._missing_blocks, [])
+
+        peers = self.gossip.peer_id_list()
+        if not peers:
+            logger.debug('no peers to request %d transactions and %d '
+                         'blocks from', len(txn_ids), len(block_ids))
+            return
+
+        size = self.maximum_inventory_size
+        for start in xrange(0, len(txn_ids), size):
+            batch = txn_ids[start:start + size]
+            peer = random.choice(peers)
+            with self._txn_lock:
+                for txn_id in batch:
+                    self._txn_requested_from[txn_id] = peer
+            request = transaction_message.TransactionBatchRequestMessage(
+                {'TransactionIDs': batch})
+            self.gossip.send_message(request, peer)
+        for start in xrange(0, len(block_ids), size):
+            batch = block_ids[start:start + size]
+            peer = random.choice(peers)
+            with self._txn_lock:
+                for block_id in batch:
+                    self._block_requested_from[block_id] = peer
+            request = transaction_block_message.BlockBatchRequestMessage(
+                {'BlockIDs': batch})
+            self.gossip.send_message(request, peer)
+
+    def _expire_requests(self, now):
+        """
+        Forget the requests for missing transactions and blocks that were
+        not repeated within missing_request_interval of falling due, the
+        transactions and blocks that needed them were dropped or arrived
+        by other means
+        """
+        with self._txn_lock:
+            for (requested, requested_from) in (
+                    (self.requested_transactions, self._txn_requested_from),
+                    (self.requested_blocks, self._block_requested_from)):
+                expired = [item_id for (item_id, (nexttime, _))
+                           in requested.iteritems()
+                           if now > nexttime + self.missing_request_interval]
+                for item_id in expired:
+                    del requested[item_id]
+                    requested_from.pop(item_id, None)
+
+    def is_requested_transaction(self, txn_id, node_id):
+        """Returns True if a transaction was last requested in a batch
+        from a node, the reply from that node is not forwarded.
+
+        Args:
+            txn_id (str): The identifier of the transaction.
+            node_id (str): Identifier of the node that sent it.
+        """
+        return self._txn_requested_from.get(txn_id) == node_id
+
+    def is_requested_block(self, block_id, node_id):
+        """Returns True if a block was last requested in a batch from a
+        node, the reply from that node is not forwarded.
+
+        Args:
+            block_id (str): The identifier of the block.
+            node_id (str): Identifier of the node that sent it.
+        """
+        return self._block_requested_from.get(block_id) == node_id
+
+    def announce_transaction(self, txn_id, known_by=None):
+        """Queues a new transaction for the next announcement to peers.
+
+        Args:
+            txn_id (str): The identifier of the transaction.
+            known_by (str): Identifier of a node known to have the
+                transaction, it is not announced to that node.
+        """
+        with self._txn_lock:
+            self._inventory_requests.pop(txn_id, None)
+            known = self._inventory.setdefault(txn_id, set())
+            if known_by is not None:
+                known.add(known_by)
+
+    def request_transactions(self, txn_ids, node_id):
+        """Requests the transactions announced by a peer that are not in
+        the local cache and not already requested from another peer.
+
+        Args:
+            txn_ids (list): The identifiers of the announced transactions.
+            node_id (str): Identifier of the node that announced them.
+        """
+        with self._txn_lock:
+            now = time.time()
+            while self._inventory_requests:
+                txn_id, deadline = next(self._inventory_requests.iteritems())
+                if deadline > now:
+                    break
+                del self._inventory_requests[txn_id]
+
+            wanted = []
+            for txn_id in txn_ids:
+                if txn_id in self._inventory:
+                    self._inventory[txn_id].add(node_id)
+                    continue
+                if txn_id in self._inventory_requests or \
+                        txn_id in self.transaction_store:
+                    continue
+                self._inventory_requests[txn_id] = \
+                    now + self.inventory_request_timeout
+                wanted.append(txn_id)
+
+        for start in xrange(0, len(wanted), self.maximum_inventory_size):
+            request = transaction_message.TransactionBatchRequestMessage(
+                {'TransactionIDs':
+                 wanted[start:start + self.maximum_inventory_size]})
+            self.gossip.send_message(request, node_id)
+        self.JournalStats.InventoryTxnRequestCount.increment(len(wanted))
+
     def build_block(self, genesis=False):
         """Builds the next transaction block for the ledger.
 
@@ -781,6 +1212,7 @@ class Journal(object):
         try:
             self._commit_block(tblock)
             if not self.initial_load:
+                self._update_pending_state()
                 self.pending_block = self.build_block()
         except Exception as e:
             logger.error("blkid: %s - Error advancing block chain: %s",
@@ -845,6 +1277,7 @@ class Journal(object):
 
             # move the new blocks from the orphaned list to the committed list
             self._commit_block_chain(tblock.Identifier, fork_id)
+            self._update_pending_state()
             self.pending_block = self.build_block()
         except Exception as e:
             logger.exception("blkid: %s - (fork) error resolving fork",
@@ -1013,6 +1446,32 @@ class Journal(object):
                          retry_block.Identifier[:8])
             self._handleblock(retry_block)
 
+    def _announce_transactions(self, now):
+        """
+        Send each peer the identifiers of the new transactions it is not
+        known to have.
+        """
+        if now < self.next_inventory:
+            return
+        self.next_inventory = now + self.inventory_interval
+
+        with self._txn_lock:
+            if not self._inventory:
+                return
+            inventory = self._inventory
+            self._inventory = OrderedDict()
+
+        for peer_id in self.gossip.peer_id_list():
+            txn_ids = [t for (t, known) in inventory.iteritems()
+                       if peer_id not in known]
+            for start in xrange(0, len(txn_ids), self.maximum_inventory_size):
+                msg = transaction_message.TransactionInventoryMessage(
+                    {'TransactionIDs':
+                     txn_ids[start:start + self.maximum_inventory_size]})
+                self.gossip.send_message(msg, peer_id)
+            self.JournalStats.InventoryTxnAnnounceCount.increment(
+                len(txn_ids))
+
     def _trigger_retry_blocks(self, now):
         if time.time() > self.next_block_retry:
             self.next_block_retry = time.time() + self.block_retry_interval
@@ -1058,21 +1517,35 @@ class Journal(object):
             assert tblock.Status == transaction_block.Status.valid
 
             # Remove all of the newly committed transactions from the
-            # pending list and put them in the committed list
-            for txnid in tblock.TransactionIDs:
-                assert txnid in self.transaction_store
-                if txnid in self.pending_transactions:
-                    del self.pending_transactions[txnid]
+            # pending list and put them in the committed list, the status
+            # updates are written in one batch
+            self.transaction_store.begin_batch()
+            try:
+                for txnid in tblock.TransactionIDs:
+                    assert txnid in self.transaction_store
+                    if txnid in self.pending_transactions:
+                        del self.pending_transactions[txnid]
+                    self._dependency_graph.resolve(txnid)
 
-                txn = self.transaction_store[txnid]
-                txn.Status = transaction.Status.committed
-                txn.InBlock = tblock.Identifier
-                self.transaction_store[txnid] = txn
+                    txn = self.transaction_store[txnid]
+                    txn.Status = transaction.Status.committed
+                    txn.InBlock = tblock.Identifier
+                    self.transaction_store[txnid] = txn
+            finally:
+                self.transaction_store.commit_batch()
 
             # Update the head of the chain
             self.most_recent_committed_block_id = tblock.Identifier
-            self.chain_store['MostRecentBlockID'] = \
-                self.most_recent_committed_block_id
+            self._invalidate_block_candidate()
+            self._invalidate_pending_state()
+            self.chain_store.begin_batch()
+            try:
+                self._index_committed_block(tblock.Identifier,
+                                            tblock.PreviousBlockID)
+                self.chain_store['MostRecentBlockID'] = \
+                    self.most_recent_committed_block_id
+            finally:
+                self.chain_store.commit_batch()
             self.JournalStats.PreviousBlockID.Value = \
                 self.most_recent_committed_block_id
 
@@ -1114,8 +1587,13 @@ class Journal(object):
 
             # move the head of the chain back
             self.most_recent_committed_block_id = block.PreviousBlockID
-            self.chain_store['MostRecentBlockID'] = \
-                self.most_recent_committed_block_id
+            self.chain_store.begin_batch()
+            try:
+                self._unindex_committed_block(blockid)
+                self.chain_store['MostRecentBlockID'] = \
+                    self.most_recent_committed_block_id
+            finally:
+                self.chain_store.commit_batch()
 
             # this bizarre bit of code is intended to preserve the ordering of
             # transactions, where all committed transactions occur before
@@ -1135,6 +1613,15 @@ class Journal(object):
 
             pending.update(self.pending_transactions)
             self.pending_transactions = pending
+            self._invalidate_block_candidate()
+            self._invalidate_pending_state()
+
+            # transactions that depended on the block are waiting again
+            self._dependency_graph.clear()
+            for txnid in self.pending_transactions.iterkeys():
+                txn = self.transaction_store.get(txnid)
+                if txn:
+                    self._add_to_dependency_graph(txn)
 
             # update stats
             self.JournalStats.CommittedBlockCount.Value = \
@@ -1163,19 +1650,15 @@ class Journal(object):
 
             # apply the transactions
             try:
-                for txnid in tblock.TransactionIDs:
-                    txn = self.transaction_store[txnid]
-                    txnstore = teststore.get_transaction_store(
-                        txn.TransactionTypeName)
-                    if not txn.is_valid(txnstore):
-                        return None
-
-                    txn.apply(txnstore)
+                txns = [self.transaction_store[txnid]
+                        for txnid in tblock.TransactionIDs]
+                if not self._transaction_executor.execute(txns, teststore):
+                    return None
             except:
-                logger.exception('txnid: %s - unexpected exception '
+                logger.exception('blkid: %s - unexpected exception '
                                  'when testing transaction block '
                                  'validity.',
-                                 txnid[:8])
+                                 tblock.Identifier[:8])
                 return None
 
             return teststore
@@ -1189,10 +1672,10 @@ class Journal(object):
         :param depth int: depth in the current chain to search, 0 implies all
         """
 
-        blockids = set(self.committed_block_ids(0))
         forkid = tblock.PreviousBlockID
         while True:
-            if forkid == common.NullIdentifier or forkid in blockids:
+            if forkid == common.NullIdentifier or \
+                    self.committed_block_height(forkid) is not None:
                 return forkid
 
             assert forkid in self.block_store
@@ -1200,154 +1683,307 @@ class Journal(object):
 
         return None
 
-    def _prepare_transaction_list(self, maxcount=0):
+    def _is_committed(self, txnid):
         """
-        Prepare an ordered list of valid transactions that can be included in
-        the next consensus round
+        Determine whether a transaction has been committed
+        """
+        txn = self.transaction_store.get(txnid)
+        return txn is not None and txn.Status == transaction.Status.committed
 
-        Returns:
-            list of Transaction.Transaction
+    def _add_to_dependency_graph(self, txn):
+        """
+        Add a pending transaction to the dependency graph along with the
+        dependencies that have not been committed
         """
+        self._dependency_graph.add(
+            txn.Identifier,
+            [d for d in txn.Dependencies if not self._is_committed(d)])
 
+    def _discard_transaction(self, txnid):
+        """
+        Remove a transaction that will never be valid, along with every
+        pending transaction that depends on it
+        """
         with self._txn_lock:
-            # generate a list of valid transactions to place in the new block
-            addtxns = []
-            deltxns = []
-            store = self.global_store.clone_block()
-            for txnid in self.pending_transactions.iterkeys():
-                txn = self.transaction_store[txnid]
-                if txn:
-                    self._prepare_transaction(addtxns, deltxns, store, txn)
+            removed = self._dependency_graph.discard(txnid)
+            if txnid not in removed:
+                removed.append(txnid)
 
-                if maxcount and len(addtxns) >= maxcount:
-                    break
+            # the pending state only changes if it holds the effects of
+            # one of the removed transactions
+            if not self._pending_state_applied.isdisjoint(removed):
+                self._invalidate_pending_state()
 
-            # as part of the process, we may identify transactions that
-            # are invalid so go ahead and get rid of them, since these
-            # had all dependencies met we know that they will never be valid
-            for txnid in deltxns:
+            for deltxnid in removed:
+                if deltxnid != txnid:
+                    logger.info('txnid: %s - depends on deleted '
+                                'transaction %s',
+                                deltxnid[:8], txnid[:8])
                 self.JournalStats.InvalidTxnCount.increment()
-                if txnid in self.transaction_store:
-                    txn = self.transaction_store[txnid]
-                    if txn.InBlock is None:
-                        logger.debug("txnid: %s - deleting from transaction "
-                                     "store", txnid)
-                        del self.transaction_store[txnid]
-                if txnid in self.pending_transactions:
+                txn = self.transaction_store.get(deltxnid)
+                if txn and txn.InBlock is None:
+                    logger.debug("txnid: %s - deleting from transaction "
+                                 "store", deltxnid)
+                    del self.transaction_store[deltxnid]
+                if deltxnid in self.pending_transactions:
                     logger.debug("txnid: %s - deleting from pending "
-                                 "transactions", txnid)
-                    del self.pending_transactions[txnid]
-
-            return addtxns
+                                 "transactions", deltxnid)
+                    del self.pending_transactions[deltxnid]
 
-    def _prepare_transaction(self, addtxns, deltxns, store, txn):
+    def _request_missing_dependencies(self, now):
         """
-        Determine if a particular transaction is valid
+        Request the missing dependencies of pending transactions. Each
+        time a request is repeated the transactions waiting for it age,
+        and those that are too old are dropped.
+        """
+        with self._txn_lock:
+            for depid, retries in self._dependency_graph.due_requests(now):
+                waiting = list(self._dependency_graph.dependents(depid))
+                if retries > 0:
+                    for txnid in waiting:
+                        txn = self.transaction_store.get(txnid)
+                        if not txn:
+                            continue
+                        txn.increment_age()
+                        self.transaction_store[txnid] = txn
+                        logger.info('txnid: %s - not ready (age %s)',
+                                    txnid[:8], txn.age)
+                        if txn.age > self.max_txn_age:
+                            logger.warn('txnid: %s - too old, dropping - %s',
+                                        txnid[:8], str(txn))
+                            self._discard_transaction(txnid)
+
+                if depid in self.transaction_store or \
+                        not self._dependency_graph.dependents(depid):
+                    continue
 
-        Args:
-            addtxns (list of Transaction.Transaction) -- transaction to be
-                added to the current block
-            deltxns (list of Transaction.Transaction) -- invalid transactions
-            store (GlobalStore) -- current global store
-            txn -- the transaction to be tested
-        Returns:
-            True if the transaction is valid
+                logger.info('txnid: %s - calling request_missing_txn',
+                            depid[:8])
+                self.request_missing_txn(depid)
+                self.JournalStats.MissingTxnDepCount.increment()
+
+    def _invalidate_block_candidate(self):
         """
+        Discard the block candidate, it is rebuilt from the pending
+        transactions the next time it is needed
+        """
+        with self._txn_lock:
+            self._candidate_base_id = None
+            self._candidate_store = None
+            self._candidate_txns = []
+            self._candidate_set = set()
+            self._candidate_ready = deque()
+            self._candidate_arrivals = []
+
+    def _candidate_accepts(self, txnid):
+        """
+        Determine whether all of the uncommitted dependencies of a
+        pending transaction are in the block candidate
+        """
+        return txnid in self.pending_transactions and \
+            txnid in self._dependency_graph and \
+            self._dependency_graph.waiting(txnid) <= self._candidate_set
 
+    def _update_block_candidate(self):
+        """
+        Extend the block candidate with pending transactions whose
+        dependencies are committed or already in the candidate. The
+        candidate is rebuilt from the start of the pending list if the
+        head of the chain has changed. No more than
+        maximum_transactions_per_block transactions are validated.
+        """
         with self._txn_lock:
-            logger.debug('txnid: %s - add transaction %s',
-                         txn.Identifier[:8],
-                         str(txn))
-
-            # Because the dependencies may reorder transactions in the block
-            # in a way that is different from the arrival order, this
-            # transaction might already be in the block
-            if txn.Identifier in addtxns:
-                return True
-
-            # First step in adding the transaction to the list is to make
-            # sure that all dependent transactions are in the list already
-            ready = True
-            for dependencyID in txn.Dependencies:
-                logger.debug('txnid: %s - check dependency %s',
-                             txn.Identifier[:8], dependencyID[:8])
-
-                # check to see if the dependency has already been committed
-                if (dependencyID in self.transaction_store and
-                        (self.transaction_store[dependencyID].Status ==
-                         transaction.Status.committed)):
+            if self._candidate_base_id != \
+                    self.most_recent_committed_block_id:
+                self._invalidate_block_candidate()
+                self._candidate_base_id = self.most_recent_committed_block_id
+                self._candidate_store = self.global_store.clone_block()
+                arrivals = self.pending_transactions.keys()
+            else:
+                arrivals = self._candidate_arrivals
+            self._candidate_arrivals = []
+
+            ready = self._candidate_ready
+            ready.extend(t for t in arrivals if self._candidate_accepts(t))
+
+            while ready and len(self._candidate_txns) < \
+                    self.maximum_transactions_per_block:
+                txnid = ready.popleft()
+                if txnid in self._candidate_set or \
+                        txnid not in self.pending_transactions:
                     continue
 
-                # check to see if the dependency is already in this block
-                if dependencyID in addtxns:
+                txn = self.transaction_store.get(txnid)
+                if not txn:
                     continue
 
-                # check to see if the dependency is among the transactions to
-                # be deleted, if so then this transaction will never be valid
-                # and we can just get rid of it
-                if dependencyID in deltxns:
-                    logger.info('txnid: %s - depends on deleted '
-                                'transaction %s',
-                                txn.Identifier[:8], dependencyID[:8])
-                    deltxns.append(txn.Identifier)
-                    ready = False
+                logger.debug('txnid: %s - add transaction %s',
+                             txnid[:8], str(txn))
+
+                txnstore = self._candidate_store.get_transaction_store(
+                    txn.TransactionTypeName)
+                if not txn.is_valid(txnstore):
+                    # because we have all of the dependencies but the
+                    # transaction is still invalid we know that this
+                    # transaction is broken and we can simply throw it away
+                    logger.warn(
+                        'txnid: %s - is not valid for this block, '
+                        'dropping - %s', txnid[:8], str(txn))
+                    logger.info(common.pretty_print_dict(txn.dump()))
+                    self._discard_transaction(txnid)
                     continue
 
-                # recurse into the dependency, note that we need to make sure
-                # there are no loops in the dependencies but not doing that
-                # right now
-                deptxn = self.transaction_store.get(dependencyID)
-                if deptxn and self._prepare_transaction(addtxns,
-                                                        deltxns,
-                                                        store,
-                                                        deptxn):
+                logger.debug('txnid: %s - is valid, adding to block',
+                             txnid[:8])
+                txn.apply(txnstore)
+                self._candidate_txns.append(txnid)
+                self._candidate_set.add(txnid)
+
+                for dependent in self._dependency_graph.dependents(txnid):
+                    if self._candidate_accepts(dependent):
+                        ready.append(dependent)
+
+    def _invalidate_pending_state(self):
+        """
+        Discard the pending state, it is rebuilt from the pending
+        transactions the next time it is needed
+        """
+        with self._txn_lock:
+            self._pending_state_base_id = None
+            self._pending_state = None
+            self._pending_state_arrivals = []
+            self._pending_state_applied = set()
+
+    def _update_pending_state(self):
+        """
+        Apply the transactions that arrived since the pending state was
+        last used, the state is rebuilt from the start of the pending list
+        followed by the submitted transactions if the head of the chain has
+        changed. Transactions that are not valid against the state are
+        skipped.
+        """
+        with self._txn_lock:
+            if self._pending_state_base_id != \
+                    self.most_recent_committed_block_id:
+                self._pending_state_base_id = \
+                    self.most_recent_committed_block_id
+                self._pending_state = self.global_store.clone_block()
+                self._pending_state_applied = set()
+                for txnid in self._pending_state_submitted.keys():
+                    if txnid in self.transaction_store:
+                        del self._pending_state_submitted[txnid]
+                arrivals = self.pending_transactions.keys() + \
+                    self._pending_state_submitted.keys()
+            else:
+                arrivals = self._pending_state_arrivals
+            self._pending_state_arrivals = []
+
+            for txnid in arrivals:
+                if txnid in self._pending_state_applied:
+                    continue
+                if txnid in self.pending_transactions:
+                    txn = self.transaction_store.get(txnid)
+                else:
+                    txn = self._pending_state_submitted.get(txnid)
+                if not txn:
                     continue
 
-                # at this point we cannot find the dependency so send out a
-                # request for it and wait, we should set a timer on this
-                # transaction so we can just throw it away if the dependencies
-                # cannot be met
-                ready = False
+                txnstore = self._pending_state.get_transaction_store(
+                    txn.TransactionTypeName)
+                if txn.is_valid(txnstore):
+                    txn.apply(txnstore)
+                    self._pending_state_applied.add(txnid)
 
-                logger.info('txnid: %s - missing %s, '
-                            'calling request_missing_txn',
-                            txn.Identifier[:8], dependencyID[:8])
-                self.request_missing_txn(dependencyID)
-                self.JournalStats.MissingTxnDepCount.increment()
+    def add_submitted_transaction(self, txn):
+        """Applies a transaction accepted from a local client to the
+        pending state while its message waits in the incoming queue, so
+        that transactions submitted after it are checked against its
+        effects. It is removed when the message is dispatched.
+
+        Args:
+            txn (Transaction.Transaction): A transaction that passed
+                check_pending_transaction and was queued for dispatch.
+        """
+        with self._txn_lock:
+            if txn.Identifier in self.transaction_store or \
+                    txn.Identifier in self._pending_state_submitted:
+                return
+
+            self._pending_state_submitted[txn.Identifier] = txn
+            if self._pending_state is not None:
+                self._pending_state_arrivals.append(txn.Identifier)
+
+    def check_pending_transaction(self, txn):
+        """Checks that a transaction is valid against the state of the
+        most recently committed block with the pending transactions
+        applied. The check costs the same regardless of the number of
+        pending transactions once the state is up to date.
+
+        Args:
+            txn (Transaction.Transaction): The transaction to check, it
+                is not applied to the state.
+
+        Raises:
+            KeyError: If the transaction family has no store.
+            InvalidTransactionError: If the transaction is not valid.
+        """
+        error = self.check_pending_transactions([txn])[0]
+        if error is not None:
+            raise error
+
+    def check_pending_transactions(self, txns):
+        """Checks a list of transactions in order against the state of
+        the most recently committed block with the pending transactions
+        applied, each valid transaction is applied to a copy of the state
+        before the next one is checked.
+
+        Args:
+            txns (list): The transactions to check.
+
+        Returns:
+            list: For each transaction, None if it is valid or the
+                exception that it failed with, a KeyError if the
+                transaction family has no store or an
+                InvalidTransactionError if it is not valid.
+        """
+        errors = []
+        with self._txn_lock:
+            self._update_pending_state()
+            blockstore = self._pending_state.clone_block()
+            for txn in txns:
+                try:
+                    txnstore = blockstore.get_transaction_store(
+                        txn.TransactionTypeName)
+                    txn.check_valid(txnstore)
+                except (KeyError, InvalidTransactionError) as e:
+                    errors.append(e)
+                    continue
+                except Exception as e:
+                    # a failure of one transaction does not fail the
+                    # others
+                    logger.warn('txnid: %s - error checking transaction: '
+                                '%s', txn.Identifier[:8], e)
+                    errors.append(e)
+                    continue
 
-            # if all of the dependencies have not been met then there isn't any
-            # point in continuing on so bail out
-            if not ready:
-                txn.increment_age()
-                self.transaction_store[txn.Identifier] = txn
-                logger.info('txnid: %s - not ready (age %s)',
-                            txn.Identifier[:8], txn.age)
-                if txn.age > self.max_txn_age:
-                    logger.warn('txnid: %s - too old, dropping - %s',
-                                txn.Identifier[:8], str(txn))
-                    deltxns.append(txn.Identifier)
-                return False
-
-            # after all that work... we know the dependencies are met, so
-            # see if # the transaction is valid, that is that all of the
-            # preconditions encoded in the transaction itself are met
-            txnstore = store.get_transaction_store(txn.TransactionTypeName)
-            if txn.is_valid(txnstore):
-                logger.debug('txnid: %s - is valid, adding to block',
-                             txn.Identifier[:8])
-                addtxns.append(txn.Identifier)
                 txn.apply(txnstore)
-                return True
-
-            # because we have all of the dependencies but the transaction is
-            # still invalid we know that this transaction is broken and we
-            # can simply throw it away
-            logger.warn(
-                'txnid: %s - is not valid for this block, dropping - %s',
-                txn.Identifier[:8], str(txn))
-            logger.info(common.pretty_print_dict(txn.dump()))
-            deltxns.append(txn.Identifier)
-            return False
+                errors.append(None)
+        return errors
+
+    def _prepare_transaction_list(self, maxcount=0):
+        """
+        Prepare an ordered list of valid transactions that can be included in
+        the next consensus round
+
+        Returns:
+            list of Transaction.Transaction
+        """
+
+        with self._txn_lock:
+            self._update_block_candidate()
+            if maxcount:
+                return self._candidate_txns[:maxcount]
+            return list(self._candidate_txns)
 
     def _clean_transaction_blocks(self):
         """
@@ -1391,6 +2027,10 @@ class Journal(object):
         self.JournalStats.add_metric(stats.Counter('MissingTxnRequestCount'))
         self.JournalStats.add_metric(stats.Counter('MissingTxnFromBlockCount'))
         self.JournalStats.add_metric(stats.Counter('MissingTxnDepCount'))
+        self.JournalStats.add_metric(
+            stats.Counter('InventoryTxnAnnounceCount'))
+        self.JournalStats.add_metric(
+            stats.Counter('InventoryTxnRequestCount'))
         self.JournalStats.add_metric(stats.Sample(
             'PendingBlockCount', lambda: self.pending_block_count))
         self.JournalStats.add_metric(stats.Sample(
@@ -1404,6 +2044,10 @@ class Journal(object):
         self.JournalConfigStats.add_metric(
             stats.Sample('MaximumTransactionsPerBlock',
                          lambda: self.maximum_transactions_per_block))
+        for name, db in self.cached_databases.iteritems():
+            self.JournalStats.add_metric(stats.Sample(
+                '{0}CacheHitRatio'.format(name.capitalize()),
+                lambda db=db: db.hit_ratio))
         if stat_domains is not None:
             stat_domains['journal'] = self.JournalStats
             stat_domains['journalconfig'] = self.JournalConfigStats
@@ -78,6 +78,17 @@ class JournalStore(object):
         """
         self._database.delete(key)
 
+    def begin_batch(self):
+        """Starts grouping writes so they are applied together by
+        commit_batch()
+        """
+        self._database.begin_batch()
+
+    def commit_batch(self):
+        """Applies the writes made since begin_batch()
+        """
+        self._database.commit_batch()
+
     def sync(self):
         """Ensures that pending writes are flushed to disk
         """
@@ -13,12 +13,20 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 
+import base64
+import hashlib
 import logging
 
 from gossip import message
 
 logger = logging.getLogger(__name__)
 
+# snapshots are taken SnapshotDepth blocks behind the head of the chain so
+# that they are unlikely to be rolled back, and sent in chunks of
+# SnapshotChunkSize bytes
+SnapshotDepth = 10
+SnapshotChunkSize = 16 * 1024
+
 
 def register_message_handlers(journal):
     """
@@ -36,10 +44,17 @@ def register_message_handlers(journal):
     journal.dispatcher.register_message_handler(
         TransactionRequestMessage,
         _txnrequesthandler)
+    journal.dispatcher.register_message_handler(
+        SnapshotRequestMessage,
+        _snapshotrequesthandler)
+    journal.dispatcher.register_message_handler(
+        SnapshotChunkRequestMessage,
+        _snapshotchunkrequesthandler)
 
 
 class BlockListRequestMessage(message.Message):
     MessageType = "/journal.messages.JournalTransfer/BlockListRequest"
+    DispatchLane = 'transfer'
 
     def __init__(self, minfo=None):
         if minfo is None:
@@ -74,19 +89,15 @@ def _blocklistrequesthandler(msg, journal):
             'received blocklist transfer request from %s prior to completing '
             'initialization',
             source)
-        gossip.send_message(TransferFailedMessage(), msg.OriginatorID)
+        failed = TransferFailedMessage({'InReplyTo': msg.Identifier})
+        gossip.send_message(failed, msg.OriginatorID)
         return
 
     reply = BlockListReplyMessage()
     reply.InReplyTo = msg.Identifier
     reply.BlockListIndex = msg.BlockListIndex
 
-    blockids = journal.committed_block_ids()
-    blockids.reverse()
-
-    index = msg.BlockListIndex
-    if index < len(blockids):
-        reply.BlockIDs = blockids[index:index + 100]
+    reply.BlockIDs = journal.committed_block_range(msg.BlockListIndex, 100)
 
     logger.debug('sending %d committed blocks to %s for request %s',
                  len(reply.BlockIDs), source, msg.Identifier[:8])
@@ -95,6 +106,7 @@ def _blocklistrequesthandler(msg, journal):
 
 class BlockListReplyMessage(message.Message):
     MessageType = "/journal.messages.JournalTransfer/BlockListReply"
+    DispatchLane = 'transfer'
 
     def __init__(self, minfo=None):
         if minfo is None:
@@ -128,6 +140,7 @@ class BlockListReplyMessage(message.Message):
 
 class UncommittedListRequestMessage(message.Message):
     MessageType = "/journal.messages.JournalTransfer/UncommittedListRequest"
+    DispatchLane = 'transfer'
 
     def __init__(self, minfo=None):
         if minfo is None:
@@ -163,7 +176,8 @@ def _uncommittedlistrequesthandler(msg, journal):
             'received uncommitted list transfer request from %s prior to '
             'completing initialization',
             source)
-        gossip.send_message(TransferFailedMessage(), msg.OriginatorID)
+        failed = TransferFailedMessage({'InReplyTo': msg.Identifier})
+        gossip.send_message(failed, msg.OriginatorID)
         return
 
     reply = UncommittedListReplyMessage()
@@ -182,6 +196,7 @@ def _uncommittedlistrequesthandler(msg, journal):
 
 class UncommittedListReplyMessage(message.Message):
     MessageType = "/journal.messages.JournalTransfer/UncommittedListReply"
+    DispatchLane = 'transfer'
 
     def __init__(self, minfo=None):
         if minfo is None:
@@ -210,6 +225,7 @@ class UncommittedListReplyMessage(message.Message):
 
 class BlockRequestMessage(message.Message):
     MessageType = "/journal.messages.JournalTransfer/BlockRequest"
+    DispatchLane = 'transfer'
 
     def __init__(self, minfo=None):
         if minfo is None:
@@ -237,7 +253,8 @@ def _blockrequesthandler(msg, journal):
             'received block transfer request from %s prior to completing '
             'initialization',
             source)
-        gossip.send_message(TransferFailedMessage(), msg.OriginatorID)
+        failed = TransferFailedMessage({'InReplyTo': msg.Identifier})
+        gossip.send_message(failed, msg.OriginatorID)
         return
 
     reply = BlockReplyMessage()
@@ -248,7 +265,8 @@ def _blockrequesthandler(msg, journal):
         reply.TransactionBlockMessage = bmsg.dump()
     else:
         logger.warn('request for unknown block, %s', msg.BlockID[:8])
-        gossip.send_message(TransferFailedMessage(), msg.OriginatorID)
+        failed = TransferFailedMessage({'InReplyTo': msg.Identifier})
+        gossip.send_message(failed, msg.OriginatorID)
         return
 
     gossip.send_message(reply, msg.OriginatorID)
@@ -256,6 +274,7 @@ def _blockrequesthandler(msg, journal):
 
 class BlockReplyMessage(message.Message):
     MessageType = "/journal.messages.JournalTransfer/BlockReply"
+    DispatchLane = 'transfer'
 
     def __init__(self, minfo=None):
         if minfo is None:
@@ -282,6 +301,7 @@ class BlockReplyMessage(message.Message):
 
 class TransactionRequestMessage(message.Message):
     MessageType = "/journal.messages.JournalTransfer/TransactionRequest"
+    DispatchLane = 'transfer'
 
     def __init__(self, minfo=None):
         if minfo is None:
@@ -311,7 +331,8 @@ def _txnrequesthandler(msg, journal):
             'received transaction transfer request from %s prior to '
             'completing initialization',
             source)
-        gossip.send_message(TransferFailedMessage(), msg.OriginatorID)
+        failed = TransferFailedMessage({'InReplyTo': msg.Identifier})
+        gossip.send_message(failed, msg.OriginatorID)
         return
 
     reply = TransactionReplyMessage()
@@ -323,7 +344,8 @@ def _txnrequesthandler(msg, journal):
     else:
         logger.warn('request for unknown transaction, %s',
                     msg.TransactionID[:8])
-        gossip.send_message(TransferFailedMessage(), msg.OriginatorID)
+        failed = TransferFailedMessage({'InReplyTo': msg.Identifier})
+        gossip.send_message(failed, msg.OriginatorID)
         return
 
     gossip.send_message(reply, msg.OriginatorID)
@@ -331,6 +353,7 @@ def _txnrequesthandler(msg, journal):
 
 class TransactionReplyMessage(message.Message):
     MessageType = "/journal.messages.JournalTransfer/TransactionReply"
+    DispatchLane = 'transfer'
 
     def __init__(self, minfo=None):
         if minfo is None:
@@ -354,18 +377,203 @@ class TransactionReplyMessage(message.Message):
         return result
 
 
+class SnapshotRequestMessage(message.Message):
+    MessageType = "/journal.messages.JournalTransfer/SnapshotRequest"
+    DispatchLane = 'transfer'
+
+    def __init__(self, minfo=None):
+        if minfo is None:
+            minfo = {}
+        super(SnapshotRequestMessage, self).__init__(minfo)
+
+        # BlockID names the block of a snapshot offered by another peer
+        # that is to be confirmed, without it the peer picks the block
+        self.BlockID = minfo.get('BlockID')
+
+        self.IsSystemMessage = True
+        self.IsForward = False
+        self.IsReliable = True
+
+    def dump(self):
+        result = super(SnapshotRequestMessage, self).dump()
+        result['BlockID'] = self.BlockID
+        return result
+
+
+def _snapshotrequesthandler(msg, journal):
+    gossip = journal.gossip
+    source = gossip.node_id_to_name(msg.OriginatorID)
+    logger.debug('processing incoming snapshot request from %s', source)
+
+    if journal.initializing:
+        logger.warn(
+            'received snapshot request from %s prior to completing '
+            'initialization',
+            source)
+        failed = TransferFailedMessage({'InReplyTo': msg.Identifier})
+        gossip.send_message(failed, msg.OriginatorID)
+        return
+
+    reply = SnapshotReplyMessage()
+    reply.InReplyTo = msg.Identifier
+
+    # a chain too short for a snapshot is transferred block by block, a
+    # snapshot offered by another peer is only confirmed for a block in
+    # the committed chain
+    blockid = None
+    if msg.BlockID is not None:
+        if journal.committed_block_height(msg.BlockID) is not None:
+            blockid = msg.BlockID
+    else:
+        blockids = journal.committed_block_ids(SnapshotDepth + 1)
+        if len(blockids) > SnapshotDepth:
+            blockid = blockids[-1]
+
+    snapshot = None
+    if blockid is not None:
+        try:
+            snapshot = journal.get_snapshot(blockid)
+        except KeyError:
+            logger.warn('no state for snapshot of block %s', blockid[:8])
+
+    if snapshot is not None:
+        reply.BlockID = blockid
+        reply.Size = len(snapshot)
+        reply.Hash = hashlib.sha256(snapshot).hexdigest()
+        reply.ChunkHashes = [
+            hashlib.sha256(snapshot[i:i + SnapshotChunkSize]).hexdigest()
+            for i in xrange(0, len(snapshot), SnapshotChunkSize)]
+
+    logger.debug('sending snapshot of block %s to %s for request %s',
+                 reply.BlockID, source, msg.Identifier[:8])
+    gossip.send_message(reply, msg.OriginatorID)
+
+
+class SnapshotReplyMessage(message.Message):
+    MessageType = "/journal.messages.JournalTransfer/SnapshotReply"
+    DispatchLane = 'transfer'
+
+    def __init__(self, minfo=None):
+        if minfo is None:
+            minfo = {}
+        super(SnapshotReplyMessage, self).__init__(minfo)
+
+        self.InReplyTo = minfo.get('InReplyTo')
+        self.BlockID = minfo.get('BlockID')
+        self.Size = minfo.get('Size', 0)
+        self.Hash = minfo.get('Hash')
+        self.ChunkHashes = minfo.get('ChunkHashes', [])
+
+        self.IsSystemMessage = True
+        self.IsForward = False
+        self.IsReliable = True
+
+    def dump(self):
+        result = super(SnapshotReplyMessage, self).dump()
+        result['InReplyTo'] = self.InReplyTo
+        result['BlockID'] = self.BlockID
+        result['Size'] = self.Size
+        result['Hash'] = self.Hash
+        result['ChunkHashes'] = list(self.ChunkHashes)
+        return result
+
+
+class SnapshotChunkRequestMessage(message.Message):
+    MessageType = "/journal.messages.JournalTransfer/SnapshotChunkRequest"
+    DispatchLane = 'transfer'
+
+    def __init__(self, minfo=None):
+        if minfo is None:
+            minfo = {}
+        super(SnapshotChunkRequestMessage, self).__init__(minfo)
+        self.BlockID = minfo.get('BlockID')
+        self.Index = minfo.get('Index', 0)
+
+        self.IsSystemMessage = True
+        self.IsForward = False
+        self.IsReliable = True
+
+    def dump(self):
+        result = super(SnapshotChunkRequestMessage, self).dump()
+        result['BlockID'] = self.BlockID
+        result['Index'] = self.Index
+        return result
+
+
+def _snapshotchunkrequesthandler(msg, journal):
+    gossip = journal.gossip
+    source = gossip.node_id_to_name(msg.OriginatorID)
+    logger.debug('processing incoming snapshot chunk request from %s',
+                 source)
+
+    # any peer that has the block can serve the snapshot, the chunks
+    # are verified against the hashes sent by the first peer
+    snapshot = None
+    if not journal.initializing and msg.BlockID in journal.block_store:
+        try:
+            snapshot = journal.get_snapshot(msg.BlockID)
+        except KeyError:
+            pass
+
+    start = msg.Index * SnapshotChunkSize
+    if snapshot is None or start >= len(snapshot):
+        logger.warn('request for unknown snapshot chunk, %s',
+                    str(msg.BlockID)[:8])
+        failed = TransferFailedMessage({'InReplyTo': msg.Identifier})
+        gossip.send_message(failed, msg.OriginatorID)
+        return
+
+    reply = SnapshotChunkReplyMessage()
+    reply.InReplyTo = msg.Identifier
+    reply.Index = msg.Index
+    reply.Data = base64.b64encode(snapshot[start:start + SnapshotChunkSize])
+    gossip.send_message(reply, msg.OriginatorID)
+
+
+class SnapshotChunkReplyMessage(message.Message):
+    MessageType = "/journal.messages.JournalTransfer/SnapshotChunkReply"
+    DispatchLane = 'transfer'
+
+    def __init__(self, minfo=None):
+        if minfo is None:
+            minfo = {}
+        super(SnapshotChunkReplyMessage, self).__init__(minfo)
+
+        # Data is the base64 encoded chunk of the snapshot
+        self.InReplyTo = minfo.get('InReplyTo')
+        self.Index = minfo.get('Index', 0)
+        self.Data = minfo.get('Data', '')
+
+        self.IsSystemMessage = True
+        self.IsForward = False
+        self.IsReliable = True
+
+    def dump(self):
+        result = super(SnapshotChunkReplyMessage, self).dump()
+        result['InReplyTo'] = self.InReplyTo
+        result['Index'] = self.Index
+        result['Data'] = self.Data
+        return result
+
+
 class TransferFailedMessage(message.Message):
     MessageType = "/journal.messages.JournalTransfer/TransferFailed"
+    DispatchLane = 'transfer'
 
     def __init__(self, minfo=None):
         if minfo is None:
             minfo = {}
         super(TransferFailedMessage, self).__init__(minfo)
 
+        # the identifier of the request that failed, older nodes do not
+        # send it
+        self.InReplyTo = minfo.get('InReplyTo')
+
         self.IsSystemMessage = True
         self.IsForward = False
         self.IsReliable = True
 
     def dump(self):
         result = super(TransferFailedMessage, self).dump()
+        result['InReplyTo'] = self.InReplyTo
         return result
@@ -34,6 +34,8 @@ def register_message_handlers(journal):
                                                 _block_request_handler)
     journal.dispatcher.register_message_handler(BlockRetryMessage,
                                                 _block_retry_handler)
+    journal.dispatcher.register_message_handler(BlockBatchRequestMessage,
+                                                _block_batch_request_handler)
 
 
 class TransactionBlockMessage(message.Message):
@@ -52,6 +54,7 @@ class TransactionBlockMessage(message.Message):
             with the message.
     """
     MessageType = "/journal.messages.TransactionBlockMessage/TransactionBlock"
+    DispatchLane = 'block'
 
     def __init__(self, minfo=None):
         """Constructor for the TransactionBlockMessage class.
@@ -101,7 +104,14 @@ def transaction_block_message_handler(msg, journal):
     if msg.TransactionBlock.Identifier in journal.block_store:
         return
 
+    # a reply to a batch request from this node is not forwarded, a
+    # requested block that arrives by flooding still is
+    requested = journal.is_requested_block(
+        msg.TransactionBlock.Identifier, msg.SenderID)
     journal.commit_transaction_block(msg.TransactionBlock)
+    if requested:
+        return
+
     journal.gossip.forward_message(msg,
                                    exceptions=[msg.SenderID],
                                    initialize=False)
@@ -121,6 +131,7 @@ class BlockRequestMessage(message.Message):
         BlockID (str): The id of the requested block.
     """
     MessageType = "/journal.messages.TransactionBlockMessage/BlockRequest"
+    DispatchLane = 'block'
 
     def __init__(self, minfo=None):
         """Constructor for the BlockRequestMessage class.
@@ -165,6 +176,69 @@ def _block_request_handler(msg, journal):
                                   request=msg)
 
 
+class BlockBatchRequestMessage(message.Message):
+    """Represents the message format for requesting several blocks
+    from a single peer, the blocks are sent back to the requester only.
+
+    Attributes:
+        transaction_block_message.BlockBatchRequestMessage.MessageType
+            (str): The class name of the message.
+        IsSystemMessage (bool): Whether or not this message is
+            a system message.
+        IsForward (bool): Whether or not this message is forwarded.
+        IsReliable (bool): Whether or not this message should
+            use reliable delivery.
+        BlockIDs (list): The ids of the requested blocks.
+    """
+    MessageType = \
+        "/journal.messages.TransactionBlockMessage/BlockBatchRequest"
+    DispatchLane = 'block'
+
+    def __init__(self, minfo=None):
+        """Constructor for the BlockBatchRequestMessage class.
+
+        Args:
+            minfo (dict): A dict of initial values for the
+                new BlockBatchRequestMessage.
+        """
+        if minfo is None:
+            minfo = {}
+        super(BlockBatchRequestMessage, self).__init__(minfo)
+
+        self.IsSystemMessage = False
+        self.IsForward = False
+        self.IsReliable = True
+
+        self.BlockIDs = minfo.get('BlockIDs', [])
+
+    def dump(self):
+        """Returns a dict containing information about the
+        BlockBatchRequestMessage.
+
+        Returns:
+            dict: A dict containing information about the
+                BlockBatchRequestMessage.
+        """
+        result = super(BlockBatchRequestMessage, self).dump()
+        result['BlockIDs'] = self.BlockIDs
+
+        return result
+
+
+def _block_batch_request_handler(msg, journal):
+    # blocks that are not in the store are skipped, the requester asks
+    # another peer for them when its request times out
+    with journal._txn_lock:
+        replies = []
+        for block_id in msg.BlockIDs:
+            blk = journal.block_store.get(block_id)
+            if blk:
+                replies.append(blk.build_message())
+
+    for reply in replies:
+        journal.gossip.send_message(reply, msg.SenderID)
+
+
 class BlockRetryMessage(message.Message):
     """Represents the message format for block retry.
 
@@ -178,6 +252,7 @@ class BlockRetryMessage(message.Message):
             use reliable delivery.
     """
     MessageType = "/journal.messages.TransactionBlockMessage/BlockRetry"
+    DispatchLane = 'block'
 
     def __init__(self, minfo=None):
         """Constructor for the BlockRequestMessage class.
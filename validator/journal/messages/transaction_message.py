@@ -25,10 +25,16 @@ def register_message_handlers(journal):
                                                 transaction_message_handler)
     journal.dispatcher.register_message_handler(TransactionRequestMessage,
                                                 _txn_request_handler)
+    journal.dispatcher.register_message_handler(TransactionInventoryMessage,
+                                                _txn_inventory_handler)
+    journal.dispatcher.register_message_handler(
+        TransactionBatchRequestMessage,
+        _txn_batch_request_handler)
 
 
 class TransactionMessage(message.Message):
     MessageType = "/journal.messages.TransactionMessage/Transaction"
+    DispatchLane = 'transaction'
 
     def __init__(self, minfo=None):
         if minfo is None:
@@ -65,7 +71,19 @@ def transaction_message_handler(msg, journal):
         if journal.pending_transactions.get(msg.Transaction.Identifier):
             return
 
+        # a reply to a batch request from this node is not forwarded, a
+        # requested transaction that arrives by flooding still is
+        requested = journal.is_requested_transaction(
+            msg.Transaction.Identifier, msg.SenderID)
         journal.add_pending_transaction(msg.Transaction)
+        if requested:
+            return
+
+        if journal.transaction_gossip == 'inventory':
+            journal.announce_transaction(msg.Transaction.Identifier,
+                                         known_by=msg.SenderID)
+            return
+
         journal.gossip.forward_message(msg,
                                        exceptions=[msg.SenderID],
                                        initialize=False)
@@ -106,3 +124,68 @@ def _txn_request_handler(msg, journal):
         journal.request_missing_txn(msg.TransactionID,
                                     exceptions=[msg.SenderID],
                                     request=msg)
+
+
+class TransactionInventoryMessage(message.Message):
+    MessageType = \
+        "/journal.messages.TransactionMessage/TransactionInventory"
+    DispatchLane = 'transaction'
+
+    def __init__(self, minfo=None):
+        if minfo is None:
+            minfo = {}
+        super(TransactionInventoryMessage, self).__init__(minfo)
+
+        self.IsSystemMessage = False
+        self.IsForward = False
+        self.IsReliable = True
+
+        self.TransactionIDs = minfo.get('TransactionIDs', [])
+
+    def dump(self):
+        result = super(TransactionInventoryMessage, self).dump()
+        result['TransactionIDs'] = self.TransactionIDs
+
+        return result
+
+
+def _txn_inventory_handler(msg, journal):
+    # request the announced transactions this node lacks from the sender
+    journal.request_transactions(msg.TransactionIDs, msg.SenderID)
+
+
+class TransactionBatchRequestMessage(message.Message):
+    MessageType = \
+        "/journal.messages.TransactionMessage/TransactionBatchRequest"
+    DispatchLane = 'transaction'
+
+    def __init__(self, minfo=None):
+        if minfo is None:
+            minfo = {}
+        super(TransactionBatchRequestMessage, self).__init__(minfo)
+
+        self.IsSystemMessage = False
+        self.IsForward = False
+        self.IsReliable = True
+
+        self.TransactionIDs = minfo.get('TransactionIDs', [])
+
+    def dump(self):
+        result = super(TransactionBatchRequestMessage, self).dump()
+        result['TransactionIDs'] = self.TransactionIDs
+
+        return result
+
+
+def _txn_batch_request_handler(msg, journal):
+    # transactions that are not in the store are skipped, the requester
+    # asks another peer for them when its request times out
+    with journal._txn_lock:
+        replies = []
+        for txn_id in msg.TransactionIDs:
+            txn = journal.transaction_store.get(txn_id)
+            if txn:
+                replies.append(txn.build_message())
+
+    for reply in replies:
+        journal.gossip.send_message(reply, msg.SenderID)
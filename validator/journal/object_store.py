@@ -36,7 +36,12 @@ class ObjectStore(global_store_manager.KeyValueStore):
         super(ObjectStore, self).__init__(
             prevstore, storeinfo, readonly)
 
-        if clone_indexes is not None:
+        if clone_indexes is not None and self.ImmutableValues:
+            # indexed objects are frozen so they can be shared
+            self._indexes = dict((index, dict(entries))
+                                 for index, entries
+                                 in clone_indexes.iteritems())
+        elif clone_indexes is not None:
             self._indexes = copy.deepcopy(clone_indexes)
         else:
             self._indexes = {}
@@ -147,6 +152,8 @@ class ObjectStore(global_store_manager.KeyValueStore):
 
     def set(self, key, value):
         ObjectStore._object_type_check(value, None, key)
+        if self.ImmutableValues:
+            value = global_store_manager.freeze_value(value)
         object_type = value['object-type']
         old_object = None
         try:
@@ -0,0 +1,356 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+"""
+This module defines the PersistentMap class, an immutable hash array
+mapped trie (HAMT). Every update returns a new map that shares all
+unmodified nodes with the map it was derived from, so keeping one
+version of the map per block costs O(log n) memory per update rather
+than a copy of the whole dictionary.
+"""
+
+_BITS = 5
+_WIDTH = 1 << _BITS
+_MASK = _WIDTH - 1
+_HASH_MASK = 0xffffffff
+_MAX_SHIFT = 30
+
+_NOT_FOUND = object()
+
+
+def _hash(key):
+    return hash(key) & _HASH_MASK
+
+
+def _bitpos(hashval, shift):
+    return 1 << ((hashval >> shift) & _MASK)
+
+
+def _index(bitmap, bit):
+    return bin(bitmap & (bit - 1)).count('1')
+
+
+class _Leaf(object):
+    __slots__ = ('hashval', 'key', 'value')
+
+    def __init__(self, hashval, key, value):
+        self.hashval = hashval
+        self.key = key
+        self.value = value
+
+
+class _CollisionNode(object):
+    """A node holding leaves whose full hashes are identical.
+    """
+    __slots__ = ('hashval', 'leaves')
+
+    def __init__(self, hashval, leaves):
+        self.hashval = hashval
+        self.leaves = leaves
+
+    def get(self, key, default):
+        for leaf in self.leaves:
+            if leaf.key == key:
+                return leaf.value
+        return default
+
+    def assoc(self, shift, leaf):
+        if leaf.hashval != self.hashval:
+            # push this node down one level so both hashes fit
+            node = _BitmapNode(_bitpos(self.hashval, shift), [self])
+            return node.assoc(shift, leaf)
+
+        for idx, old in enumerate(self.leaves):
+            if old.key == leaf.key:
+                if old.value is leaf.value:
+                    return self, False
+                leaves = list(self.leaves)
+                leaves[idx] = leaf
+                return _CollisionNode(self.hashval, leaves), False
+
+        return _CollisionNode(self.hashval, self.leaves + [leaf]), True
+
+    def dissoc(self, shift, hashval, key):
+        for idx, old in enumerate(self.leaves):
+            if old.key == key:
+                if len(self.leaves) == 2:
+                    return self.leaves[1 - idx]
+                return _CollisionNode(
+                    self.hashval,
+                    self.leaves[:idx] + self.leaves[idx + 1:])
+        return _NOT_FOUND
+
+    def iterleaves(self):
+        return iter(self.leaves)
+
+
+class _BitmapNode(object):
+    """An interior node; `bitmap` marks which of the 32 possible slots
+    are populated and `entries` holds them in compressed order. Each
+    entry is either a _Leaf or a child node.
+    """
+    __slots__ = ('bitmap', 'entries')
+
+    def __init__(self, bitmap, entries):
+        self.bitmap = bitmap
+        self.entries = entries
+
+    def assoc(self, shift, leaf):
+        bit = _bitpos(leaf.hashval, shift)
+        idx = _index(self.bitmap, bit)
+
+        if not self.bitmap & bit:
+            entries = list(self.entries)
+            entries.insert(idx, leaf)
+            return _BitmapNode(self.bitmap | bit, entries), True
+
+        entry = self.entries[idx]
+        if isinstance(entry, _Leaf):
+            if entry.key == leaf.key:
+                if entry.value is leaf.value:
+                    return self, False
+                newentry, added = leaf, False
+            else:
+                newentry, added = _merge(shift + _BITS, entry, leaf), True
+        else:
+            newentry, added = entry.assoc(shift + _BITS, leaf)
+            if newentry is entry:
+                return self, False
+
+        entries = list(self.entries)
+        entries[idx] = newentry
+        return _BitmapNode(self.bitmap, entries), added
+
+    def dissoc(self, shift, hashval, key):
+        bit = _bitpos(hashval, shift)
+        if not self.bitmap & bit:
+            return _NOT_FOUND
+
+        idx = _index(self.bitmap, bit)
+        entry = self.entries[idx]
+        if isinstance(entry, _Leaf):
+            if entry.key != key:
+                return _NOT_FOUND
+            newentry = None
+        else:
+            newentry = entry.dissoc(shift + _BITS, hashval, key)
+            if newentry is _NOT_FOUND:
+                return _NOT_FOUND
+
+        if newentry is None:
+            if len(self.entries) == 1:
+                return None
+            if len(self.entries) == 2 and shift > 0:
+                # collapse a node that is left holding a single leaf so
+                # the leaf moves up to the parent
+                other = self.entries[1 - idx]
+                if isinstance(other, _Leaf):
+                    return other
+            entries = list(self.entries)
+            del entries[idx]
+            return _BitmapNode(self.bitmap & ~bit, entries)
+
+        if isinstance(newentry, _Leaf) and len(self.entries) == 1 \
+                and shift > 0:
+            return newentry
+
+        entries = list(self.entries)
+        entries[idx] = newentry
+        return _BitmapNode(self.bitmap, entries)
+
+    def iterleaves(self):
+        for entry in self.entries:
+            if isinstance(entry, _Leaf):
+                yield entry
+            else:
+                for leaf in entry.iterleaves():
+                    yield leaf
+
+
+def _merge(shift, leaf1, leaf2):
+    """Build the smallest subtree that holds two leaves with different
+    keys.
+    """
+    if leaf1.hashval == leaf2.hashval or shift > _MAX_SHIFT:
+        return _CollisionNode(leaf1.hashval, [leaf1, leaf2])
+
+    bit1 = _bitpos(leaf1.hashval, shift)
+    bit2 = _bitpos(leaf2.hashval, shift)
+    if bit1 == bit2:
+        return _BitmapNode(bit1, [_merge(shift + _BITS, leaf1, leaf2)])
+    if bit1 < bit2:
+        return _BitmapNode(bit1 | bit2, [leaf1, leaf2])
+    return _BitmapNode(bit1 | bit2, [leaf2, leaf1])
+
+
+_EMPTY_ROOT = _BitmapNode(0, [])
+
+
+class PersistentMap(object):
+    """An immutable mapping with O(log n) lookups and updates.
+
+    Updates (set, delete and update) never modify the map, they return
+    a new PersistentMap that shares structure with this one. Creating
+    a new version of a large map is therefore cheap and old versions
+    remain valid for as long as they are referenced.
+    """
+    __slots__ = ('_root', '_count')
+
+    def __init__(self, items=None):
+        """Constructor for the PersistentMap class.
+
+        Args:
+            items (dict): Optional initial contents of the map.
+        """
+        self._root = _EMPTY_ROOT
+        self._count = 0
+        if items:
+            self._root, self._count = self._assoc_all(
+                self._root, self._count, items.iteritems())
+
+    @classmethod
+    def _create(cls, root, count):
+        result = cls.__new__(cls)
+        result._root = root
+        result._count = count
+        return result
+
+    @staticmethod
+    def _assoc_all(root, count, items):
+        for key, value in items:
+            root, added = root.assoc(0, _Leaf(_hash(key), key, value))
+            if added:
+                count += 1
+        return root, count
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, key):
+        return self.get(key, _NOT_FOUND) is not _NOT_FOUND
+
+    def __getitem__(self, key):
+        value = self.get(key, _NOT_FOUND)
+        if value is _NOT_FOUND:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        return self.iterkeys()
+
+    def get(self, key, default=None):
+        """Gets the value associated with a key.
+
+        Args:
+            key (str): The key to lookup.
+            default (object): The value to return if the key is not in
+                the map.
+
+        Returns:
+            object: The value associated with the key.
+        """
+        hashval = _hash(key)
+        node = self._root
+        shift = 0
+        while True:
+            if isinstance(node, _CollisionNode):
+                if node.hashval != hashval:
+                    return default
+                return node.get(key, default)
+
+            bit = _bitpos(hashval, shift)
+            if not node.bitmap & bit:
+                return default
+
+            node = node.entries[_index(node.bitmap, bit)]
+            if isinstance(node, _Leaf):
+                return node.value if node.key == key else default
+            shift += _BITS
+
+    def set(self, key, value):
+        """Returns a new map in which key is bound to value.
+
+        Args:
+            key (str): The key to set.
+            value (object): The value to bind to the key.
+
+        Returns:
+            PersistentMap: The updated map.
+        """
+        root, added = self._root.assoc(0, _Leaf(_hash(key), key, value))
+        if root is self._root:
+            return self
+        return self._create(root, self._count + 1 if added else self._count)
+
+    def delete(self, key):
+        """Returns a new map without key; missing keys are ignored.
+
+        Args:
+            key (str): The key to remove.
+
+        Returns:
+            PersistentMap: The updated map.
+        """
+        root = self._root.dissoc(0, _hash(key), key)
+        if root is _NOT_FOUND:
+            return self
+        if root is None:
+            root = _EMPTY_ROOT
+        return self._create(root, self._count - 1)
+
+    def update(self, items=None, deletes=None):
+        """Returns a new map with a batch of changes applied.
+
+        Args:
+            items (dict): Keys to set and their values.
+            deletes (iterable): Keys to remove, applied after items.
+
+        Returns:
+            PersistentMap: The updated map.
+        """
+        root, count = self._root, self._count
+        if items:
+            root, count = self._assoc_all(root, count, items.iteritems())
+
+        result = self._create(root, count)
+        for key in deletes or []:
+            result = result.delete(key)
+        return result
+
+    def iterkeys(self):
+        """Creates an iterator for the keys in the map.
+        """
+        for leaf in self._root.iterleaves():
+            yield leaf.key
+
+    def itervalues(self):
+        """Creates an iterator for the values in the map.
+        """
+        for leaf in self._root.iterleaves():
+            yield leaf.value
+
+    def iteritems(self):
+        """Creates an iterator for the items in the map.
+        """
+        for leaf in self._root.iterleaves():
+            yield leaf.key, leaf.value
+
+    def keys(self):
+        return list(self.iterkeys())
+
+    def to_dict(self):
+        """Returns a dict holding the contents of the map.
+        """
+        return dict(self.iteritems())
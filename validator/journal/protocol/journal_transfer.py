@@ -12,12 +12,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # ------------------------------------------------------------------------------
-
+import base64
+import hashlib
 import logging
 import random
 import sys
+import time
 import traceback
 from collections import OrderedDict
+from collections import deque
 
 from twisted.internet import reactor
 
@@ -33,63 +36,156 @@ from journal.messages.journal_transfer import TransactionReplyMessage
 from journal.messages.journal_transfer import UncommittedListRequestMessage
 from journal.messages.journal_transfer import UncommittedListReplyMessage
 
+from journal.messages.journal_transfer import SnapshotRequestMessage
+from journal.messages.journal_transfer import SnapshotReplyMessage
+
+from journal.messages.journal_transfer import SnapshotChunkRequestMessage
+from journal.messages.journal_transfer import SnapshotChunkReplyMessage
+
 from journal.messages.journal_transfer import TransferFailedMessage
 
 
 logger = logging.getLogger(__name__)
 
 
-def start_journal_transfer(gossip, journal, oncomplete):
+def start_journal_transfer(gossip, journal, oncomplete, window=None,
+                           peers=None, snapshot=False):
     """Initiates journal transfer to peers.
 
     Args:
         journal (journal_core.Journal): The journal to transfer.
         oncomplete (function): The function to call when the
             journal transfer has completed.
+        window (int): The maximum number of outstanding block and
+            transaction requests.
+        peers (int): The maximum number of peers to transfer from.
+        snapshot (bool): Whether to start from a snapshot of the state
+            rather than replaying the chain.
     """
 
-    transfer = JournalTransfer(gossip, journal, oncomplete)
+    transfer = JournalTransfer(gossip, journal, oncomplete, window, peers,
+                               snapshot)
     transfer.initiate_journal_transfer()
 
 
 class JournalTransfer(object):
     """Handles the transfer of a journal to peers.
 
+    The lists of committed blocks and uncommitted transactions are
+    requested from one peer, the source. The blocks and transactions are
+    then requested from up to MaximumPeers peers, keeping up to Window
+    requests outstanding and sending each request to the peer with the
+    fewest outstanding. A request that fails or is not answered within
+    RequestTimeout seconds is sent to another peer, and the transfer is
+    restarted when an item cannot be retrieved after MaximumRetries
+    attempts.
+
+    When UseSnapshot is set the source is first asked for a snapshot of
+    the state at a recent committed block. Blocks carry no hash of the
+    state, so the other peers are asked for the hash of the snapshot of
+    the same block and one of them must confirm it. The snapshot is then
+    retrieved in chunks verified against the hashes sent by the source,
+    the blocks up to the snapshot are retrieved without their
+    transactions, and only the blocks that follow it are validated. The
+    chain is transferred block by block when the source's chain is too
+    short for a snapshot or no other peer confirms it.
+
     Attributes:
         Journal (journal_core.Journal): The journal to transfer.
         Callback (function): The function to call when the
             journal transfer has completed.
+        Window (int): The maximum number of outstanding requests.
+        MaximumPeers (int): The maximum number of peers to transfer from.
+        RequestTimeout (float): Time in seconds to wait for a reply.
+        MaximumRetries (int): The number of attempts to retrieve an item.
+        ProgressInterval (float): Time in seconds between progress
+            reports.
+        UseSnapshot (bool): Whether to start from a snapshot of the
+            state.
     """
-    def __init__(self, gossip, journal, callback):
+
+    Window = 64
+    MaximumPeers = 4
+    RequestTimeout = 10.0
+    MaximumRetries = 5
+    ProgressInterval = 10.0
+    UseSnapshot = False
+
+    def __init__(self, gossip, journal, callback, window=None, peers=None,
+                 snapshot=None):
         """Constructor for the JournalTransfer class.
 
         Args:
             journal (journal_core.Journal): The journal to transfer.
             callback (function): The function to call when
                 the journal transfer has completed.
+            window (int): The maximum number of outstanding requests.
+            peers (int): The maximum number of peers to transfer from.
+            snapshot (bool): Whether to start from a snapshot of the
+                state.
         """
         self.journal = journal
         self.gossip = gossip
         self.callback = callback
 
+        if window is not None:
+            self.Window = max(1, int(window))
+        if peers is not None:
+            self.MaximumPeers = max(1, int(peers))
+        if snapshot is not None:
+            self.UseSnapshot = bool(snapshot)
+
+        self._timer = None
+
+    @property
+    def throughput(self):
+        """The number of blocks and transactions received per second
+        since the transfer started.
+        """
+        elapsed = time.time() - self.StartTime
+        return self.ItemsReceived / elapsed if elapsed > 0 else 0.0
+
     def initiate_journal_transfer(self):
         """Initiates journal transfer to peers.
         """
-        if len(self.gossip.peer_list()) == 0:
+        peers = self.gossip.peer_list()
+        if len(peers) == 0:
             reactor.callLater(10, self.initiate_journal_transfer)
             return
 
-        self.Peer = random.choice(self.gossip.peer_list())
-        logger.info('initiate journal transfer from %s', self.Peer)
+        self.Peers = random.sample(peers, min(len(peers), self.MaximumPeers))
+        self.Peer = self.Peers[0]
+        logger.info('initiate journal transfer from %s using %d peers',
+                    self.Peer, len(self.Peers))
 
         self.BlockMap = OrderedDict()
-        self.PendingBlocks = []
-        self.TransactionMap = OrderedDict()
-        self.PendingTransactions = []
+        self.PendingBlocks = deque()
+        self.TransactionMap = {}
+        self.PendingTransactions = deque()
 
         self.ProcessingUncommitted = False
         self.UncommittedTransactions = []
 
+        # the snapshot the transfer starts from, the chunks received and
+        # the blocks that precede it
+        self.Snapshot = None
+        self.SnapshotChunks = {}
+        self.PendingChunks = deque()
+        self.HeaderIDs = set()
+        self._before_snapshot = False
+        self._confirming = 0
+
+        # outstanding requests by message identifier, and the peers each
+        # item has been requested from
+        self.Outstanding = {}
+        self._attempts = {}
+        self._load = dict((p.Identifier, 0) for p in self.Peers)
+        self._assigned = dict((p.Identifier, 0) for p in self.Peers)
+
+        self.StartTime = time.time()
+        self.ItemsReceived = 0
+        self._next_progress = self.StartTime + self.ProgressInterval
+
         self.journal.dispatcher.register_message_handler(
             BlockListReplyMessage,
             self._blocklistreplyhandler)
@@ -105,93 +201,272 @@ class JournalTransfer(object):
         self.journal.dispatcher.register_message_handler(
             TransferFailedMessage,
             self._failedhandler)
+        self.journal.dispatcher.register_message_handler(
+            SnapshotReplyMessage,
+            self._snapshotreplyhandler)
+        self.journal.dispatcher.register_message_handler(
+            SnapshotChunkReplyMessage,
+            self._chunkreplyhandler)
 
-        request = BlockListRequestMessage()
-        request.BlockListIndex = 0
-        self.gossip.send_message(request, self.Peer.Identifier)
+        if self.UseSnapshot:
+            self._send_list_request(SnapshotRequestMessage())
+        else:
+            request = BlockListRequestMessage()
+            request.BlockListIndex = 0
+            self._send_list_request(request)
 
-    def _failedhandler(self, msg, journal):
-        logger.warn('journal transfer failed')
+        self._timer = reactor.callLater(1.0, self._check_timeouts)
 
-        # clear all of the message handlers
+    def _clear_handlers(self):
         self.journal.dispatcher.clear_message_handler(BlockListReplyMessage)
         self.journal.dispatcher.clear_message_handler(BlockReplyMessage)
         self.journal.dispatcher.clear_message_handler(
             UncommittedListReplyMessage)
         self.journal.dispatcher.clear_message_handler(TransactionReplyMessage)
         self.journal.dispatcher.clear_message_handler(TransferFailedMessage)
+        self.journal.dispatcher.clear_message_handler(SnapshotReplyMessage)
+        self.journal.dispatcher.clear_message_handler(
+            SnapshotChunkReplyMessage)
+
+        if self._timer is not None and self._timer.active():
+            self._timer.cancel()
+        self._timer = None
+
+    def _fail(self, reason):
+        logger.warn('journal transfer failed, %s', reason)
 
+        self._clear_handlers()
+        self.Outstanding = {}
         self.RetryID = reactor.callLater(10, self.initiate_journal_transfer)
 
-    def _kick_off_next_block(self):
+    def _send_list_request(self, request):
         """
-        Check to see if there are any blocks to be received and kick off
-        retrieval of the first one that doesnt already exist in our journal
+        Send a request for a page of the block list or the uncommitted
+        transaction list to the source peer.
         """
-        while len(self.PendingBlocks) > 0:
-            blockid = self.PendingBlocks.pop(0)
-            if blockid not in self.journal.block_store:
-                request = BlockRequestMessage()
-                request.BlockID = blockid
-                self.gossip.send_message(request, self.Peer.Identifier)
-                return True
-
-            # copy the block information
-            self.BlockMap[blockid] = self.journal.block_store[blockid]
-
-            # add all the transaction to the transaction map in order
-            for txnid in self.BlockMap[blockid].TransactionIDs:
+        self.gossip.send_message(request, self.Peer.Identifier)
+        self._load[self.Peer.Identifier] += 1
+        self.Outstanding[request.Identifier] = (
+            'list', None, self.Peer.Identifier,
+            time.time() + self.RequestTimeout)
+
+    def _send_request(self, kind, itemid):
+        """
+        Send a request for a block or a transaction to the peer with the
+        fewest outstanding requests that has not been asked for it yet,
+        ties go to the peer that has been sent the fewest requests.
+
+        Returns:
+            bool: False if the item could not be requested and the
+                transfer has failed.
+        """
+        tried = self._attempts.setdefault((kind, itemid), [])
+        if len(tried) >= self.MaximumRetries:
+            self._fail('unable to retrieve {0} {1}'.format(
+                kind, str(itemid)[:8]))
+            return False
+
+        candidates = [p for p in self._load if p not in tried] or \
+            self._load.keys()
+        if not candidates:
+            self._fail('no peers left to transfer from')
+            return False
+        peerid = min(candidates,
+                     key=lambda p: (self._load[p], self._assigned[p]))
+
+        if kind in ('block', 'header'):
+            request = BlockRequestMessage()
+            request.BlockID = itemid
+        elif kind == 'chunk':
+            request = SnapshotChunkRequestMessage()
+            request.BlockID = self.Snapshot.BlockID
+            request.Index = itemid
+        else:
+            request = TransactionRequestMessage()
+            request.TransactionID = itemid
+        self.gossip.send_message(request, peerid)
+
+        tried.append(peerid)
+        self._load[peerid] += 1
+        self._assigned[peerid] += 1
+        self.Outstanding[request.Identifier] = (
+            kind, itemid, peerid, time.time() + self.RequestTimeout)
+        return True
+
+    def _complete(self, requestid):
+        """
+        Remove an answered request from the outstanding requests, returns
+        the request or None if it was not outstanding.
+        """
+        request = self.Outstanding.pop(requestid, None)
+        if request is not None and request[2] in self._load:
+            self._load[request[2]] -= 1
+        return request
+
+    def _retry(self, request):
+        (kind, itemid, peerid, _) = request
+        if kind == 'confirm':
+            # a peer that cannot answer does not confirm the snapshot
+            self._confirm_snapshot(None)
+            return True
+        if kind == 'list':
+            self._fail('no list reply from {0}'.format(
+                self.gossip.node_id_to_name(peerid)))
+            return False
+
+        logger.debug('retry request for %s %s sent to %s', kind,
+                     str(itemid)[:8], self.gossip.node_id_to_name(peerid))
+        if kind in ('block', 'header'):
+            self.PendingBlocks.appendleft(itemid)
+        elif kind == 'chunk':
+            self.PendingChunks.appendleft(itemid)
+        else:
+            self.PendingTransactions.appendleft(itemid)
+        return True
+
+    def _drop_peer(self, peerid):
+        """
+        Stop transferring from a peer and retry its outstanding requests.
+        """
+        logger.info('stop journal transfer from %s',
+                    self.gossip.node_id_to_name(peerid))
+        self._load.pop(peerid, None)
+        for requestid, request in self.Outstanding.items():
+            if request[2] == peerid:
+                del self.Outstanding[requestid]
+                if not self._retry(request):
+                    return False
+
+        if not self._load:
+            self._fail('no peers left to transfer from')
+            return False
+        return True
+
+    def _check_timeouts(self):
+        now = time.time()
+        for requestid, request in self.Outstanding.items():
+            if request[3] <= now and requestid in self.Outstanding:
+                self._complete(requestid)
+                if not self._retry(request):
+                    return
+
+        if now >= self._next_progress:
+            self._next_progress = now + self.ProgressInterval
+            logger.info(
+                'journal transfer progress, %d of %d blocks, %d of %d '
+                'transactions, %d outstanding requests, %.1f items/sec',
+                sum(1 for b in self.BlockMap.itervalues() if b),
+                len(self.BlockMap),
+                sum(1 for t in self.TransactionMap.itervalues() if t),
+                len(self.TransactionMap), len(self.Outstanding),
+                self.throughput)
+
+        self._timer = reactor.callLater(1.0, self._check_timeouts)
+        self._fill_window()
+
+    def _add_block(self, block):
+        self.BlockMap[block.Identifier] = block
+        for txnid in block.TransactionIDs:
+            if txnid not in self.TransactionMap:
                 self.TransactionMap[txnid] = None
                 self.PendingTransactions.append(txnid)
 
-        # there were no blocks, but we might have added transactions to the
-        # queue to return so kick off a transaction request for the next one
-        return self._kick_off_next_transaction()
-
-    def _kick_off_next_transaction(self):
+    def _fill_window(self):
+        """
+        Request blocks, transactions and snapshot chunks until the window
+        is full, the transactions of the blocks already received go
+        first. Blocks and transactions already in the journal are copied
+        rather than requested.
         """
-        Check to see if there are any transactions to be received and kick off
-        retrieval of the first one that doesnt already exist in our journal
+        while len(self.Outstanding) < self.Window:
+            if self.PendingTransactions:
+                txnid = self.PendingTransactions.popleft()
+                if self.TransactionMap.get(txnid):
+                    continue
+                if txnid in self.journal.transaction_store:
+                    self.TransactionMap[txnid] = \
+                        self.journal.transaction_store[txnid]
+                    continue
+                if not self._send_request('txn', txnid):
+                    return
+            elif self.PendingChunks:
+                index = self.PendingChunks.popleft()
+                if not self._send_request('chunk', index):
+                    return
+            elif self.PendingBlocks:
+                blockid = self.PendingBlocks.popleft()
+                if self.BlockMap.get(blockid):
+                    continue
+                if blockid in self.HeaderIDs:
+                    if blockid in self.journal.block_store:
+                        self.BlockMap[blockid] = \
+                            self.journal.block_store[blockid]
+                        continue
+                    if not self._send_request('header', blockid):
+                        return
+                    continue
+                if blockid in self.journal.block_store:
+                    self._add_block(self.journal.block_store[blockid])
+                    continue
+                if not self._send_request('block', blockid):
+                    return
+            else:
+                break
+
+        if not self.Outstanding:
+            self._advance()
+
+    def _advance(self):
         """
-        while len(self.PendingTransactions) > 0:
-            txnid = self.PendingTransactions.pop(0)
-            if txnid not in self.journal.transaction_store:
-                request = TransactionRequestMessage()
-                request.TransactionID = txnid
-                self.gossip.send_message(request, self.Peer.Identifier)
-                return True
+        Move on once every requested block and transaction has arrived,
+        to the uncommitted transactions after the blocks and to the end of
+        the transfer after the uncommitted transactions.
+        """
+        if self._before_snapshot:
+            self._fail('snapshot block {0} is not in the chain of {1}'.format(
+                self.Snapshot.BlockID[:8], self.Peer))
+            return
 
-            self.TransactionMap[txnid] = self.journal.transaction_store[txnid]
+        if not self.ProcessingUncommitted:
+            self.ProcessingUncommitted = True
+            request = UncommittedListRequestMessage()
+            request.TransactionListIndex = 0
+            self._send_list_request(request)
+            return
 
-        return False
+        self._finish()
 
     def _blocklistreplyhandler(self, msg, journal):
+        if self._complete(msg.InReplyTo) is None:
+            return
+
         logger.debug('request %s, received %d block identifiers from %s',
                      msg.InReplyTo[:8], len(msg.BlockIDs), self.Peer.Name)
 
-        # add all the blocks to the block map in order
+        # add all the blocks to the block map in order, the blocks up to
+        # the snapshot are retrieved without their transactions
         for blockid in msg.BlockIDs:
             self.BlockMap[blockid] = None
             self.PendingBlocks.append(blockid)
+            if self._before_snapshot:
+                self.HeaderIDs.add(blockid)
+                if blockid == self.Snapshot.BlockID:
+                    self._before_snapshot = False
 
         # if we received any block ids at all then we need to go back and ask
         # for more when no more are returned, then we know we have all of them
         if len(msg.BlockIDs) > 0:
             request = BlockListRequestMessage()
             request.BlockListIndex = msg.BlockListIndex + len(msg.BlockIDs)
-            self.gossip.send_message(request, self.Peer.Identifier)
-            return
-
-        # no more block list messages, now start grabbing blocks
-        if self._kick_off_next_block():
-            return
+            self._send_list_request(request)
 
-        # kick off retrieval of the uncommitted transactions
-        request2 = UncommittedListRequestMessage()
-        request2.TransactionListIndex = 0
-        self.gossip.send_message(request2, self.Peer.Identifier)
+        # start grabbing blocks while the rest of the list arrives
+        self._fill_window()
 
     def _txnlistreplyhandler(self, msg, journal):
+        if self._complete(msg.InReplyTo) is None:
+            return
+
         logger.debug(
             'request %s, received %d uncommitted transactions from %s',
             msg.InReplyTo[:8],
@@ -200,26 +475,26 @@ class JournalTransfer(object):
 
         # save the uncommitted transactions
         for txnid in msg.TransactionIDs:
-            self.UncommittedTransactions.append(txnid)
+            if txnid not in self.TransactionMap:
+                self.UncommittedTransactions.append(txnid)
+                self.TransactionMap[txnid] = None
+                self.PendingTransactions.append(txnid)
 
         if len(msg.TransactionIDs) > 0:
             request = UncommittedListRequestMessage()
             request.TransactionListIndex = msg.TransactionListIndex + len(
                 msg.TransactionIDs)
-            self.gossip.send_message(request, self.Peer.Identifier)
-            return
+            self._send_list_request(request)
 
-        # if there are no more transactions, then get the next block
-        if self._kick_off_next_block():
-            return
-
-        self._handleuncommitted()
+        self._fill_window()
 
     def _blockreplyhandler(self, msg, journal):
-        # leaving this as info to provide some feedback in the log for
-        # ongoing progress on the journal transfer
-        logger.info('request %s, received block from %s', msg.InReplyTo[:8],
-                    self.Peer.Name)
+        request = self._complete(msg.InReplyTo)
+        if request is None:
+            return
+
+        logger.debug('request %s, received block from %s', msg.InReplyTo[:8],
+                     self.gossip.node_id_to_name(request[2]))
 
         # the actual transaction block is encapsulated in a message within the
         # reply message so we need to decode it here... this is mostly to make
@@ -228,28 +503,28 @@ class JournalTransfer(object):
         bmessage = self.gossip.dispatcher.unpack_message(
             btype, msg.TransactionBlockMessage)
 
-        self.BlockMap[
-            bmessage.TransactionBlock.Identifier] = bmessage.TransactionBlock
-
-        # add all the transaction to the transaction map in order
-        for txnid in bmessage.TransactionBlock.TransactionIDs:
-            self.TransactionMap[txnid] = None
-            self.PendingTransactions.append(txnid)
+        if bmessage.TransactionBlock.Identifier != request[1]:
+            logger.warn('received block %s in reply to request for %s',
+                        bmessage.TransactionBlock.Identifier[:8],
+                        request[1][:8])
+            self._retry(request)
+        elif request[0] == 'header':
+            self.ItemsReceived += 1
+            self.BlockMap[request[1]] = bmessage.TransactionBlock
+        else:
+            self.ItemsReceived += 1
+            self._add_block(bmessage.TransactionBlock)
 
-        # check to see if there are any transactions
-        if self._kick_off_next_transaction():
-            return
+        self._fill_window()
 
-        # and if there are no more transactions then
-        # check to see if there are more blocks
-        if self._kick_off_next_block():
+    def _txnreplyhandler(self, msg, journal):
+        request = self._complete(msg.InReplyTo)
+        if request is None:
             return
 
-        self._handleuncommitted()
-
-    def _txnreplyhandler(self, msg, journal):
         logger.debug('request %s, received transaction from %s',
-                     msg.InReplyTo[:8], self.Peer.Name)
+                     msg.InReplyTo[:8],
+                     self.gossip.node_id_to_name(request[2]))
 
         # the actual transaction is encapsulated in a message within the reply
         # message so we need to decode it here... this is mostly to make sure
@@ -258,47 +533,169 @@ class JournalTransfer(object):
         tmessage = self.gossip.dispatcher.unpack_message(
             ttype, msg.TransactionMessage)
 
-        self.TransactionMap[
-            tmessage.Transaction.Identifier] = tmessage.Transaction
+        if tmessage.Transaction.Identifier != request[1]:
+            logger.warn('received transaction %s in reply to request for %s',
+                        tmessage.Transaction.Identifier[:8], request[1][:8])
+            self._retry(request)
+        else:
+            self.ItemsReceived += 1
+            self.TransactionMap[request[1]] = tmessage.Transaction
+
+        self._fill_window()
 
-        # if there are more transaction pending for this block, then kick off
-        # retrieval of the next one
-        if self._kick_off_next_transaction():
+    def _snapshotreplyhandler(self, msg, journal):
+        request = self._complete(msg.InReplyTo)
+        if request is None:
             return
 
-        # finished the last block, now its time to start the next one, send
-        # a request for it
-        if self._kick_off_next_block():
+        if request[0] == 'confirm':
+            if msg.BlockID == self.Snapshot.BlockID:
+                self._confirm_snapshot(msg.Hash)
+            else:
+                self._confirm_snapshot(None)
             return
 
-        self._handleuncommitted()
+        if msg.BlockID is None:
+            logger.info('no snapshot available from %s, replay the chain',
+                        self.Peer)
+            self._request_block_list()
+            return
 
-    def _handleuncommitted(self):
-        logger.debug('transition to uncommitted messages')
+        # ask the other peers for the hash of the snapshot of the same
+        # block before any of it is retrieved
+        self.Snapshot = msg
+        for peerid in self._load.keys():
+            if peerid == self.Peer.Identifier:
+                continue
+            request = SnapshotRequestMessage()
+            request.BlockID = msg.BlockID
+            self.gossip.send_message(request, peerid)
+            self._load[peerid] += 1
+            self.Outstanding[request.Identifier] = (
+                'confirm', msg.BlockID, peerid,
+                time.time() + self.RequestTimeout)
+            self._confirming += 1
+
+        if not self._confirming:
+            logger.info('no peer to confirm the snapshot from %s, replay '
+                        'the chain', self.Peer)
+            self.Snapshot = None
+            self._request_block_list()
+
+    def _confirm_snapshot(self, snapshot_hash):
+        """
+        Record the hash of the snapshot reported by another peer, the
+        snapshot is retrieved once a peer reports the same hash as the
+        source and the chain is replayed if a peer reports another hash
+        or no peer confirms it.
+        """
+        if not self._confirming:
+            return
+        self._confirming -= 1
+
+        if snapshot_hash == self.Snapshot.Hash:
+            logger.info('transfer snapshot of block %s, %d bytes in %d '
+                        'chunks', self.Snapshot.BlockID[:8],
+                        self.Snapshot.Size, len(self.Snapshot.ChunkHashes))
+            self.PendingChunks.extend(xrange(len(self.Snapshot.ChunkHashes)))
+            self._before_snapshot = True
+        elif snapshot_hash is not None:
+            logger.warn('peers disagree on the snapshot of block %s, '
+                        'replay the chain', self.Snapshot.BlockID[:8])
+            self.Snapshot = None
+        elif self._confirming:
+            return
+        else:
+            logger.info('snapshot of block %s is not confirmed, replay the '
+                        'chain', self.Snapshot.BlockID[:8])
+            self.Snapshot = None
+
+        # the remaining answers are not needed
+        self._confirming = 0
+        for requestid, request in self.Outstanding.items():
+            if request[0] == 'confirm':
+                self._complete(requestid)
+        self._request_block_list()
+
+    def _request_block_list(self):
+        request = BlockListRequestMessage()
+        request.BlockListIndex = 0
+        self._send_list_request(request)
+        self._fill_window()
 
-        if not self.ProcessingUncommitted and len(
-                self.UncommittedTransactions) > 0:
-            self.ProcessingUncommitted = True
+    def _chunkreplyhandler(self, msg, journal):
+        request = self._complete(msg.InReplyTo)
+        if request is None:
+            return
 
-            for txnid in self.UncommittedTransactions:
-                self.TransactionMap[txnid] = None
-                self.PendingTransactions.append(txnid)
+        data = base64.b64decode(msg.Data)
+        if request[1] != msg.Index or hashlib.sha256(data).hexdigest() != \
+                self.Snapshot.ChunkHashes[msg.Index]:
+            logger.warn('received invalid snapshot chunk %d from %s',
+                        msg.Index, self.gossip.node_id_to_name(request[2]))
+            self._retry(request)
+        else:
+            self.ItemsReceived += 1
+            self.SnapshotChunks[msg.Index] = data
+
+        self._fill_window()
 
-            # now kick off the retrieval of the first transaction
-            if self._kick_off_next_transaction():
+    def _install_snapshot(self):
+        """
+        Install the snapshot and the blocks that precede it in the
+        journal, returns False if the snapshot is not valid.
+        """
+        snapshot = ''.join(self.SnapshotChunks[i]
+                           for i in xrange(len(self.Snapshot.ChunkHashes)))
+        if hashlib.sha256(snapshot).hexdigest() != self.Snapshot.Hash:
+            self._fail('invalid snapshot from {0}'.format(self.Peer))
+            return False
+
+        headers = [b for (i, b) in self.BlockMap.iteritems()
+                   if i in self.HeaderIDs]
+        try:
+            self.journal.install_snapshot(headers, snapshot)
+        except (ValueError, KeyError) as e:
+            self._fail('unable to install snapshot, {0}'.format(e))
+            return False
+
+        for blockid in self.HeaderIDs:
+            del self.BlockMap[blockid]
+        return True
+
+    def _failedhandler(self, msg, journal):
+        if msg.InReplyTo is not None:
+            request = self._complete(msg.InReplyTo)
+            if request is None or not self._retry(request):
+                return
+        else:
+            # older peers do not say which request failed, stop using them
+            if msg.SenderID not in self._load:
+                return
+            if msg.SenderID == self.Peer.Identifier:
+                self._fail('transfer failed at {0}'.format(self.Peer))
+                return
+            if not self._drop_peer(msg.SenderID):
                 return
 
-        self._finish()
+        self._fill_window()
 
     def _finish(self):
         # everything has been returned... time to update the journal,
         # first copy the transactions over and apply them to the
         # global store, then copy the blocks in
+        self._clear_handlers()
+        if self.Snapshot is not None and not self._install_snapshot():
+            return
+
+        txnids = [t for b in self.BlockMap.itervalues()
+                  for t in b.TransactionIDs]
+        txnids.extend(self.UncommittedTransactions)
 
         try:
-            for txnid, txn in self.TransactionMap.iteritems():
-                self.journal.add_pending_transaction(txn,
-                                                     build_block=False)
+            for txnid in txnids:
+                self.journal.add_pending_transaction(
+                    self.TransactionMap[txnid], build_block=False)
 
             for blkid, blk in self.BlockMap.iteritems():
                 self.journal.commit_transaction_block(blk)
@@ -316,18 +713,10 @@ class JournalTransfer(object):
                 str(sys.exc_info()[0]))
 
         logger.info(
-            'journal transferred from %s, %d transactions, %d blocks, current '
-            'head is %s',
-            self.Peer, len(self.TransactionMap), len(self.BlockMap),
+            'journal transferred from %d peers, %d transactions, %d blocks, '
+            '%.1f items/sec, current head is %s',
+            len(self.Peers), len(self.TransactionMap), len(self.BlockMap),
+            self.throughput,
             self.journal.most_recent_committed_block_id[:8])
 
-        # clear all of the message handlers
-        self.journal.dispatcher.clear_message_handler(BlockListReplyMessage)
-        self.journal.dispatcher.clear_message_handler(BlockReplyMessage)
-        self.journal.dispatcher.clear_message_handler(
-            UncommittedListReplyMessage)
-        self.journal.dispatcher.clear_message_handler(TransactionReplyMessage)
-        self.journal.dispatcher.clear_message_handler(TransferFailedMessage)
-
-        # self.RetryID.cancel()
         self.callback()
@@ -78,6 +78,13 @@ class Transaction(signed_object.SignedObject):
         Transaction.TransactionTypeName (str): The name of the transaction
             type.
         Transaction.MessageType (type): The transaction class.
+        Transaction.MutatesStoreValues (bool): Whether the transaction
+            family modifies values retrieved from its store in place.
+            Families that do not can set this to False so their store
+            returns values without copying them.
+        Transaction.LocalAttributes (tuple): The names of the attributes
+            the local node keeps about the transaction that are not
+            part of its wire form.
         Nonce (float): A locally unique identifier.
         Transaction.Status (transaction.Status): The status of the transaction.
         Dependencies (list): A list of transactions that this transaction
@@ -86,6 +93,8 @@ class Transaction(signed_object.SignedObject):
 
     TransactionTypeName = '/Transaction'
     MessageType = transaction_message.TransactionMessage
+    MutatesStoreValues = True
+    LocalAttributes = ('Status', 'InBlock', '_age')
 
     def __init__(self, minfo=None):
         """Constructor for the Transaction class.
@@ -151,6 +160,18 @@ class Transaction(signed_object.SignedObject):
     def apply(self, store):
         pass
 
+    def read_write_sets(self):
+        """Reports the keys of the transaction store that the
+        transaction reads and writes, used to validate transactions that
+        do not conflict in parallel.
+
+        Returns:
+            tuple: A (reads, writes) tuple of sets of keys, or None if
+                the keys cannot be determined before the transaction is
+                applied.
+        """
+        return None
+
     def add_to_pending(self):
         """Predicate to note that a transaction should be added to pending
         transactions.
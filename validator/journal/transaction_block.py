@@ -35,7 +35,7 @@ class Status(object):
     incomplete = 0
     complete = 1
     valid = 2
-    invalid = 3,
+    invalid = 3
     retry = 4
 
 
@@ -54,9 +54,13 @@ class TransactionBlock(signed_object.SignedObject):
         TransactionBlock.Status (transaction_block.Status): The status of the
             block.
         TransactionDepth (int): The number of transactions on the block.
+        TransactionBlock.LocalAttributes (tuple): The names of the
+            attributes the local node keeps about the block that are not
+            part of its wire form.
     """
     TransactionBlockTypeName = "/TransactionBlock"
     MessageType = transaction_block_message.TransactionBlockMessage
+    LocalAttributes = ('Status', 'TransactionDepth', 'CommitTime')
 
     def __init__(self, minfo=None):
         """Constructor for the TransactionBlock class.
@@ -110,12 +114,29 @@ class TransactionBlock(signed_object.SignedObject):
     def is_valid(self, journal):
         """Verify that the block received is valid.
 
-        For now this simply verifies that the signature is correct.
+        For now this simply verifies that the signatures of the block and
+        of the transactions in it are correct, the signatures are checked
+        together in one batch.
 
         Args:
             journal (journal.Journal): Journal for pulling context.
         """
-        return super(TransactionBlock, self).is_valid(None)
+        return all(signed_object.verify_signatures(
+            [self] + self.known_transactions(journal)))
+
+    def known_transactions(self, journal):
+        """Returns the transactions in the block that are in the
+        transaction store.
+
+        Args:
+            journal (journal.Journal): Journal for pulling context.
+
+        Returns:
+            list: The transactions that are not missing.
+        """
+        return [journal.transaction_store[txnid]
+                for txnid in self.TransactionIDs
+                if txnid in journal.transaction_store]
 
     def missing_transactions(self, journal):
         """Verify that all the transaction references in the block exist
@@ -0,0 +1,172 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import logging
+import multiprocessing
+
+logger = logging.getLogger(__name__)
+
+
+def _execute_transaction(args):
+    """Validates and applies a transaction to a store holding the values
+    of the keys it accesses. Runs in a worker process.
+
+    Args:
+        args (tuple): The transaction and a dict of the values of the
+            keys it reads and writes.
+
+    Returns:
+        dict: The output of the dump() method of the store holding the
+            changes made by the transaction, or None if the transaction
+            is not valid.
+    """
+    txn, values = args
+    store = txn.TransactionStoreType(
+        None, {'Store': values, 'DeletedKeys': []}, True)
+    store.commit()
+    store = store.clone_store()
+
+    if not txn.is_valid(store):
+        return None
+
+    txn.apply(store)
+    return store.dump(True)
+
+
+class TransactionExecutor(object):
+    """The TransactionExecutor class validates and applies the
+    transactions of a block to a block store.
+
+    Runs of consecutive transactions that report their store accesses
+    through read_write_sets() and do not conflict with one another are
+    validated in a pool of worker processes; their changes are merged
+    into the block store in block order, so the resulting state is the
+    same as applying the transactions one at a time. Transactions that
+    do not report their accesses are applied serially.
+
+    Attributes:
+        workers (int): The number of worker processes, no pool is used
+            if this is less than two.
+        minimum_batch_size (int): The smallest run of non-conflicting
+            transactions that is sent to the pool.
+    """
+
+    def __init__(self, workers=0, minimum_batch_size=None):
+        """Constructor for the TransactionExecutor class.
+
+        Args:
+            workers (int): The number of worker processes.
+            minimum_batch_size (int): The smallest run of
+                non-conflicting transactions that is sent to the pool,
+                defaults to the number of workers.
+        """
+        self.workers = workers or 0
+        self.minimum_batch_size = minimum_batch_size or self.workers
+        self._pool = None
+        if self.workers > 1:
+            self._pool = multiprocessing.Pool(self.workers)
+
+    def close(self):
+        """Stops the worker processes.
+        """
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+    def execute(self, transactions, blockstore):
+        """Validates and applies transactions in order.
+
+        Args:
+            transactions (list): The transactions to apply.
+            blockstore (BlockStore): The store the transactions are
+                applied to.
+
+        Returns:
+            bool: Whether all of the transactions were valid.
+        """
+        batch = []
+        reads = set()
+        writes = set()
+
+        for txn in transactions:
+            accesses = None
+            if self._pool is not None:
+                accesses = txn.read_write_sets()
+
+            if accesses is None:
+                if not self._execute_batch(batch, blockstore):
+                    return False
+                batch = []
+                reads = set()
+                writes = set()
+                if not self._execute_serial(txn, blockstore):
+                    return False
+                continue
+
+            tname = txn.TransactionTypeName
+            txnreads = set((tname, k) for k in accesses[0])
+            txnwrites = set((tname, k) for k in accesses[1])
+            if txnwrites & (reads | writes) or txnreads & writes:
+                if not self._execute_batch(batch, blockstore):
+                    return False
+                batch = []
+                reads = set()
+                writes = set()
+
+            batch.append((txn, accesses[0] | accesses[1]))
+            reads |= txnreads
+            writes |= txnwrites
+
+        return self._execute_batch(batch, blockstore)
+
+    @staticmethod
+    def _execute_serial(txn, blockstore):
+        txnstore = blockstore.get_transaction_store(txn.TransactionTypeName)
+        if not txn.is_valid(txnstore):
+            return False
+
+        txn.apply(txnstore)
+        return True
+
+    def _execute_batch(self, batch, blockstore):
+        if len(batch) < max(2, self.minimum_batch_size):
+            for txn, _ in batch:
+                if not self._execute_serial(txn, blockstore):
+                    return False
+            return True
+
+        args = []
+        for txn, keys in batch:
+            txnstore = blockstore.get_transaction_store(
+                txn.TransactionTypeName)
+            values = dict((k, txnstore[k]) for k in keys if k in txnstore)
+            args.append((txn, values))
+
+        results = self._pool.map(_execute_transaction, args)
+
+        for (txn, _), result in zip(batch, results):
+            if result is None:
+                logger.debug('txnid: %s - invalid in parallel validation',
+                             txn.Identifier[:8])
+                return False
+
+            txnstore = blockstore.get_transaction_store(
+                txn.TransactionTypeName)
+            for key, value in result['Store'].iteritems():
+                txnstore[key] = value
+            for key in result['DeletedKeys']:
+                txnstore.delete(key)
+
+        return True
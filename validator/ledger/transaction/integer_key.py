@@ -179,12 +179,15 @@ class IntegerKeyTransaction(transaction.Transaction):
             transaction store.
         IntegerKeyTransaction.MessageType (type): The object type of the
             message associated with this transaction.
+        IntegerKeyTransaction.MutatesStoreValues (bool): Integer key
+            values are never modified in place.
         Updates (list): A list of integer key registry updates associated
             with this transaction.
     """
     TransactionTypeName = '/IntegerKeyTransaction'
     TransactionStoreType = global_store_manager.KeyValueStore
     MessageType = IntegerKeyTransactionMessage
+    MutatesStoreValues = False
 
     def __init__(self, minfo=None):
         """Constructor for the IntegerKeyTransaction class.
@@ -226,6 +229,16 @@ class IntegerKeyTransaction(transaction.Transaction):
         for update in self.Updates:
             update.apply(store)
 
+    def read_write_sets(self):
+        """Returns the keys read and written by the updates in the
+        transaction.
+
+        Returns:
+            tuple: A (reads, writes) tuple of sets of keys.
+        """
+        names = set(update.Name for update in self.Updates)
+        return names, names
+
     def dump(self):
         """Returns a dict with attributes from the transaction object.
 
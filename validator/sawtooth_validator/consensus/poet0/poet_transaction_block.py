@@ -71,6 +71,8 @@ class PoetTransactionBlock(transaction_block.TransactionBlock):
     """
     TransactionBlockTypeName = '/Poet/PoetTransactionBlock'
     MessageType = PoetTransactionBlockMessage
+    LocalAttributes = transaction_block.TransactionBlock.LocalAttributes + \
+        ('aggregate_local_mean',)
 
     def __init__(self, minfo=None):
         """Constructor for the PoetTransactionBlock class.
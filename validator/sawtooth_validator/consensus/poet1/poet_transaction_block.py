@@ -72,6 +72,8 @@ class PoetTransactionBlock(transaction_block.TransactionBlock):
     """
     TransactionBlockTypeName = '/Poet/PoetTransactionBlock'
     MessageType = PoetTransactionBlockMessage
+    LocalAttributes = transaction_block.TransactionBlock.LocalAttributes + \
+        ('aggregate_local_mean',)
 
     def __init__(self, minfo=None):
         """Constructor for the PoetTransactionBlock class.
@@ -218,7 +220,7 @@ class PoetTransactionBlock(transaction_block.TransactionBlock):
                 registration = store.get(self.OriginatorID)
                 poet_public_key = registration.get('poet-public-key')
             except KeyError:
-                if len(journal.committed_block_ids()) == 0:
+                if journal.committed_chain_length == 0:
                     LOGGER.info('processing seed block')
                     if len(store.keys()) != 0:
                         LOGGER.info('validator registry already seeded')
@@ -56,6 +56,7 @@ class QuorumBallotMessage(message.Message):
     MessageType = \
         "/sawtooth_validator.consensus." \
         "quorum.messages.QuorumBallot/Quorum/Ballot"
+    DispatchLane = 'consensus'
 
     def __init__(self, minfo=None):
         """Constructor for QuorumBallotMessage.
@@ -130,6 +131,7 @@ class QuorumInitiateVoteMessage(message.Message):
     MessageType = \
         "/sawtooth_validator.consensus.quorum.messages.QuorumBallot" \
         "/Quorum/InitiateVote"
+    DispatchLane = 'consensus'
 
     def __init__(self, minfo=None):
         """Constructor for QuorumInitiateVoteMessage.
@@ -194,6 +196,7 @@ class QuorumCompleteVoteMessage(message.Message):
     MessageType = \
         "/sawtooth_validator.consensus.quorum.messages.QuorumBallot" \
         "/Quorum/CompleteVote"
+    DispatchLane = 'consensus'
 
     def __init__(self, minfo=None):
         """Constructor for QuorumCompleteVoteMessage.
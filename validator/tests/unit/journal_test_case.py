@@ -0,0 +1,82 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import shutil
+import tempfile
+import unittest
+
+from sawtooth_validator.consensus.dev_mode.dev_mode_consensus \
+    import DevModeConsensus
+from gossip import signed_object
+from gossip.gossip_core import Gossip
+from gossip.node import Node
+from journal.journal_core import Journal
+
+
+class JournalTestCase(unittest.TestCase):
+    """The base class of the tests of a Journal running the dev mode
+    consensus on a local node, with PeerCount peers added to its gossip.
+    The messages sent to peers are recorded in _sent rather than sent.
+    """
+
+    PeerCount = 0
+
+    # every node gets its own port across all the test cases
+    _next_port = 10100
+
+    def _create_node(self):
+        signingkey = signed_object.generate_signing_key()
+        ident = signed_object.generate_identifier(signingkey)
+        node = Node(identifier=ident, signingkey=signingkey,
+                    address=("localhost", JournalTestCase._next_port))
+        JournalTestCase._next_port += 1
+        return node
+
+    def setUp(self):
+        self._node = self._create_node()
+        self._gossip = Gossip(self._node)
+        self._peers = [self._create_node() for _ in range(self.PeerCount)]
+        for peer in self._peers:
+            peer.is_peer = True
+            self._gossip.add_node(peer)
+
+        self._sent = []
+        self._gossip.send_message = self._send_message
+
+        self._directory = tempfile.mkdtemp()
+        self._journal = self._open_journal()
+
+    def tearDown(self):
+        self._journal.shutdown()
+        self._gossip.shutdown()
+        shutil.rmtree(self._directory)
+
+    def _send_message(self, msg, nodeid):
+        self._sent.append((msg, nodeid))
+
+    def _open_journal(self, **kwargs):
+        """
+        Open a journal in the data directory of the test, the keyword
+        arguments are passed to the Journal
+        """
+        journal = Journal(
+            self._gossip.LocalNode,
+            self._gossip,
+            self._gossip.dispatcher,
+            consensus=DevModeConsensus(),
+            data_directory=self._directory,
+            **kwargs)
+        journal.initializing = False
+        return journal
@@ -0,0 +1,88 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+from twisted.web import http
+
+from ledger.transaction import integer_key
+from txnserver.web_pages.batch_page import BatchPage
+from web_page_test_case import WebPageTestCase
+
+
+class TestBatchPage(WebPageTestCase):
+
+    def _open_journal(self):
+        journal = super(TestBatchPage, self)._open_journal()
+        integer_key.register_transaction_types(journal)
+        return journal
+
+    def setUp(self):
+        super(TestBatchPage, self).setUp()
+        self._batch = self._page(BatchPage)
+        self._queue = self._gossip.IncomingMessageQueue
+
+    def _message(self, name, verb='set', value=1):
+        txn = integer_key.IntegerKeyTransaction({
+            'Updates': [{'Verb': verb, 'Name': name, 'Value': value}],
+            'Dependencies': []})
+        txn.sign_from_node(self._node)
+        return txn.build_message().dump()
+
+    def _submit(self, minfos):
+        (code, results) = self._post(self._batch, '/batch', minfos)
+        self.assertEqual(code, http.OK)
+        return [r['Status'] for r in results]
+
+    def test_results(self):
+        forged = self._message('c')
+        forged['Transaction']['Signature'] = 'not a signature'
+        statuses = self._submit([
+            self._message('a'),
+            self._message('b', verb='inc'),
+            {'__TYPE__': 'unknown'},
+            forged,
+            # a failure other than an invalid transaction only rejects
+            # the transaction that caused it
+            self._message(['e']),
+            # the valid transactions before it in the batch are applied
+            self._message('a', verb='inc')])
+        self.assertEqual(statuses, ['accepted', 'rejected', 'rejected',
+                                    'rejected', 'rejected', 'accepted'])
+        self.assertEqual(len(self._queue), 2)
+
+    def test_queued_transactions_are_applied(self):
+        # a transaction may depend on one accepted by an earlier request
+        # that has not been dispatched yet
+        self.assertEqual(self._submit([self._message('a')]), ['accepted'])
+        self.assertEqual(self._submit([self._message('a', verb='inc')]),
+                         ['accepted'])
+        self.assertEqual(len(self._queue), 2)
+
+    def test_busy(self):
+        # once a transaction is refused the ones that follow it are too,
+        # they were checked assuming it is applied
+        self._queue.lane('transaction').Bound = 2
+        statuses = self._submit([self._message('a'),
+                                 self._message('a', verb='inc'),
+                                 self._message('a', verb='inc', value=2),
+                                 self._message('b')])
+        self.assertEqual(statuses, ['accepted', 'accepted', 'busy', 'busy'])
+        self.assertEqual(len(self._queue), 2)
+
+    def test_too_large(self):
+        self._batch.max_batch_size = 2
+        (code, _) = self._post(self._batch, '/batch',
+                               [self._message(str(i)) for i in range(3)])
+        self.assertEqual(code, http.REQUEST_ENTITY_TOO_LARGE)
+        self.assertEqual(len(self._queue), 0)
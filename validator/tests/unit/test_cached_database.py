@@ -0,0 +1,105 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from journal.database.database import CachedDatabase
+from journal.database.lmdb_database import LMDBDatabase
+from journal.database.shelf_database import ShelfDatabase
+
+
+class _CountingDatabase(object):
+    """Wraps a database and counts the writes made to it.
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self.sets = 0
+        self.batches = 0
+
+    def __getattr__(self, attr):
+        return getattr(self.database, attr)
+
+    def __contains__(self, key):
+        return key in self.database
+
+    def __len__(self):
+        return len(self.database)
+
+    def set(self, key, value):
+        self.sets += 1
+        self.database.set(key, value)
+
+    def set_batch(self, add_pairs, del_keys=None):
+        self.batches += 1
+        self.database.set_batch(add_pairs, del_keys)
+
+
+class TestCachedDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    def _open(self, cls, name, flag='n'):
+        return cls(os.path.join(self._directory, name), flag)
+
+    def _test_write_back(self, cls):
+        counting = _CountingDatabase(self._open(cls, 'db'))
+        db = CachedDatabase(counting, cache_limit=2)
+
+        db['a'] = {'Status': 0}
+        db['a'] = {'Status': 1}
+        db['b'] = 2
+        self.assertEqual(counting.sets, 0)
+        self.assertNotIn('a', counting.database)
+        self.assertEqual(db['a'], {'Status': 1})
+
+        # evicting the least recently used dirty value writes it
+        db['c'] = 3
+        self.assertEqual(counting.sets, 1)
+        self.assertEqual(counting.database.get('b'), 2)
+
+        db.sync()
+        self.assertEqual(counting.batches, 1)
+        self.assertEqual(counting.database.get('a'), {'Status': 1})
+        self.assertEqual(counting.database.get('c'), 3)
+
+        # reads populate the cache
+        self.assertEqual(db['b'], 2)
+        self.assertEqual(db['b'], 2)
+        self.assertEqual((db.hits, db.misses), (2, 1))
+
+        db['d'] = 4
+        db.delete('d')
+        db.delete('a')
+        self.assertIsNone(db.get('d'))
+        self.assertEqual(sorted(db.keys()), ['b', 'c'])
+        db.close()
+
+        reopened = self._open(cls, 'db', 'c')
+        self.assertEqual(sorted(reopened.keys()), ['b', 'c'])
+        reopened.close()
+
+    def test_lmdb(self):
+        self._test_write_back(LMDBDatabase)
+
+    def test_shelf(self):
+        self._test_write_back(ShelfDatabase)
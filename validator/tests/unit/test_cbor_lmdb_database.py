@@ -0,0 +1,126 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from sawtooth_validator.consensus.dev_mode.dev_mode_transaction_block \
+    import DevModeTransactionBlock
+from sawtooth_validator.consensus.dev_mode.dev_mode_transaction_block \
+    import DevModeTransactionBlockMessage
+from gossip import signed_object
+from gossip.common import cbor2dict
+from journal import transaction
+from journal import transaction_block
+from journal.database.cbor_lmdb_database import CBORLMDBDatabase
+from ledger.transaction import integer_key
+
+
+def _unpack_message(mtype, minfo):
+    messages = [integer_key.IntegerKeyTransactionMessage,
+                DevModeTransactionBlockMessage]
+    return dict((m.MessageType, m) for m in messages)[mtype](minfo)
+
+
+class TestCBORLMDBDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._filename = os.path.join(self._directory, 'txn.cbor.lmdb')
+        self._db = CBORLMDBDatabase(self._filename, 'n', _unpack_message)
+        self._signingkey = signed_object.generate_signing_key()
+
+    def tearDown(self):
+        self._db.close()
+        shutil.rmtree(self._directory)
+
+    def _txn(self, name):
+        txn = integer_key.IntegerKeyTransaction({
+            'Updates': [{'Verb': 'set', 'Name': name, 'Value': 1}],
+            'Dependencies': []})
+        txn.sign_object(self._signingkey)
+        return txn
+
+    def test_transaction_round_trip(self):
+        txn = self._txn('a')
+        txn.Status = transaction.Status.committed
+        txn.InBlock = 'blockid'
+        self._db[txn.Identifier] = txn
+
+        # the stored form is CBOR rather than a pickle
+        with self._db._lmdb.begin() as lmdbtxn:
+            record = cbor2dict(lmdbtxn.get(txn.Identifier))
+        self.assertEqual(record['Object'], cbor2dict(txn.serialize()))
+
+        loaded = self._db[txn.Identifier]
+        self.assertIsInstance(loaded, integer_key.IntegerKeyTransaction)
+        self.assertEqual(loaded.Identifier, txn.Identifier)
+        self.assertEqual(loaded.dump(), txn.dump())
+        self.assertEqual(loaded.Status, transaction.Status.committed)
+        self.assertEqual(loaded.InBlock, 'blockid')
+        self.assertTrue(loaded.verify_signature())
+
+    def test_block_round_trip(self):
+        block = DevModeTransactionBlock({'BlockNum': 3,
+                                         'TransactionIDs': ['a', 'b']})
+        block.sign_object(self._signingkey)
+        block.Status = transaction_block.Status.invalid
+        block.TransactionDepth = 7
+        self._db[block.Identifier] = block
+
+        loaded = self._db[block.Identifier]
+        self.assertIsInstance(loaded, DevModeTransactionBlock)
+        self.assertEqual(loaded.dump(), block.dump())
+        self.assertEqual(loaded.Status, transaction_block.Status.invalid)
+        self.assertEqual(loaded.TransactionDepth, 7)
+
+    def test_plain_values(self):
+        self._db['MostRecentBlockID'] = 'blockid'
+        self._db['info'] = {'count': 2, 'names': ['a', 'b']}
+        self.assertEqual(self._db['MostRecentBlockID'], 'blockid')
+        self.assertEqual(self._db['info'], {'count': 2, 'names': ['a', 'b']})
+        self.assertIsNone(self._db.get('missing'))
+        self.assertEqual(sorted(self._db.keys()), ['MostRecentBlockID',
+                                                   'info'])
+        self.assertEqual(len(self._db), 2)
+
+        self._db.delete('info')
+        self.assertNotIn('info', self._db)
+
+    def test_batch(self):
+        self._db['a'] = 0
+        seen = []
+
+        def read():
+            seen.append(self._db.get('a'))
+
+        self._db.begin_batch()
+        self._db['a'] = 1
+        self._db['b'] = 2
+        self.assertEqual(self._db['a'], 1)
+
+        # other threads read the last committed state
+        reader = threading.Thread(target=read)
+        reader.start()
+        reader.join()
+        self.assertEqual(seen, [0])
+
+        self._db.commit_batch()
+        read()
+        self.assertEqual(seen, [0, 1])
+        self.assertEqual(self._db['b'], 2)
@@ -0,0 +1,81 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import unittest
+
+from journal.dependency_graph import DependencyGraph
+
+
+class TestDependencyGraph(unittest.TestCase):
+
+    def test_edges(self):
+        graph = DependencyGraph()
+        graph.add('a', [])
+        graph.add('b', ['a'])
+        graph.add('c', ['a', 'b'])
+
+        self.assertEqual(len(graph), 3)
+        self.assertEqual(graph.waiting('c'), set(['a', 'b']))
+        self.assertEqual(graph.dependents('a'), set(['b', 'c']))
+        self.assertEqual(graph.missing('c'), [])
+
+        graph.resolve('a')
+        self.assertNotIn('a', graph)
+        self.assertEqual(graph.waiting('b'), set())
+        self.assertEqual(graph.waiting('c'), set(['b']))
+
+    def test_discard_cascades(self):
+        graph = DependencyGraph()
+        graph.add('a', [])
+        graph.add('b', ['a'])
+        graph.add('c', ['b'])
+        graph.add('d', [])
+
+        self.assertEqual(sorted(graph.discard('a')), ['a', 'b', 'c'])
+        self.assertEqual(len(graph), 1)
+        self.assertEqual(graph.dependents('a'), set())
+        self.assertEqual(graph.discard('missing'), [])
+
+    def test_cycle(self):
+        graph = DependencyGraph()
+        graph.add('a', ['c'])
+        graph.add('b', ['a'])
+        self.assertFalse(graph.has_cycle('b'))
+        graph.add('c', ['b'])
+        self.assertTrue(graph.has_cycle('c'))
+
+    def test_missing_requests_back_off(self):
+        graph = DependencyGraph(retry_interval=10.0,
+                                maximum_retry_interval=25.0)
+        graph.add('b', ['a'])
+        self.assertEqual(graph.missing('b'), ['a'])
+
+        self.assertEqual(graph.due_requests(100.0), [('a', 0)])
+        self.assertEqual(graph.due_requests(105.0), [])
+        self.assertEqual(graph.due_requests(110.0), [('a', 1)])
+        self.assertEqual(graph.due_requests(125.0), [])
+        self.assertEqual(graph.due_requests(130.0), [('a', 2)])
+        self.assertEqual(graph.due_requests(150.0), [])
+        self.assertEqual(graph.due_requests(155.0), [('a', 3)])
+
+        graph.add('a', [])
+        self.assertEqual(graph.missing('b'), [])
+        self.assertEqual(graph.due_requests(1000.0), [])
+
+    def test_missing_request_dropped_with_dependents(self):
+        graph = DependencyGraph()
+        graph.add('b', ['a'])
+        graph.discard('b')
+        self.assertEqual(graph.due_requests(0.0), [])
@@ -0,0 +1,118 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import unittest
+
+from sawtooth.client import CommitWatcher
+from sawtooth.client import TransactionStatus
+from gossip import signed_object
+from gossip.event_handler import EventHandler
+from journal.transaction_block import TransactionBlock
+from txnserver.web_pages.event_page import CommitEventLog
+
+
+class _Journal(object):
+    def __init__(self):
+        self.on_commit_block = EventHandler('onCommitBlock')
+        self.on_decommit_block = EventHandler('onDecommitBlock')
+
+
+class TestCommitEventLog(unittest.TestCase):
+
+    def setUp(self):
+        self._key = signed_object.generate_signing_key()
+
+    def _block(self, num, txnids):
+        block = TransactionBlock({'BlockNum': num,
+                                  'TransactionIDs': txnids})
+        block.sign_object(self._key)
+        return block
+
+    def test_events(self):
+        journal = _Journal()
+        notified = []
+        log = CommitEventLog(journal, lambda: notified.append(True))
+        self.assertEqual(log.events_since(0), ([], False))
+
+        block = self._block(1, ['b', 'c'])
+        journal.on_commit_block.fire(journal, self._block(0, ['a']))
+        journal.on_commit_block.fire(journal, block)
+        journal.on_decommit_block.fire(journal, block)
+        self.assertEqual(len(notified), 3)
+        self.assertEqual(log.Sequence, 3)
+
+        (events, truncated) = log.events_since(1)
+        self.assertFalse(truncated)
+        self.assertEqual([(e['Sequence'], e['Event'], e['BlockID'])
+                          for e in events],
+                         [(2, 'commit', block.Identifier),
+                          (3, 'decommit', block.Identifier)])
+        self.assertEqual(events[0]['TransactionIDs'], ['b', 'c'])
+
+        # a cursor ahead of the log, from before the validator restarted
+        self.assertEqual(log.events_since(3), ([], False))
+        self.assertTrue(log.events_since(7)[1])
+
+    def test_old_events_are_dropped(self):
+        journal = _Journal()
+        log = CommitEventLog(journal)
+        log._events = type(log._events)(maxlen=2)
+        for num in range(4):
+            journal.on_commit_block.fire(journal, self._block(num, []))
+
+        (events, truncated) = log.events_since(0)
+        self.assertTrue(truncated)
+        self.assertEqual([e['Sequence'] for e in events], [3, 4])
+        self.assertFalse(log.events_since(2)[1])
+
+
+class _Client(object):
+    """Serves a fixed list of commit events as the validator would."""
+
+    def __init__(self, events, truncated=False):
+        self.events = events
+        self.truncated = truncated
+        self.status_requests = []
+
+    def get_commit_events(self, since=None, timeout=0):
+        if since is None:
+            return {'Events': [], 'Next': 0, 'Truncated': False}
+        return {'Events': self.events[since:], 'Next': len(self.events),
+                'Truncated': self.truncated}
+
+    def get_transaction_status(self, txnid):
+        self.status_requests.append(txnid)
+        return TransactionStatus.committed
+
+    def get_transaction(self, txnid, field):
+        return 'block'
+
+
+class TestCommitWatcher(unittest.TestCase):
+
+    def test_rejected_transactions_are_skipped(self):
+        # send_transactions returns None for a rejected transaction
+        client = _Client([{'Sequence': 1, 'Event': 'commit',
+                           'BlockID': 'block', 'TransactionIDs': ['a', 'b']}])
+        watcher = CommitWatcher(client)
+        self.assertEqual(watcher.wait(['a', None, 'b'], timeout=5), [])
+        self.assertEqual(watcher.committed_block('a'), 'block')
+        self.assertNotIn(None, watcher._watched)
+
+        client = _Client([], truncated=True)
+        watcher = CommitWatcher(client)
+        watcher.watch(None)
+        self.assertEqual(watcher.wait(['c', None], timeout=5), [])
+        self.assertEqual(client.status_requests, ['c'])
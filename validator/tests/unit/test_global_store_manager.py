@@ -0,0 +1,135 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from journal.global_store_manager import GlobalStoreManager
+from journal.global_store_manager import KeyValueStore
+
+try:
+    import lmdb  # pylint: disable=unused-import
+    HAS_LMDB = True
+except ImportError:
+    HAS_LMDB = False
+
+
+class TestGlobalStoreManager(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    def _open(self, db_type, dbmode):
+        gsm = GlobalStoreManager(os.path.join(self._directory, 'state'),
+                                 dbmode, db_type, checkpoint_interval=4)
+        gsm.add_transaction_store('/Test', KeyValueStore())
+        return gsm
+
+    def _build_chain(self, gsm, length):
+        blockid = GlobalStoreManager.RootBlockID
+        for i in xrange(length):
+            blockstore = gsm.get_block_store(blockid).clone_block()
+            store = blockstore.get_transaction_store('/Test')
+            store['key{}'.format(i)] = i
+            if i > 0:
+                del store['key{}'.format(i - 1)]
+            store['count'] = i
+            blockid = 'block{0:011}'.format(i)
+            gsm.commit_block_store(blockid, blockstore)
+        return blockid
+
+    def _check_restore(self, db_type):
+        gsm = self._open(db_type, 'n')
+        head = self._build_chain(gsm, 10)
+        expected = gsm.get_block_store(head).get_transaction_store(
+            '/Test').compose()
+        gsm.close()
+
+        gsm = self._open(db_type, 'c')
+        self.assertEqual(len(gsm.persistmap_keys()), 11)
+
+        store = gsm.get_block_store(head).get_transaction_store('/Test')
+        self.assertEqual(store.compose(), expected)
+        self.assertEqual(store.compose(), {'key9': 9, 'count': 9})
+
+        # blocks 3 and 7 are checkpoints, so only the checkpoint and
+        # the two blocks after it are loaded in addition to the root
+        self.assertEqual(len(gsm._blockmap), 4)
+        self.assertIn('block00000000007', gsm._blockmap)
+        self.assertIsNone(gsm._blockmap['block00000000007'].PrevBlock)
+        self.assertEqual(
+            gsm._blockmap['block00000000007'].PreviousBlockID,
+            'block00000000006')
+
+        # blocks before the first checkpoint are replayed from the root
+        store = gsm.get_block_store('block00000000002') \
+            .get_transaction_store('/Test')
+        self.assertEqual(store.compose(), {'key2': 2, 'count': 2})
+        gsm.close()
+
+    def test_restore_dbm(self):
+        self._check_restore('dbm')
+
+    @unittest.skipUnless(HAS_LMDB, 'lmdb is not installed')
+    def test_restore_lmdb(self):
+        self._check_restore('lmdb')
+
+    def test_flatten_block_store(self):
+        gsm = self._open('dbm', 'n')
+        head = self._build_chain(gsm, 6)
+        gsm.flatten_block_store('block00000000003')
+
+        self.assertNotIn('block00000000002', gsm._blockmap)
+        blockstore = gsm.get_block_store('block00000000003')
+        self.assertIsNone(blockstore.PrevBlock)
+        self.assertEqual(blockstore.PreviousBlockID, 'block00000000002')
+        self.assertEqual(
+            gsm.get_block_store(head).get_transaction_store(
+                '/Test').compose(),
+            {'key5': 5, 'count': 5})
+        gsm.close()
+
+    def test_install_snapshot(self):
+        source = self._open('dbm', 'n')
+        head = self._build_chain(source, 6)
+        snapshot = source.snapshot(head)
+        source.close()
+
+        target = GlobalStoreManager(os.path.join(self._directory, 'target'),
+                                    'n', 'dbm')
+        target.add_transaction_store('/Test', KeyValueStore())
+        with self.assertRaises(ValueError):
+            target.install_snapshot('block00000000004', snapshot)
+
+        target.install_snapshot(head, snapshot)
+        self.assertEqual(
+            target.get_block_store(head).get_transaction_store(
+                '/Test').compose(),
+            {'key5': 5, 'count': 5})
+
+        # blocks that follow the snapshot build on its state
+        blockstore = target.get_block_store(head).clone_block()
+        blockstore.get_transaction_store('/Test')['count'] = 6
+        target.commit_block_store('block00000000006', blockstore)
+        self.assertEqual(
+            target.get_block_store('block00000000006').get_transaction_store(
+                '/Test').compose(),
+            {'key5': 5, 'count': 6})
+        target.close()
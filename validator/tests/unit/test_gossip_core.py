@@ -45,6 +45,8 @@ class TestGossipCore(unittest.TestCase):
         ident = SigObj.generate_identifier(signingkey)
         node = Node(identifier=ident, signingkey=signingkey,
                     address=("localhost", port))
+        # messages are only sent once the host name is resolved
+        node.resolve_address()
         node.is_peer = True
         return node
 
@@ -140,6 +142,8 @@ class TestGossipCoreDatagram(unittest.TestCase):
         ident = SigObj.generate_identifier(signingkey)
         node = Node(identifier=ident, signingkey=signingkey,
                     address=("localhost", port))
+        # messages are only sent once the host name is resolved
+        node.resolve_address()
         node.is_peer = True
         return node
 
@@ -235,6 +239,8 @@ class TestGossipCoreUtilityAndInterface(unittest.TestCase):
         ident = SigObj.generate_identifier(signingkey)
         node = Node(identifier=ident, signingkey=signingkey,
                     address=("localhost", port))
+        # messages are only sent once the host name is resolved
+        node.resolve_address()
         node.is_peer = True
         return node
 
@@ -509,3 +515,156 @@ class TestGossipCoreUtilityAndInterface(unittest.TestCase):
         core.broadcast_message(msg)
         self.assertEquals(str(node1.MessageQ), str(node2.MessageQ))
         self.assertIn(msg.Identifier, core.MessageHandledMap)
+
+    def test_gossip_handle_msg_lane_full(self):
+        # A message dropped by a full lane is neither forwarded nor
+        # recorded as handled
+        signingkey = SigObj.generate_signing_key()
+        ident = SigObj.generate_identifier(signingkey)
+        core = Gossip(Node(identifier=ident, signingkey=signingkey,
+                           address=("localhost", 8860)),
+                      dispatch_lanes={'default': {'Bound': 1}})
+        node = self._create_node(8861)
+        core.add_node(node)
+        first = self._create_msg()
+        core._handle_message(first)
+        second = Message({'__SIGNATURE__': "other"})
+        core._handle_message(second)
+        self.assertIn(first.Identifier, core.MessageHandledMap)
+        self.assertNotIn(second.Identifier, core.MessageHandledMap)
+        self.assertEquals(node.MessageQ.Count, 1)
+        self.assertEquals(
+            core.IncomingMessageQueue.lane('default').Dropped, 1)
+
+
+class _PaddedMessage(Message):
+    MessageType = "/gossip.Message/Padded"
+
+    def __init__(self, minfo=None):
+        super(_PaddedMessage, self).__init__(minfo)
+        self.Padding = minfo.get('Padding', '')
+
+    def dump(self):
+        result = super(_PaddedMessage, self).dump()
+        result['Padding'] = self.Padding
+        return result
+
+
+class TestGossipCoreCoalescing(unittest.TestCase):
+
+    def _setup(self, port):
+        signingkey = SigObj.generate_signing_key()
+        ident = SigObj.generate_identifier(signingkey)
+        firstNode = Node(identifier=ident, signingkey=signingkey,
+                         address=("localhost", port))
+        core = Gossip(firstNode)
+        core.written = []
+        core._do_write = lambda data, peer: core.written.append(data)
+        return core
+
+    def _peer_of(self, core):
+        node = Node(identifier=core.LocalNode.Identifier,
+                    address=core.LocalNode.NetAddress)
+        node.is_peer = True
+        # fill the token bucket so messages can be sent right away
+        node.TokenBucket.LastDrip -= 1
+        return node
+
+    def _enqueue(self, node, count):
+        signingkey = SigObj.generate_signing_key()
+        for i in range(count):
+            msg = Message({'__NONCE__': i})
+            msg.sign_object(signingkey)
+            node.enqueue_message(msg, 0)
+
+    def test_bundle_round_trip(self):
+        sender = self._setup(9600)
+        receiver = self._setup(9601)
+        sender.add_node(self._peer_of(receiver))
+        receiver.add_node(self._peer_of(sender))
+        dstnode = sender.NodeMap[receiver.LocalNode.Identifier]
+
+        # peers start out with the version 1 format, one message a datagram
+        self._enqueue(dstnode, 2)
+        sender._timer_transmit(time.time())
+        self.assertEqual(len(sender.written), 2)
+
+        # a version 2 ack tells the sender that bundles are understood
+        receiver.datagramReceived(sender.written[0], "localhost:9600")
+        sender.datagramReceived(receiver.written[0], "localhost:9601")
+        self.assertEqual(dstnode.PacketVersion, 2)
+        self.assertEqual(len(sender.PendingAckMap), 1)
+        sender.PendingAckMap.clear()
+
+        del sender.written[:]
+        del receiver.written[:]
+        self._enqueue(dstnode, 3)
+        sender._timer_transmit(time.time())
+        self.assertEqual(len(sender.written), 1)
+        self.assertEqual(len(sender.PendingAckMap), 3)
+        stats = sender.PacketStats.get_stats(["MessagesPerDatagram"])
+        self.assertEqual(stats["MessagesPerDatagram"], [5, 3])
+
+        # the whole bundle is handled and acknowledged in one datagram
+        receiver.datagramReceived(sender.written[0], "localhost:9600")
+        self.assertEqual(len(receiver.written), 1)
+        msgtypes = receiver.MessageStats.get_stats(["MessageType"])
+        self.assertEqual(
+            msgtypes["MessageType"]['/gossip.Message/MessageBase'], 4)
+        stats = receiver.PacketStats.get_stats(["AcksSaved"])
+        self.assertEqual(stats["AcksSaved"], 2)
+
+        sender.datagramReceived(receiver.written[0], "localhost:9601")
+        self.assertEqual(sender.PendingAckMap, {})
+        stats = sender.PacketStats.get_stats(["AcksReceived"])
+        self.assertEqual(stats["AcksReceived"], 4)
+
+    def test_bundle_size_limit(self):
+        core = self._setup(9602)
+        dstnode = self._peer_of(self._setup(9603))
+        dstnode.PacketVersion = 2
+        core.add_node(dstnode)
+
+        self._enqueue(dstnode, 4)
+        msg = dstnode.MessageQ.Head[1]
+        core.MaximumPacketSize = 2 * len(repr(msg)) + 128
+        core._timer_transmit(time.time())
+        self.assertEqual(len(core.written), 2)
+        self.assertEqual(len(core.PendingAckMap), 4)
+
+    def test_fragments(self):
+        sender = self._setup(9604)
+        receiver = self._setup(9605)
+        sender.add_node(self._peer_of(receiver))
+        receiver.add_node(self._peer_of(sender))
+        dstnode = sender.NodeMap[receiver.LocalNode.Identifier]
+        dstnode.PacketVersion = 2
+
+        signingkey = SigObj.generate_signing_key()
+        msg = _PaddedMessage({'Padding': 'x' * 3000})
+        msg.sign_object(signingkey)
+        dstnode.enqueue_message(msg, 0)
+        sender.MaximumPacketSize = 1000
+        sender._timer_transmit(time.time())
+        self.assertEqual(len(sender.written), 4)
+        self.assertEqual(len(sender.PendingAckMap), 4)
+
+        # unacknowledged fragments are retransmitted on their own
+        lost = sender.written.pop(2)
+        sender._timer_cleanup(time.time() + 100)
+        self.assertEqual(len(sender.written), 7)
+        self.assertIn(lost, sender.written[3:])
+        self.assertEqual(len(sender.PendingAckMap), 4)
+        stats = sender.PacketStats.get_stats(["FragmentsRetransmitted"])
+        self.assertEqual(stats["FragmentsRetransmitted"], 4)
+
+        for data in sender.written:
+            receiver.datagramReceived(data, "localhost:9604")
+        msgtypes = receiver.MessageStats.get_stats(["MessageType"])
+        self.assertEqual(
+            msgtypes["MessageType"][_PaddedMessage.MessageType], 1)
+        self.assertEqual(len(receiver.ReassemblyBuffer), 0)
+
+        for data in receiver.written:
+            sender.datagramReceived(data, "localhost:9605")
+        self.assertEqual(sender.PendingAckMap, {})
@@ -0,0 +1,220 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+from sawtooth_validator.consensus.dev_mode.dev_mode_transaction_block \
+    import DevModeTransactionBlock
+from journal import transaction_block
+from journal_test_case import JournalTestCase
+from ledger.transaction import integer_key
+from sawtooth.exceptions import InvalidTransactionError
+
+
+class TestJournalBlockCandidate(JournalTestCase):
+
+    def _open_journal(self):
+        journal = super(TestJournalBlockCandidate, self)._open_journal(
+            max_transactions_per_block=5)
+        integer_key.register_transaction_types(journal)
+        return journal
+
+    def _create(self, name, verb='set', value=1, dependencies=None):
+        txn = integer_key.IntegerKeyTransaction({
+            'Updates': [{'Verb': verb, 'Name': name, 'Value': value}],
+            'Dependencies': dependencies or []})
+        txn.sign_from_node(self._node)
+        return txn
+
+    def _add(self, name, verb='set', value=1, dependencies=None):
+        txn = self._create(name, verb, value, dependencies)
+        self._journal.add_pending_transaction(txn, build_block=False)
+        return txn.Identifier
+
+    def test_candidate_is_extended(self):
+        first = [self._add('a'), self._add('b')]
+        self.assertEqual(self._journal._prepare_transaction_list(), first)
+        store = self._journal._candidate_store
+
+        second = self._add('c')
+        self.assertEqual(self._journal._prepare_transaction_list(),
+                         first + [second])
+        self.assertIs(self._journal._candidate_store, store)
+        self.assertEqual(self._journal._prepare_transaction_list(1),
+                         first[:1])
+
+    def test_invalid_transactions_are_dropped(self):
+        self._add('a')
+        invalid = self._add('missing', verb='inc')
+        self.assertEqual(len(self._journal._prepare_transaction_list()), 1)
+        self.assertNotIn(invalid, self._journal.pending_transactions)
+
+    def test_candidate_is_bounded(self):
+        txnids = [self._add('k{0}'.format(i)) for i in xrange(8)]
+        self.assertEqual(self._journal._prepare_transaction_list(),
+                         txnids[:5])
+        self._add('k8')
+        self.assertEqual(self._journal._prepare_transaction_list(),
+                         txnids[:5])
+        self.assertEqual(self._journal._candidate_arrivals, [])
+
+    def test_waiting_transaction_is_added(self):
+        dependency = integer_key.IntegerKeyTransaction({
+            'Updates': [{'Verb': 'set', 'Name': 'a', 'Value': 1}],
+            'Dependencies': []})
+        dependency.sign_from_node(self._node)
+        dependent = self._add('a', verb='inc',
+                              dependencies=[dependency.Identifier])
+
+        self.assertEqual(self._journal._prepare_transaction_list(), [])
+        self.assertEqual(self._journal._dependency_graph.missing(dependent),
+                         [dependency.Identifier])
+
+        self._journal.add_pending_transaction(dependency, build_block=False)
+        self.assertEqual(self._journal._prepare_transaction_list(),
+                         [dependency.Identifier, dependent])
+
+    def test_candidate_is_rebuilt_after_invalidation(self):
+        txnid = self._add('a')
+        self._journal._prepare_transaction_list()
+        self._journal._invalidate_block_candidate()
+        self.assertIsNone(self._journal._candidate_store)
+        self.assertEqual(self._journal._prepare_transaction_list(), [txnid])
+
+    def test_invalid_dependency_cascades(self):
+        invalid = self._add('missing', verb='inc')
+        dependent = self._add('a', dependencies=[invalid])
+        self.assertEqual(self._journal._prepare_transaction_list(), [])
+        self.assertNotIn(invalid, self._journal.pending_transactions)
+        self.assertNotIn(dependent, self._journal.pending_transactions)
+        self.assertEqual(len(self._journal._dependency_graph), 0)
+
+    def test_missing_dependency_requests(self):
+        requested = []
+        self._journal.request_missing_txn = requested.append
+        dependent = self._add('a', dependencies=['unknown'])
+
+        self._journal._request_missing_dependencies(100.0)
+        self._journal._request_missing_dependencies(101.0)
+        self.assertEqual(requested, ['unknown'])
+
+        # each repeated request ages the waiting transaction until it
+        # is dropped
+        now = 100.0
+        while dependent in self._journal.pending_transactions:
+            now += 1000.0
+            self._journal._request_missing_dependencies(now)
+        self.assertEqual(len(requested), self._journal.max_txn_age + 1)
+        self.assertNotIn(dependent, self._journal.transaction_store)
+
+    def test_pending_state(self):
+        # every pending transaction is applied, not only those that fit
+        # in the block candidate
+        for i in xrange(8):
+            self._add('k{0}'.format(i))
+        self._journal.check_pending_transaction(self._create('k7', 'inc'))
+        with self.assertRaises(InvalidTransactionError):
+            self._journal.check_pending_transaction(self._create('k7'))
+        store = self._journal._pending_state
+
+        # the checked transaction is not applied, arrivals are
+        self._journal.check_pending_transaction(self._create('k8'))
+        self._add('k8')
+        with self.assertRaises(InvalidTransactionError):
+            self._journal.check_pending_transaction(self._create('k8'))
+        self.assertIs(self._journal._pending_state, store)
+
+        # an invalidated state is rebuilt from the pending transactions
+        self._journal._invalidate_pending_state()
+        self._journal.check_pending_transaction(self._create('k8', 'inc'))
+        self.assertIsNot(self._journal._pending_state, store)
+
+    def test_pending_state_arrivals(self):
+        # arrivals are only tracked while there is a state to apply them to
+        self._add('a')
+        self.assertEqual(self._journal._pending_state_arrivals, [])
+
+        self._journal.check_pending_transaction(self._create('b'))
+        store = self._journal._pending_state
+        invalid = self._add('missing', verb='inc')
+        self._add('c')
+        self.assertEqual(len(self._journal._pending_state_arrivals), 2)
+
+        # dropping a transaction that was never applied keeps the state
+        self._journal.check_pending_transaction(self._create('d'))
+        self._journal._discard_transaction(invalid)
+        self.assertIs(self._journal._pending_state, store)
+
+        self._journal._discard_transaction(
+            self._journal.pending_transactions.keys()[0])
+        self.assertIsNone(self._journal._pending_state)
+
+    def test_check_pending_transactions(self):
+        self._add('a')
+        errors = self._journal.check_pending_transactions([
+            self._create('b'), self._create('a'), self._create('b', 'inc'),
+            self._create('c', 'inc')])
+        self.assertEqual(errors[0], None)
+        self.assertIsInstance(errors[1], InvalidTransactionError)
+        self.assertEqual(errors[2], None)
+        self.assertIsInstance(errors[3], InvalidTransactionError)
+
+        # the transactions of a batch are not applied to the pending state
+        self._journal.check_pending_transaction(self._create('b'))
+
+    def test_submitted_transactions(self):
+        # a transaction accepted from a client is applied while its
+        # message waits to be dispatched
+        txn = self._create('a')
+        self._journal.check_pending_transaction(txn)
+        self._journal.add_submitted_transaction(txn)
+        self._journal.check_pending_transaction(self._create('a', 'inc'))
+        with self.assertRaises(InvalidTransactionError):
+            self._journal.check_pending_transaction(self._create('a'))
+
+        # it is replayed when the state is rebuilt
+        self._journal._invalidate_pending_state()
+        with self.assertRaises(InvalidTransactionError):
+            self._journal.check_pending_transaction(self._create('a'))
+        store = self._journal._pending_state
+
+        # once dispatched the pending list holds it and it is not
+        # applied again
+        self._journal.add_pending_transaction(txn, build_block=False)
+        self.assertEqual(len(self._journal._pending_state_submitted), 0)
+        self._journal.check_pending_transaction(self._create('a', 'inc'))
+        self.assertIs(self._journal._pending_state, store)
+
+    def test_pending_state_is_rebuilt_at_commit(self):
+        self._journal.add_submitted_transaction(self._create('a'))
+        self._journal.check_pending_transaction(self._create('b'))
+        store = self._journal._pending_state
+
+        previous = self._journal.most_recent_committed_block_id
+        gsm = self._journal.global_store_map
+        block = DevModeTransactionBlock({
+            'BlockNum': 0, 'PreviousBlockID': previous,
+            'TransactionIDs': []})
+        block.sign_from_node(self._node)
+        block.Status = transaction_block.Status.valid
+        gsm.commit_block_store(block.Identifier,
+                               gsm.get_block_store(previous).clone_block())
+        self._journal.block_store[block.Identifier] = block
+        self._journal.handle_advance(block)
+
+        # the state is rebuilt by the commit rather than by the next check
+        self.assertIsNot(self._journal._pending_state, store)
+        self.assertEqual(self._journal._pending_state_base_id,
+                         block.Identifier)
+        with self.assertRaises(InvalidTransactionError):
+            self._journal.check_pending_transaction(self._create('a'))
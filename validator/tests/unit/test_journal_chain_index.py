@@ -0,0 +1,90 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+from sawtooth_validator.consensus.dev_mode.dev_mode_transaction_block \
+    import DevModeTransactionBlock
+from gossip import common
+from journal import transaction_block
+from journal_test_case import JournalTestCase
+
+
+class TestJournalChainIndex(JournalTestCase):
+
+    def _reopen(self):
+        self._journal.shutdown()
+        self._journal = self._open_journal()
+        self._journal.restore()
+
+    def _commit(self, num, node=None):
+        previous = self._journal.most_recent_committed_block_id
+        block = DevModeTransactionBlock({
+            'BlockNum': num, 'PreviousBlockID': previous})
+        block.sign_from_node(node or self._node)
+        block.Status = transaction_block.Status.valid
+        gsm = self._journal.global_store_map
+        gsm.commit_block_store(
+            block.Identifier, gsm.get_block_store(previous).clone_block())
+        self._journal.block_store[block.Identifier] = block
+        self._journal._commit_block(block)
+        return block.Identifier
+
+    def test_commit_and_decommit(self):
+        blockids = [self._commit(num) for num in range(4)]
+        self.assertEqual(self._journal.committed_chain_length, 4)
+        self.assertEqual(self._journal.committed_block_ids(),
+                         list(reversed(blockids)))
+        self.assertEqual(self._journal.committed_block_ids(2),
+                         [blockids[3], blockids[2]])
+        self.assertEqual(self._journal.committed_block_range(1, 2),
+                         blockids[1:3])
+        self.assertEqual(self._journal.committed_block_range(3, 100),
+                         blockids[3:])
+        self.assertEqual(self._journal.committed_block_id(0), blockids[0])
+        self.assertEqual(self._journal.committed_block_height(blockids[2]),
+                         2)
+
+        # a decommitted block is no longer indexed, the block that
+        # replaces it takes its height
+        self._journal._decommit_block()
+        self.assertIsNone(self._journal.committed_block_height(blockids[3]))
+        self.assertIsNone(self._journal.committed_block_id(3))
+        forkid = self._commit(3, self._create_node())
+        self.assertEqual(self._journal.committed_block_id(3), forkid)
+        self.assertIsNone(self._journal.committed_block_height(blockids[3]))
+
+        self._reopen()
+        self.assertEqual(self._journal.committed_block_ids(),
+                         [forkid] + list(reversed(blockids[:3])))
+
+    def test_index_is_rebuilt(self):
+        blockids = [self._commit(num) for num in range(3)]
+
+        # a chain store written before the index existed
+        for height, blockid in enumerate(blockids):
+            del self._journal.chain_store['ChainIndex/{0}'.format(height)]
+            del self._journal.chain_store['ChainHeight/{0}'.format(blockid)]
+        del self._journal.chain_store['ChainLength']
+
+        self._reopen()
+        self.assertEqual(self._journal.committed_chain_length, 3)
+        self.assertEqual(self._journal.committed_block_range(0, 3), blockids)
+        self.assertEqual(
+            self._journal._find_fork(DevModeTransactionBlock(
+                {'PreviousBlockID': blockids[1]})),
+            blockids[1])
+        self.assertEqual(
+            self._journal._find_fork(DevModeTransactionBlock(
+                {'PreviousBlockID': common.NullIdentifier})),
+            common.NullIdentifier)
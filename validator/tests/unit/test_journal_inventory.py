@@ -0,0 +1,105 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+from journal.messages import transaction_message
+from journal_test_case import JournalTestCase
+from ledger.transaction import integer_key
+
+
+class TestJournalInventory(JournalTestCase):
+
+    PeerCount = 2
+
+    def _open_journal(self):
+        journal = super(TestJournalInventory, self)._open_journal(
+            transaction_gossip='inventory')
+        integer_key.register_transaction_types(journal)
+        return journal
+
+    def _transaction(self, name):
+        txn = integer_key.IntegerKeyTransaction({
+            'Updates': [{'Verb': 'set', 'Name': name, 'Value': 1}],
+            'Dependencies': []})
+        txn.sign_from_node(self._node)
+        return txn
+
+    def _receive(self, txn, sender):
+        msg = txn.build_message()
+        msg.SenderID = sender.Identifier
+        transaction_message.transaction_message_handler(msg, self._journal)
+
+    def _announce(self):
+        self._sent = []
+        self._journal._announce_transactions(self._journal.next_inventory)
+        return dict((nodeid, msg.TransactionIDs)
+                    for (msg, nodeid) in self._sent)
+
+    def test_announce(self):
+        first = self._transaction('a')
+        second = self._transaction('b')
+        self._receive(first, self._peers[0])
+        self._receive(second, self._peers[1])
+
+        # each transaction is announced to the peers not known to have
+        # it instead of being forwarded
+        announced = self._announce()
+        self.assertEqual(announced, {
+            self._peers[0].Identifier: [second.Identifier],
+            self._peers[1].Identifier: [first.Identifier]})
+        self.assertEqual(self._announce(), {})
+
+    def test_request(self):
+        txns = [self._transaction(n) for n in ('a', 'b', 'c')]
+        self._journal.add_pending_transaction(txns[0], build_block=False)
+        txnids = [t.Identifier for t in txns]
+
+        # only the missing transactions are requested, and only once
+        self._journal.request_transactions(txnids, self._peers[0].Identifier)
+        self._journal.request_transactions(txnids, self._peers[1].Identifier)
+        self.assertEqual(len(self._sent), 1)
+        (request, nodeid) = self._sent[0]
+        self.assertIsInstance(
+            request, transaction_message.TransactionBatchRequestMessage)
+        self.assertEqual(nodeid, self._peers[0].Identifier)
+        self.assertEqual(request.TransactionIDs, txnids[1:])
+
+        # requests that timed out are sent to the next peer to announce
+        self._sent = []
+        for txnid in self._journal._inventory_requests:
+            self._journal._inventory_requests[txnid] = 0
+        self._journal.request_transactions(txnids, self._peers[1].Identifier)
+        self.assertEqual([(m.TransactionIDs, n) for (m, n) in self._sent],
+                         [(txnids[1:], self._peers[1].Identifier)])
+
+        # a received transaction is not announced back to its sender or
+        # to the peers that announced it
+        self._receive(txns[1], self._peers[0])
+        self._journal.request_transactions([txnids[1]],
+                                           self._peers[1].Identifier)
+        self.assertEqual(self._announce(), {})
+
+    def test_batch_request(self):
+        txns = [self._transaction(n) for n in ('a', 'b')]
+        self._journal.add_pending_transaction(txns[0], build_block=False)
+
+        request = transaction_message.TransactionBatchRequestMessage(
+            {'TransactionIDs': [t.Identifier for t in txns]})
+        request.SenderID = self._peers[0].Identifier
+        transaction_message._txn_batch_request_handler(request,
+                                                       self._journal)
+        self.assertEqual(len(self._sent), 1)
+        (reply, nodeid) = self._sent[0]
+        self.assertEqual(reply.Transaction.Identifier, txns[0].Identifier)
+        self.assertEqual(nodeid, self._peers[0].Identifier)
@@ -0,0 +1,126 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+from journal.messages import transaction_block_message
+from journal.messages import transaction_message
+from journal.transaction_block import TransactionBlock
+from journal_test_case import JournalTestCase
+
+
+class TestJournalMissingRequests(JournalTestCase):
+
+    PeerCount = 1
+
+    def setUp(self):
+        super(TestJournalMissingRequests, self).setUp()
+        self._peer = self._peers[0]
+
+    def test_requests_are_batched(self):
+        txnids = ['txn{0}'.format(i) for i in range(5)]
+        for txnid in txnids + txnids[:2]:
+            self._journal.request_missing_txn(txnid)
+        self._journal.request_missing_block('block0')
+        self._journal.request_missing_block('block1')
+        self._journal._send_missing_requests(0)
+
+        self.assertEqual(len(self._sent), 2)
+        ((txn_request, txn_peer), (block_request, block_peer)) = self._sent
+        self.assertIsInstance(
+            txn_request, transaction_message.TransactionBatchRequestMessage)
+        self.assertEqual(txn_request.TransactionIDs, txnids)
+        self.assertIsInstance(
+            block_request, transaction_block_message.BlockBatchRequestMessage)
+        self.assertEqual(block_request.BlockIDs, ['block0', 'block1'])
+        self.assertEqual(txn_peer, self._peer.Identifier)
+        self.assertEqual(block_peer, self._peer.Identifier)
+
+        self._sent = []
+        self._journal._send_missing_requests(0)
+        self.assertEqual(self._sent, [])
+
+    def test_requests_back_off(self):
+        self._journal.request_missing_txn('txn')
+        (nexttime, interval) = self._journal.requested_transactions['txn']
+        self.assertEqual(interval,
+                         self._journal.missing_request_retry_interval)
+
+        intervals = []
+        for _ in range(6):
+            self._journal.requested_transactions['txn'] = (0.0, interval)
+            self._journal.request_missing_txn('txn')
+            (nexttime, interval) = \
+                self._journal.requested_transactions['txn']
+            intervals.append(interval)
+        self.assertEqual(intervals, [4.0, 8.0, 16.0, 30.0, 30.0, 30.0])
+        self.assertEqual(self._journal._missing_txns, ['txn'] * 7)
+
+    def test_abandoned_requests_expire(self):
+        self._journal.request_missing_txn('txn')
+        self._journal.request_missing_block('block')
+        self._journal._send_missing_requests(0)
+        (nexttime, _) = self._journal.requested_transactions['txn']
+
+        # a request that is still repeated is kept
+        self._journal._expire_requests(
+            nexttime + self._journal.missing_request_interval)
+        self.assertIn('txn', self._journal.requested_transactions)
+        self.assertIn('block', self._journal._block_requested_from)
+
+        self._journal._expire_requests(
+            nexttime + self._journal.missing_request_interval + 1)
+        self.assertEqual(self._journal.requested_transactions, {})
+        self.assertEqual(self._journal.requested_blocks, {})
+        self.assertEqual(self._journal._txn_requested_from, {})
+        self.assertEqual(self._journal._block_requested_from, {})
+
+    def test_batch_request_is_served(self):
+        block = TransactionBlock({'BlockNum': 0})
+        block.sign_from_node(self._node)
+        self._journal.block_store[block.Identifier] = block
+
+        request = transaction_block_message.BlockBatchRequestMessage(
+            {'BlockIDs': ['unknown', block.Identifier]})
+        request.SenderID = self._peer.Identifier
+        transaction_block_message._block_batch_request_handler(
+            request, self._journal)
+        self.assertEqual(len(self._sent), 1)
+        (reply, nodeid) = self._sent[0]
+        self.assertEqual(reply.TransactionBlock.Identifier, block.Identifier)
+        self.assertEqual(nodeid, self._peer.Identifier)
+
+    def test_only_replies_are_not_forwarded(self):
+        forwarded = []
+        self._gossip.forward_message = \
+            lambda msg, **kwargs: forwarded.append(msg)
+
+        blocks = []
+        for num in range(2):
+            block = TransactionBlock({'BlockNum': num})
+            block.sign_from_node(self._node)
+            self._journal.request_missing_block(block.Identifier)
+            blocks.append(block)
+        self._journal._send_missing_requests(0)
+
+        # the reply from the peer the blocks were requested from is not
+        # forwarded, a requested block flooded by another node is
+        for (block, sender) in ((blocks[0], self._peer.Identifier),
+                                (blocks[1], 'other')):
+            msg = transaction_block_message.TransactionBlockMessage()
+            msg.TransactionBlock = block
+            msg.SenderID = sender
+            transaction_block_message.transaction_block_message_handler(
+                msg, self._journal)
+        self.assertEqual([m.TransactionBlock for m in forwarded],
+                         [blocks[1]])
@@ -0,0 +1,235 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import base64
+import hashlib
+
+from sawtooth_validator.consensus.dev_mode.dev_mode_transaction_block \
+    import DevModeTransactionBlock
+from gossip import common
+from gossip.common import dict2cbor
+from journal.messages import journal_transfer as messages
+from journal.protocol.journal_transfer import JournalTransfer
+from journal_test_case import JournalTestCase
+from ledger.transaction import integer_key
+
+
+class TestJournalTransfer(JournalTestCase):
+
+    PeerCount = 3
+
+    def setUp(self):
+        super(TestJournalTransfer, self).setUp()
+
+        # a chain of three blocks of two transactions, and an uncommitted
+        # transaction
+        self._txns = {}
+        self._blocks = []
+        previous = common.NullIdentifier
+        for num in range(3):
+            txnids = [self._transaction('b{0}t{1}'.format(num, i))
+                      for i in range(2)]
+            block = DevModeTransactionBlock({
+                'BlockNum': num, 'PreviousBlockID': previous,
+                'TransactionIDs': txnids})
+            block.sign_from_node(self._node)
+            self._blocks.append(block)
+            previous = block.Identifier
+        self._uncommitted = [self._transaction('u')]
+        self._snapshot = None
+        self._forged = False
+
+    def _open_journal(self):
+        # the transfer runs while the journal is initializing
+        journal = super(TestJournalTransfer, self)._open_journal()
+        journal.initializing = True
+        integer_key.register_transaction_types(journal)
+        return journal
+
+    def _send_message(self, msg, nodeid):
+        msg.sign_from_node(self._node)
+        super(TestJournalTransfer, self)._send_message(msg, nodeid)
+
+    def _transaction(self, name):
+        txn = integer_key.IntegerKeyTransaction({
+            'Updates': [{'Verb': 'set', 'Name': name, 'Value': 1}],
+            'Dependencies': []})
+        txn.sign_from_node(self._node)
+        self._txns[txn.Identifier] = txn
+        return txn.Identifier
+
+    def _build_snapshot(self, block):
+        # the state after the first two blocks, served in three chunks
+        blockstore = self._journal.global_store_map.get_block_store(
+            common.NullIdentifier).clone_block()
+        store = blockstore.get_transaction_store(
+            integer_key.IntegerKeyTransaction.TransactionTypeName)
+        for name in ('b0t0', 'b0t1', 'b1t0', 'b1t1'):
+            store[name] = 1
+        blockstore.commit_block(block.Identifier)
+        data = dict2cbor(blockstore.dump_block(True, full=True))
+        size = len(data) // 3 + 1
+        chunks = [data[i:i + size] for i in range(0, len(data), size)]
+        self._snapshot = (block.Identifier, data, chunks)
+
+    def _reply(self, request, failing):
+        if isinstance(request, messages.SnapshotRequestMessage):
+            (blockid, data, chunks) = self._snapshot
+            if request.BlockID is not None and self._forged:
+                data = data + 'forged'
+            return messages.SnapshotReplyMessage({
+                'BlockID': blockid, 'Size': len(data),
+                'Hash': hashlib.sha256(data).hexdigest(),
+                'ChunkHashes': [hashlib.sha256(c).hexdigest()
+                                for c in chunks]})
+        if isinstance(request, messages.BlockListRequestMessage):
+            index = request.BlockListIndex
+            return messages.BlockListReplyMessage({
+                'BlockListIndex': index,
+                'BlockIDs': [b.Identifier for b in self._blocks][index:]})
+        if isinstance(request, messages.UncommittedListRequestMessage):
+            index = request.TransactionListIndex
+            return messages.UncommittedListReplyMessage({
+                'TransactionListIndex': index,
+                'TransactionIDs': self._uncommitted[index:]})
+        if failing:
+            return messages.TransferFailedMessage()
+        if isinstance(request, messages.BlockRequestMessage):
+            block = [b for b in self._blocks
+                     if b.Identifier == request.BlockID][0]
+            return messages.BlockReplyMessage({
+                'TransactionBlockMessage': block.build_message().dump()})
+        if isinstance(request, messages.SnapshotChunkRequestMessage):
+            return messages.SnapshotChunkReplyMessage({
+                'Index': request.Index,
+                'Data': base64.b64encode(self._snapshot[2][request.Index])})
+        txn = self._txns[request.TransactionID]
+        return messages.TransactionReplyMessage({
+            'TransactionMessage': txn.build_message().dump()})
+
+    def _serve(self, transfer, failing=None):
+        handlers = {
+            messages.BlockListReplyMessage: transfer._blocklistreplyhandler,
+            messages.UncommittedListReplyMessage:
+            transfer._txnlistreplyhandler,
+            messages.BlockReplyMessage: transfer._blockreplyhandler,
+            messages.TransactionReplyMessage: transfer._txnreplyhandler,
+            messages.TransferFailedMessage: transfer._failedhandler,
+            messages.SnapshotReplyMessage: transfer._snapshotreplyhandler,
+            messages.SnapshotChunkReplyMessage: transfer._chunkreplyhandler}
+
+        served = {}
+        most = 0
+        while self._sent:
+            most = max(most, len(transfer.Outstanding))
+            (request, peerid) = self._sent.pop(0)
+            served[peerid] = served.get(peerid, 0) + 1
+            reply = self._reply(request, peerid == failing)
+            reply.InReplyTo = request.Identifier
+            reply.SenderID = peerid
+            handlers[type(reply)](reply, self._journal)
+        return (served, most)
+
+    def test_transfer(self):
+        completed = []
+        transfer = JournalTransfer(self._gossip, self._journal,
+                                   lambda: completed.append(True),
+                                   window=3)
+        transfer.initiate_journal_transfer()
+        failing = [p for p in transfer.Peers if p != transfer.Peer][0]
+        (served, most) = self._serve(transfer, failing.Identifier)
+
+        self.assertEqual(completed, [True])
+        self.assertLessEqual(most, 3)
+        self.assertGreater(len(served), 2)
+
+        # every transaction and block arrives once, in chain order, even
+        # though one of the peers failed the requests sent to it
+        self.assertEqual(
+            [t.Identifier for t in self._journal.initial_transactions],
+            [t for b in self._blocks for t in b.TransactionIDs] +
+            self._uncommitted)
+        self.assertEqual(
+            [b.Identifier for b in self._journal.initial_block_list],
+            [b.Identifier for b in self._blocks])
+        self.assertEqual(transfer.ItemsReceived, 10)
+
+    def test_snapshot_transfer(self):
+        self._build_snapshot(self._blocks[1])
+        completed = []
+        transfer = JournalTransfer(self._gossip, self._journal,
+                                   lambda: completed.append(True),
+                                   window=3, snapshot=True)
+        transfer.initiate_journal_transfer()
+        self._serve(transfer)
+        self.assertEqual(completed, [True])
+
+        # the state of the snapshot is installed and only the block that
+        # follows it, with its transactions, is left to validate
+        self.assertEqual(self._journal.most_recent_committed_block_id,
+                         self._blocks[1].Identifier)
+        self.assertEqual(self._journal.committed_block_ids(),
+                         [self._blocks[1].Identifier,
+                          self._blocks[0].Identifier])
+        store = self._journal.global_store_map.get_transaction_store(
+            integer_key.IntegerKeyTransaction.TransactionTypeName,
+            self._blocks[1].Identifier)
+        self.assertEqual(store['b1t1'], 1)
+        self.assertEqual(
+            [b.Identifier for b in self._journal.initial_block_list],
+            [self._blocks[2].Identifier])
+        self.assertEqual(
+            [t.Identifier for t in self._journal.initial_transactions],
+            self._blocks[2].TransactionIDs + self._uncommitted)
+        self.assertEqual(transfer.ItemsReceived, 9)
+
+    def test_unconfirmed_snapshot(self):
+        # a snapshot that another peer reports with another hash is not
+        # used, the chain is replayed
+        self._build_snapshot(self._blocks[1])
+        self._forged = True
+        completed = []
+        transfer = JournalTransfer(self._gossip, self._journal,
+                                   lambda: completed.append(True),
+                                   window=3, snapshot=True)
+        transfer.initiate_journal_transfer()
+        self._serve(transfer)
+        self.assertEqual(completed, [True])
+        self.assertIsNone(transfer.Snapshot)
+        self.assertEqual(
+            [b.Identifier for b in self._journal.initial_block_list],
+            [b.Identifier for b in self._blocks])
+        self.assertEqual(transfer.ItemsReceived, 10)
+
+    def test_timeout(self):
+        transfer = JournalTransfer(self._gossip, self._journal,
+                                   lambda: None, window=1)
+        transfer.initiate_journal_transfer()
+        for _ in range(2):
+            (request, peerid) = self._sent.pop(0)
+            reply = self._reply(request, False)
+            reply.InReplyTo = request.Identifier
+            transfer._blocklistreplyhandler(reply, self._journal)
+
+        # an unanswered block request is sent to another peer
+        (request, peerid) = self._sent.pop(0)
+        self.assertIsInstance(request, messages.BlockRequestMessage)
+        for requestid, entry in transfer.Outstanding.items():
+            transfer.Outstanding[requestid] = entry[:3] + (0,)
+        transfer._check_timeouts()
+        (retry, retrypeer) = self._sent.pop(0)
+        self.assertEqual(retry.BlockID, request.BlockID)
+        self.assertNotEqual(retrypeer, peerid)
+        transfer._clear_handlers()
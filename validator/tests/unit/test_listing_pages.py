@@ -0,0 +1,213 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import base64
+
+from twisted.web import http
+
+from sawtooth.client import SawtoothClient
+from sawtooth.exceptions import MessageException
+from sawtooth_validator.consensus.dev_mode.dev_mode_transaction_block \
+    import DevModeTransactionBlock
+from gossip.common import dict2json
+from journal import transaction_block
+from ledger.transaction import integer_key
+from txnserver.web_pages.block_page import BlockPage
+from txnserver.web_pages.store_page import StorePage
+from txnserver.web_pages.transaction_page import TransactionPage
+from web_page_test_case import WebPageTestCase
+
+
+class _Communication(object):
+    def __init__(self, test, pages):
+        self._test = test
+        self._pages = pages
+
+    def getmsg(self, path, timeout=10):
+        (code, response) = self._test._get_url(self._pages, path)
+        if code != http.OK:
+            raise MessageException(
+                'operation failed with response: {0}'.format(code))
+        return response
+
+
+class TestListingPages(WebPageTestCase):
+
+    def _open_journal(self):
+        journal = super(TestListingPages, self)._open_journal()
+        integer_key.register_transaction_types(journal)
+        return journal
+
+    def setUp(self):
+        super(TestListingPages, self).setUp()
+
+        # a chain of five blocks, block n holds n transactions that each
+        # set a key
+        self._store = integer_key.IntegerKeyTransaction.TransactionTypeName
+        for num in range(5):
+            self._commit(num, ['k{0}_{1}'.format(num, i) for i in range(num)])
+
+        self._pages = {'block': self._page(BlockPage),
+                       'transaction': self._page(TransactionPage),
+                       'store': self._page(StorePage)}
+
+    def _commit(self, num, names):
+        previous = self._journal.most_recent_committed_block_id
+        gsm = self._journal.global_store_map
+        blockstore = gsm.get_block_store(previous).clone_block()
+        store = blockstore.get_transaction_store(self._store)
+
+        txnids = []
+        for name in names:
+            txn = integer_key.IntegerKeyTransaction({
+                'Updates': [{'Verb': 'set', 'Name': name, 'Value': num}],
+                'Dependencies': []})
+            txn.sign_from_node(self._node)
+            self._journal.transaction_store[txn.Identifier] = txn
+            txnids.append(txn.Identifier)
+            store[name] = num
+
+        block = DevModeTransactionBlock({
+            'BlockNum': num, 'PreviousBlockID': previous,
+            'TransactionIDs': txnids})
+        block.sign_from_node(self._node)
+        block.Status = transaction_block.Status.valid
+        gsm.commit_block_store(block.Identifier, blockstore)
+        self._journal.block_store[block.Identifier] = block
+        self._journal._commit_block(block)
+
+    def _walk(self, path, limit, args=None):
+        """
+        Request a listing page by page, returns the pages
+        """
+        pages = []
+        cursor = None
+        while True:
+            query = dict(args or {})
+            query['limit'] = [str(limit)]
+            if cursor is not None:
+                query['cursor'] = [cursor]
+            (code, page) = self._get_url(self._pages, path + '?' + '&'.join(
+                '{0}={1}'.format(k, v[0]) for k, v in query.iteritems()))
+            self.assertEqual(code, http.OK)
+            self.assertLessEqual(len(page['Items']), limit)
+            pages.append(page['Items'])
+            cursor = page['Next']
+            if cursor is None:
+                return pages
+
+    def test_transaction_pages(self):
+        (_, expected) = self._get_url(self._pages, '/transaction')
+        self.assertEqual(len(expected), 10)
+
+        # pages end inside blocks and on their boundaries
+        for limit in range(1, 12):
+            pages = self._walk('/transaction', limit)
+            self.assertEqual(sum(pages, []), expected)
+            self.assertTrue(all(pages))
+
+        (_, expected) = self._get_url(self._pages,
+                                      '/transaction?blockcount=2')
+        pages = self._walk('/transaction', 3, {'blockcount': ['2']})
+        self.assertEqual(sum(pages, []), expected)
+        self.assertEqual(len(expected), 7)
+
+    def test_block_pages(self):
+        (_, expected) = self._get_url(self._pages, '/block')
+        self.assertEqual(len(expected), 5)
+        for limit in range(1, 7):
+            pages = self._walk('/block', limit)
+            self.assertEqual(sum(pages, []), expected)
+            self.assertTrue(all(pages))
+
+    def test_store_pages(self):
+        path = '/store/' + self._store.strip('/')
+        (_, keys) = self._get_url(self._pages, path)
+        (_, objects) = self._get_url(self._pages, path + '/*')
+        self.assertEqual(len(keys), 10)
+        for limit in range(1, 12):
+            pages = self._walk(path, limit)
+            self.assertEqual(sum(pages, []), sorted(keys))
+
+            pages = self._walk(path + '/*', limit)
+            ordered = sum([sorted(p) for p in pages], [])
+            self.assertEqual(ordered, sorted(keys))
+            merged = {}
+            for page in pages:
+                self.assertTrue(set(page).isdisjoint(merged))
+                merged.update(page)
+            self.assertEqual(merged, objects)
+
+    def test_decommitted_cursor(self):
+        (_, page) = self._get_url(self._pages, '/block?limit=2')
+        block_cursor = page['Next']
+        (_, page) = self._get_url(self._pages, '/transaction?limit=3')
+        txn_cursor = page['Next']
+
+        # the cursors name blocks at heights 2 and 3, which are left
+        # once both are decommitted
+        for _ in range(3):
+            self._journal._decommit_block()
+        for (name, cursor) in (('block', block_cursor),
+                               ('transaction', txn_cursor)):
+            (code, response) = self._get_url(
+                self._pages,
+                '/{0}?limit=2&cursor={1}'.format(name, cursor))
+            self.assertEqual(code, http.GONE)
+            self.assertEqual(response['status'], http.GONE)
+
+    def test_invalid_cursor(self):
+        store = '/store/' + self._store.strip('/')
+        pages = ['/block', '/transaction', store]
+        cases = [
+            ('garbage', pages),
+            ('[]', pages),
+            ('{}', pages),
+            ({'Height': 'x', 'BlockID': 'b', 'Offset': 0},
+             ['/block', '/transaction']),
+            ({'Height': -1, 'BlockID': 'b', 'Offset': 0},
+             ['/block', '/transaction']),
+            ({'Height': 1, 'BlockID': 'b', 'Offset': 'x'},
+             ['/transaction']),
+            ({'BlockID': 7, 'Key': 'k'}, [store]),
+            ({'BlockID': 'b', 'Key': ['k']}, [store])]
+        for (cursor, paths) in cases:
+            if isinstance(cursor, dict):
+                cursor = dict2json(cursor)
+            if cursor != 'garbage':
+                cursor = base64.urlsafe_b64encode(cursor)
+            for path in paths:
+                (code, _) = self._get_url(
+                    self._pages,
+                    '{0}?limit=2&cursor={1}'.format(path, cursor))
+                self.assertEqual(code, http.BAD_REQUEST)
+
+    def test_client_iterators(self):
+        client = SawtoothClient('http://localhost:8800',
+                                store_name=self._store)
+        client._communication = _Communication(self, self._pages)
+
+        (_, blocks) = self._get_url(self._pages, '/block')
+        self.assertEqual(list(client.iter_block_list(page_size=2)), blocks)
+        (_, txns) = self._get_url(self._pages, '/transaction')
+        self.assertEqual(list(client.iter_transaction_list(page_size=3)),
+                         txns)
+
+        path = '/store/' + self._store.strip('/')
+        (_, keys) = self._get_url(self._pages, path)
+        (_, objects) = self._get_url(self._pages, path + '/*')
+        self.assertEqual(list(client.iter_store(page_size=4)), sorted(keys))
+        self.assertEqual(list(client.iter_all_store_objects(page_size=3)),
+                         sorted(objects.iteritems()))
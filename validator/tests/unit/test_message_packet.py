@@ -16,7 +16,9 @@
 import unittest
 import time
 
-from gossip.message import Packet, Message, unpack_message_data
+from gossip.message import BundleAck, Packet, PacketBundle, PacketType
+from gossip.message import Message, ReassemblyBuffer, packet_type
+from gossip.message import unpack_message_data
 from gossip.node import Node
 from gossip.common import dict2cbor
 
@@ -102,6 +104,135 @@ class TestPacket(unittest.TestCase):
         self.assertEquals("test the pack", pak.Data)
 
 
+
+class TestPacketBundle(unittest.TestCase):
+
+    def _packet(self, seqno, data, reliable=True):
+        pak = Packet()
+        pak.SequenceNumber = seqno
+        pak.TimeToLive = seqno + 10
+        pak.IsReliable = reliable
+        pak.Data = data
+        return pak
+
+    def test_pack_unpack(self):
+        bundle = PacketBundle("sender")
+        bundle.add_packet(self._packet(7, "first"))
+        bundle.add_packet(self._packet(8, "", reliable=False))
+        bundle.add_packet(self._packet(9, "third"))
+        packed = bundle.pack()
+        self.assertEqual(len(packed), len(bundle))
+        self.assertEqual(packet_type(packed), PacketType.bundle)
+
+        unpacked = PacketBundle()
+        unpacked.unpack(packed)
+        self.assertEqual(unpacked.SenderID, "sender")
+        self.assertEqual(
+            [(p.SequenceNumber, p.TimeToLive, p.IsReliable, p.Data)
+             for p in unpacked.Packets],
+            [(7, 17, True, "first"), (8, 18, False, ""),
+             (9, 19, True, "third")])
+
+        # truncated bundles are rejected
+        with self.assertRaises(ValueError):
+            unpacked.unpack(packed[:-1])
+
+    def test_ack(self):
+        bundle = PacketBundle("sender")
+        self.assertIsNone(bundle.create_ack("receiver"))
+        for seqno in (3, 4, 6, 14, 20):
+            bundle.add_packet(self._packet(seqno, "x", seqno != 6))
+
+        ack = bundle.create_ack("receiver")
+        packed = ack.pack()
+        self.assertEqual(packet_type(packed), PacketType.bundle_ack)
+
+        unpacked = BundleAck()
+        unpacked.unpack(packed)
+        self.assertEqual(unpacked.SenderID, "receiver")
+        self.assertEqual(unpacked.SequenceNumbers, [3, 4, 14, 20])
+
+    def test_version_1_header(self):
+        # version 1 packets and acks keep their header
+        pak = Packet()
+        self.assertEqual(packet_type(pak.pack()), PacketType.data)
+        ack = pak.create_ack("receiver")
+        self.assertEqual(packet_type(ack.pack()), PacketType.ack)
+        self.assertIsNone(packet_type(""))
+
+
+
+class TestFragmentation(unittest.TestCase):
+
+    def _packet(self, data):
+        pak = Packet()
+        pak.SequenceNumber = 40
+        pak.TimeToLive = 12
+        pak.SenderID = "sender"
+        pak.Data = data
+        return pak
+
+    def _fragments(self, pak, maxsize):
+        fragments = []
+        for seqno, fragment in enumerate(pak.fragment(maxsize)):
+            fragment.SequenceNumber = seqno + 100
+            packed = fragment.pack()
+            self.assertLessEqual(len(packed), maxsize)
+            self.assertEqual(packet_type(packed), PacketType.fragment)
+
+            unpacked = Packet()
+            unpacked.unpack(packed)
+            fragments.append(unpacked)
+        return fragments
+
+    def test_fragment_round_trip(self):
+        data = "".join(chr(i % 256) for i in range(1000))
+        fragments = self._fragments(self._packet(data), 200)
+        self.assertEqual(len(fragments), 7)
+        self.assertEqual([f.SequenceNumber for f in fragments],
+                         range(100, 107))
+        self.assertTrue(all(f.IsFragment and f.FragmentID == 40 and
+                            f.FragmentCount == 7 for f in fragments))
+
+        # fragments may arrive out of order and more than once
+        buf = ReassemblyBuffer()
+        for fragment in reversed(fragments[1:]):
+            self.assertIsNone(buf.add_fragment(fragment))
+        self.assertIsNone(buf.add_fragment(fragments[1]))
+        self.assertEqual(len(buf), 1)
+
+        pak = buf.add_fragment(fragments[0])
+        self.assertEqual(pak.Data, data)
+        self.assertEqual((pak.SequenceNumber, pak.TimeToLive, pak.SenderID),
+                         (40, 12, "sender"))
+        self.assertFalse(pak.IsFragment)
+        self.assertEqual((len(buf), buf.Size), (0, 0))
+
+    def test_reassembly_timeout(self):
+        fragments = self._fragments(self._packet("x" * 500), 200)
+        buf = ReassemblyBuffer(timeout=10)
+        buf.add_fragment(fragments[0], now=100)
+        buf.expire(105)
+        self.assertEqual(len(buf), 1)
+        buf.expire(111)
+        self.assertEqual((len(buf), buf.Size, buf.Expired), (0, 0, 1))
+
+    def test_reassembly_bound(self):
+        first = self._fragments(self._packet("a" * 500), 200)
+        second = self._packet("b" * 500)
+        second.SequenceNumber = 41
+        second = self._fragments(second, 200)
+
+        buf = ReassemblyBuffer(maxsize=300)
+        buf.add_fragment(first[0], now=100)
+        buf.add_fragment(first[1], now=100)
+        # the incomplete packet that expires first makes room
+        buf.add_fragment(second[0], now=101)
+        self.assertEqual(len(buf), 1)
+        self.assertEqual(buf.Expired, 1)
+        self.assertLessEqual(buf.Size, 300)
+
+
 class TestMessage(unittest.TestCase):
 
     def test_message_init(self):
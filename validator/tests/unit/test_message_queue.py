@@ -0,0 +1,87 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import copy
+import unittest
+
+from gossip.message import Message
+from gossip.message_queue import MessageQueue
+from gossip.messages.connect_message import KeepAliveMessage
+from journal.messages.journal_transfer import BlockReplyMessage
+from journal.messages.transaction_block_message \
+    import TransactionBlockMessage
+from journal.messages.transaction_message import TransactionMessage
+
+
+class TestMessageQueue(unittest.TestCase):
+
+    def test_lanes(self):
+        queue = MessageQueue()
+        self.assertEqual(queue.lane_of(TransactionMessage()), 'transaction')
+        self.assertEqual(queue.lane_of(TransactionBlockMessage()), 'block')
+        self.assertEqual(queue.lane_of(BlockReplyMessage()), 'transfer')
+        self.assertEqual(queue.lane_of(KeepAliveMessage()), 'system')
+        self.assertEqual(queue.lane_of(Message()), 'default')
+        self.assertEqual(queue.lane_of(None), 'system')
+
+    def test_priority(self):
+        queue = MessageQueue()
+        txns = [TransactionMessage() for _ in range(3)]
+        block = TransactionBlockMessage()
+        reply = BlockReplyMessage()
+        for msg in txns[:2] + [reply, block, txns[2]]:
+            self.assertTrue(queue.appendleft(msg))
+        self.assertEqual(len(queue), 5)
+
+        self.assertEqual([queue.pop() for _ in range(5)],
+                         [block, reply] + txns)
+        self.assertEqual(len(queue), 0)
+        self.assertGreaterEqual(queue.lane('transaction').WaitTime, 0.0)
+
+    def test_copy(self):
+        queue = MessageQueue({'transaction': {'Bound': 1}})
+        queue.appendleft(TransactionMessage())
+        queue.appendleft(Message())
+
+        other = copy.deepcopy(queue)
+        self.assertEqual(len(other), 2)
+        self.assertTrue(other.is_full('transaction'))
+        self.assertEqual(other.lane_of(other.pop()), 'default')
+        self.assertEqual(len(queue), 2)
+
+    def test_bounds(self):
+        queue = MessageQueue({
+            'transaction': {'Bound': 2},
+            'default': {'Bound': 2, 'Policy': 'drop-oldest'}})
+        txns = [TransactionMessage() for _ in range(3)]
+        self.assertEqual([queue.appendleft(m) for m in txns],
+                         [True, True, False])
+        self.assertTrue(queue.is_full('transaction'))
+        self.assertEqual(queue.lane('transaction').Dropped, 1)
+
+        msgs = [Message() for _ in range(3)]
+        self.assertEqual([queue.appendleft(m) for m in msgs],
+                         [True, True, True])
+        self.assertEqual(queue.lane('default').Dropped, 1)
+        self.assertEqual([queue.pop() for _ in range(4)],
+                         msgs[1:] + txns[:2])
+
+        # the wake up for the dispatcher is never dropped
+        self.assertTrue(queue.appendleft(None))
+
+        with self.assertRaises(ValueError):
+            MessageQueue({'unknown': {'Bound': 1}})
+        with self.assertRaises(ValueError):
+            MessageQueue({'default': {'Policy': 'unknown'}})
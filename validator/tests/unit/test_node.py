@@ -13,6 +13,7 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 
+import threading
 import unittest
 import time
 
@@ -213,6 +214,43 @@ class TestNode(unittest.TestCase):
         # by the reset_peer_stats
         self.assertEquals(stats3, stats4)
 
+    def _join_resolver(self, node):
+        for thread in threading.enumerate():
+            if thread.name == 'resolve-' + node.Name:
+                thread.join()
+
+    def test_node_resolved_address(self):
+        # A host name is resolved in the background, then served from the
+        # cache
+        node = self._create_node()
+        self._join_resolver(node)
+        self.assertEquals(node.ResolvedAddress, ("127.0.0.1", 8800))
+        self.assertEquals(node.ResolutionFailures, 0)
+
+        # A stale address is still used while it is refreshed
+        node._next_resolution = 0
+        self.assertEquals(node.ResolvedAddress, ("127.0.0.1", 8800))
+        self._join_resolver(node)
+        self.assertGreater(node._next_resolution, time.time())
+
+    def test_node_ip_address(self):
+        # An IP address is used as given
+        node = Node(identifier="node", address=("127.0.0.1", 8800))
+        self.assertEquals(node.ResolvedAddress, ("127.0.0.1", 8800))
+        self.assertFalse(node._resolving)
+
+    def test_node_resolution_failure(self):
+        # Failures are counted and never block a send
+        node = self._create_node()
+        self._join_resolver(node)
+        node.NetHost = "invalid.invalid"
+        node.resolve_address()
+        self.assertIsNone(node.ResolvedAddress)
+        self.assertEquals(node.ResolutionFailures, 1)
+        node.initialize_stats(node)
+        stats = node.Stats.get_stats(["ResolutionFailures"])
+        self.assertEquals(stats["ResolutionFailures"], 1)
+
     def test_node_clone(self):
         # Test making a clone of the node, it should have the same
         # Identifier and NetAddress, but will be different node objects
@@ -0,0 +1,229 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import random
+import unittest
+
+from journal.global_store_manager import KeyValueStore
+from journal.global_store_manager import ReadOnlyException
+from journal.global_store_manager import freeze_value
+from journal.object_store import ObjectStore
+from journal.persistent_map import PersistentMap
+
+
+class CollidingKey(object):
+    def __init__(self, name):
+        self.name = name
+
+    def __hash__(self):
+        return 42
+
+    def __eq__(self, other):
+        return isinstance(other, CollidingKey) and self.name == other.name
+
+    def __ne__(self, other):
+        return not self == other
+
+
+class TestPersistentMap(unittest.TestCase):
+
+    def test_set_get_delete(self):
+        reference = {}
+        pmap = PersistentMap()
+        for i in xrange(5000):
+            key = 'key{}'.format(random.randint(0, 2000))
+            if random.random() < 0.3:
+                pmap = pmap.delete(key)
+                reference.pop(key, None)
+            else:
+                pmap = pmap.set(key, i)
+                reference[key] = i
+
+        self.assertEqual(len(pmap), len(reference))
+        self.assertEqual(pmap.to_dict(), reference)
+        for key, value in reference.iteritems():
+            self.assertIn(key, pmap)
+            self.assertEqual(pmap[key], value)
+        self.assertNotIn('missing', pmap)
+        self.assertIsNone(pmap.get('missing'))
+        with self.assertRaises(KeyError):
+            pmap['missing']
+
+    def test_versions_are_independent(self):
+        first = PersistentMap({'a': 1, 'b': 2})
+        second = first.set('a', 10).delete('b').set('c', 3)
+
+        self.assertEqual(first.to_dict(), {'a': 1, 'b': 2})
+        self.assertEqual(second.to_dict(), {'a': 10, 'c': 3})
+
+    def test_unchanged_updates_return_same_map(self):
+        value = object()
+        pmap = PersistentMap({'a': value})
+        self.assertIs(pmap.set('a', value), pmap)
+        self.assertIs(pmap.delete('missing'), pmap)
+
+    def test_hash_collisions(self):
+        keys = [CollidingKey(str(i)) for i in xrange(10)]
+        pmap = PersistentMap()
+        for i, key in enumerate(keys):
+            pmap = pmap.set(key, i)
+        pmap = pmap.set('other', 'x')
+
+        self.assertEqual(len(pmap), 11)
+        for i, key in enumerate(keys):
+            self.assertEqual(pmap[key], i)
+
+        for key in keys[:-1]:
+            pmap = pmap.delete(key)
+        self.assertEqual(len(pmap), 2)
+        self.assertEqual(pmap[keys[-1]], 9)
+        self.assertEqual(pmap['other'], 'x')
+
+    def test_update(self):
+        pmap = PersistentMap({'a': 1, 'b': 2})
+        updated = pmap.update({'b': 3, 'c': 4}, ['a'])
+        self.assertEqual(updated.to_dict(), {'b': 3, 'c': 4})
+        self.assertEqual(len(updated), 2)
+
+
+class TestKeyValueStoreChain(unittest.TestCase):
+
+    def _build_chain(self, depth):
+        store = KeyValueStore()
+        stores = [store]
+        for i in xrange(depth):
+            store.set('k{}'.format(i), {'value': i})
+            if i > 0:
+                store.delete('k{}'.format(i - 1))
+            store.commit()
+            store = store.clone_store()
+            stores.append(store)
+        return stores
+
+    def test_chain_lookups(self):
+        stores = self._build_chain(100)
+        head = stores[-1]
+        self.assertEqual(head.keys(), ['k99'])
+        self.assertEqual(head['k99'], {'value': 99})
+        self.assertNotIn('k50', head)
+        self.assertIn('k50', stores[50])
+        self.assertFalse(head.has_key('k0'))
+        self.assertEqual(stores[50].compose(), {'k50': {'value': 50}})
+
+    def test_delete_then_reset_in_checkpoint(self):
+        store = KeyValueStore()
+        store['a'] = 1
+        store.commit()
+        child = store.clone_store()
+        del child['a']
+        child['a'] = 2
+        self.assertEqual(child.dump(), {'Store': {'a': 2},
+                                        'DeletedKeys': []})
+        self.assertEqual(store['a'], 1)
+        self.assertEqual(child['a'], 2)
+
+    def test_restore_from_dump(self):
+        stores = self._build_chain(10)
+        parent = stores[5]
+        info = stores[6].dump()
+        restored = parent.clone_store(info, True)
+        self.assertEqual(restored.compose(), stores[6].compose())
+
+    def test_flatten(self):
+        stores = self._build_chain(10)
+        stores[5].flatten()
+        self.assertIsNone(stores[5].PrevStore)
+        self.assertEqual(stores[5].keys(), ['k5'])
+        self.assertEqual(stores[-1].keys(), ['k9'])
+
+    def test_readonly(self):
+        store = KeyValueStore()
+        store.commit()
+        with self.assertRaises(ReadOnlyException):
+            store['a'] = 1
+        with self.assertRaises(ReadOnlyException):
+            del store['a']
+
+    def test_values_are_copied(self):
+        store = KeyValueStore()
+        value = {'a': [1]}
+        store['x'] = value
+        value['a'].append(2)
+        self.assertEqual(store['x'], {'a': [1]})
+        store['x']['a'].append(3)
+        self.assertEqual(store['x'], {'a': [1]})
+
+
+class TestImmutableValues(unittest.TestCase):
+
+    def _store(self):
+        store = KeyValueStore()
+        store.ImmutableValues = True
+        return store
+
+    def test_freeze_value(self):
+        value = freeze_value({'a': [1, {'b': 2}], 'c': (3, [4]), 'd': 'e'})
+        self.assertEqual(value, {'a': [1, {'b': 2}], 'c': (3, [4]),
+                                 'd': 'e'})
+        self.assertIs(freeze_value(value), value)
+        with self.assertRaises(TypeError):
+            value['d'] = 'f'
+        with self.assertRaises(TypeError):
+            value['a'].append(5)
+        with self.assertRaises(TypeError):
+            value['a'][1]['b'] = 3
+        with self.assertRaises(TypeError):
+            value['c'][1].extend([5])
+
+    def test_values_are_shared(self):
+        store = self._store()
+        value = {'a': [1]}
+        store['x'] = value
+        value['a'].append(2)
+        self.assertEqual(store['x'], {'a': [1]})
+        self.assertIs(store['x'], store['x'])
+        with self.assertRaises(TypeError):
+            store['x']['a'].append(3)
+
+    def test_mode_is_inherited(self):
+        store = self._store()
+        store['x'] = {'a': 1}
+        store.commit()
+        child = store.clone_store()
+        self.assertTrue(child.ImmutableValues)
+        self.assertIs(child['x'], store['x'])
+
+        restored = store.clone_store({'Store': {'y': {'b': [2]}},
+                                      'DeletedKeys': ['x']})
+        self.assertNotIn('x', restored)
+        with self.assertRaises(TypeError):
+            restored['y']['b'].append(3)
+        self.assertEqual(restored.dump(), {'Store': {'y': {'b': [2]}},
+                                           'DeletedKeys': ['x']})
+
+    def test_object_store_indexes(self):
+        store = ObjectStore()
+        store.ImmutableValues = True
+        store['1'] = {'object-type': 'asset', 'name': 'one'}
+        self.assertIs(store.lookup('asset:name', 'one'), store['1'])
+        store.commit()
+
+        child = store.clone_store()
+        value = dict(child['1'])
+        value['name'] = 'uno'
+        child['1'] = value
+        self.assertEqual(child.lookup('asset:name', 'uno')['name'], 'uno')
+        with self.assertRaises(KeyError):
+            store.lookup('asset:name', 'uno')
@@ -0,0 +1,176 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import unittest
+
+from twisted.web import http
+
+from sawtooth_validator.consensus.dev_mode.dev_mode_transaction_block \
+    import DevModeTransactionBlock
+from gossip.event_handler import EventHandler
+from journal import transaction_block
+from ledger.transaction import integer_key
+from txnserver.web_pages.base_page import ResponseCache
+from txnserver.web_pages.store_page import StorePage
+from txnserver.web_pages.transaction_page import TransactionPage
+from web_page_test_case import WebPageTestCase
+from web_page_test_case import WebRequest
+
+
+class _Journal(object):
+    def __init__(self):
+        self.on_commit_block = EventHandler('onCommitBlock')
+        self.on_decommit_block = EventHandler('onDecommitBlock')
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def test_head_relative_entries(self):
+        journal = _Journal()
+        cache = ResponseCache(journal)
+        cache.put('list', 'l1', 'head1')
+        cache.put('block', 'b1')
+        self.assertEqual(cache.get('list', 'head1'), 'l1')
+        self.assertIsNone(cache.get('list', 'head2'))
+        self.assertEqual(cache.get('block'), 'b1')
+        self.assertEqual((cache.Hits, cache.Misses), (2, 1))
+
+        journal.on_commit_block.fire(journal, None)
+        self.assertIsNone(cache.get('list', 'head1'))
+        self.assertEqual(cache.get('block'), 'b1')
+
+        cache.put('list', 'l2', 'head2')
+        journal.on_decommit_block.fire(journal, None)
+        self.assertEqual(len(cache), 1)
+
+    def test_least_recently_used_are_dropped(self):
+        cache = ResponseCache(_Journal(), maxsize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_entries_are_bounded_in_bytes(self):
+        cache = ResponseCache(_Journal(), maxbytes=10, maxentrybytes=6)
+        self.assertFalse(cache.put('large', 'l', size=7))
+        self.assertIsNone(cache.get('large'))
+
+        cache.put('a', 1, size=4)
+        cache.put('b', 2, size=4)
+        cache.put('c', 3, size=4)
+        self.assertEqual((len(cache), cache.Bytes), (2, 8))
+        self.assertIsNone(cache.get('a'))
+
+        # replacing an entry with one that is too large drops it
+        cache.put('b', 4, size=7)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.Bytes, 4)
+
+
+class TestCachedResponses(WebPageTestCase):
+
+    def _open_journal(self):
+        journal = super(TestCachedResponses, self)._open_journal()
+        integer_key.register_transaction_types(journal)
+        return journal
+
+    def setUp(self):
+        super(TestCachedResponses, self).setUp()
+        self._store_page = self._page(StorePage)
+        self._cache = self._store_page.response_cache
+
+    def _request(self, page, path, headers=None):
+        request = WebRequest(path, headers=headers)
+        body = page.do_get(request)
+        return (request, body)
+
+    def _commit_empty_block(self):
+        previous = self._journal.most_recent_committed_block_id
+        gsm = self._journal.global_store_map
+        block = DevModeTransactionBlock({
+            'BlockNum': 0, 'PreviousBlockID': previous,
+            'TransactionIDs': []})
+        block.sign_from_node(self._node)
+        block.Status = transaction_block.Status.valid
+        gsm.commit_block_store(block.Identifier,
+                               gsm.get_block_store(previous).clone_block())
+        self._journal.block_store[block.Identifier] = block
+        self._journal._commit_block(block)
+
+    def test_etag(self):
+        (request, body) = self._request(self._store_page, '/store')
+        self.assertEqual(request.code, http.OK)
+        etag = request.responseHeaders.getRawHeaders('etag')[0]
+        self.assertEqual(len(self._cache), 1)
+
+        # the cached response carries the same tag
+        (request, cached) = self._request(self._store_page, '/store')
+        self.assertEqual(cached, body)
+        self.assertEqual(request.responseHeaders.getRawHeaders('etag'),
+                         [etag])
+        self.assertEqual(self._cache.Hits, 1)
+
+        (request, body) = self._request(
+            self._store_page, '/store', {'If-None-Match': etag})
+        self.assertEqual(request.code, http.NOT_MODIFIED)
+        self.assertEqual(body, '')
+
+        (request, body) = self._request(
+            self._store_page, '/store', {'If-None-Match': '"other"'})
+        self.assertEqual(request.code, http.OK)
+        self.assertNotEqual(body, '')
+
+    def test_errors_are_not_cached(self):
+        (request, _) = self._request(self._store_page, '/store/nostore')
+        self.assertEqual(request.code, http.NOT_FOUND)
+        self.assertEqual(len(self._cache), 0)
+
+    def test_uncacheable_responses_are_not_cached(self):
+        # a pending transaction may still change
+        txn = integer_key.IntegerKeyTransaction({
+            'Updates': [{'Verb': 'set', 'Name': 'a', 'Value': 1}],
+            'Dependencies': []})
+        txn.sign_from_node(self._node)
+        self._journal.add_pending_transaction(txn, build_block=False)
+
+        page = self._page(TransactionPage)
+        (request, _) = self._request(page, '/transaction/' + txn.Identifier)
+        self.assertEqual(request.code, http.OK)
+        self.assertFalse(request.responseHeaders.hasHeader('etag'))
+        self.assertEqual(len(page.response_cache), 0)
+
+    def test_responses_computed_across_a_commit_are_not_cached(self):
+        render_get = self._store_page.render_get
+
+        def commit_while_rendering(request, components, msg):
+            response = render_get(request, components, msg)
+            self._commit_empty_block()
+            return response
+
+        self._store_page.render_get = commit_while_rendering
+        (request, _) = self._request(self._store_page, '/store')
+        self.assertEqual(request.code, http.OK)
+        self.assertEqual(len(self._cache), 0)
+
+    def test_large_responses_are_not_cached(self):
+        self._cache.MaximumEntryBytes = 1
+        (request, _) = self._request(self._store_page, '/store')
+        self.assertEqual(request.code, http.OK)
+        self.assertTrue(request.responseHeaders.hasHeader('etag'))
+        self.assertEqual(len(self._cache), 0)
@@ -0,0 +1,59 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import unittest
+
+from gossip.seen_set import SeenSet
+
+
+class TestSeenSet(unittest.TestCase):
+
+    def test_generations(self):
+        seen = SeenSet(lifetime=100)
+        seen['a'] = 1005
+        seen.add('b', 1050)
+        seen.add('b', 1050)
+        self.assertEqual(len(seen), 2)
+
+        seen.expire(1005)
+        self.assertIn('a', seen)
+        seen.expire(1011)
+        self.assertNotIn('a', seen)
+        self.assertIn('b', seen)
+        seen.expire(1060)
+        self.assertEqual(len(seen), 0)
+
+    def test_maximum_size(self):
+        seen = SeenSet(lifetime=100, maxsize=25)
+        for i in range(40):
+            seen.add(str(i), 1000 + i)
+
+        self.assertLessEqual(len(seen), 25)
+        self.assertGreater(seen.Evicted, 0)
+        self.assertNotIn('0', seen)
+        self.assertIn('39', seen)
+
+    def test_bloom_filter(self):
+        seen = SeenSet(lifetime=100, maxsize=10000, bloom_filter=True)
+        for i in range(500):
+            seen.add('msg{0}'.format(i), 1000)
+
+        self.assertTrue(all('msg{0}'.format(i) in seen for i in range(500)))
+        false_positives = [i for i in range(10000)
+                           if 'other{0}'.format(i) in seen]
+        self.assertLess(len(false_positives), 10)
+
+        seen.expire(1001)
+        self.assertNotIn('msg0', seen)
@@ -13,6 +13,7 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 
+import time
 import unittest
 import pybitcointools
 
@@ -126,3 +127,78 @@ class TestSignedObject(unittest.TestCase):
         # check that the unserilized serilized dictinary is the same
         # as before serilazation
         self.assertEquals(cbor2dict(cbor), temp.dump())
+
+
+class TestSignatureVerification(unittest.TestCase):
+
+    def setUp(self):
+        self._cache = SignedObject.signature_cache
+
+    def tearDown(self):
+        SignedObject.signature_cache = self._cache
+        SigObj.set_signature_verification_globals(workers=0)
+
+    def _signed_objects(self, count):
+        objects = []
+        for _ in xrange(count):
+            obj = SignedObject()
+            obj.sign_object(SigObj.generate_signing_key())
+            objects.append(obj)
+
+        # start from copies that have not recovered their keys and an
+        # empty cache
+        SignedObject.signature_cache = SigObj.LruCache(100)
+        return [SignedObject(o.dump()) for o in objects], \
+            [o.OriginatorID for o in objects]
+
+    def test_lru_cache_eviction(self):
+        cache = SigObj.LruCache(2)
+        cache['a'] = 1
+        cache['b'] = 2
+        self.assertEqual(cache['a'], 1)
+        cache['c'] = 3
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache['a'], 1)
+        cache.resize(1)
+        self.assertEqual(len(cache), 1)
+        self.assertIsNone(cache.get('c'))
+        self.assertEqual(cache['a'], 1)
+
+    def test_lru_cache_counters_and_ttl(self):
+        cache = SigObj.LruCache(1, ttl=60)
+        cache['a'] = 1
+        self.assertEqual(cache['a'], 1)
+        self.assertIsNone(cache.get('b'))
+        cache['b'] = 2
+        self.assertEqual((cache.hits, cache.misses, cache.evictions),
+                         (1, 1, 1))
+
+        # an expired entry is dropped when it is next read
+        cache.values['b'] = (2, time.time() - 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual((cache.hits, cache.misses, cache.evictions),
+                         (1, 2, 2))
+
+    def _test_verify_signatures(self, workers):
+        SigObj.set_signature_verification_globals(workers=workers)
+        objects, idents = self._signed_objects(8)
+        bad = SignedObject({'Signature': objects[0].Signature,
+                            'public_key': 'not the key'})
+
+        self.assertEqual(SigObj.verify_signatures(objects + [bad]),
+                         [True] * len(objects) + [False])
+        self.assertEqual(len(SignedObject.signature_cache), len(objects))
+        self.assertEqual([o.OriginatorID for o in objects], idents)
+
+        # a copy picks up the recovered key from the cache
+        copy = SignedObject(objects[1].dump())
+        self.assertEqual(SigObj.verify_signatures([copy]), [True])
+        self.assertEqual(copy.originator_public_key,
+                         objects[1].originator_public_key)
+
+    def test_verify_signatures(self):
+        self._test_verify_signatures(0)
+
+    def test_verify_signatures_in_pool(self):
+        self._test_verify_signatures(2)
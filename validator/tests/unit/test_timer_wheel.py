@@ -0,0 +1,55 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import random
+import unittest
+
+from gossip.timer_wheel import TimerWheel
+
+
+class TestTimerWheel(unittest.TestCase):
+
+    def test_expire_in_order(self):
+        wheel = TimerWheel(resolution=1.0, now=0)
+        rand = random.Random(4)
+        deadlines = dict((i, rand.randint(1, 300000)) for i in range(2000))
+        for key, deadline in deadlines.iteritems():
+            wheel.schedule(key, deadline)
+
+        expired = []
+        for now in [1000, 5000, 70000, 260000, 400000]:
+            keys = wheel.expire(now)
+            self.assertTrue(all(deadlines[k] <= now for k in keys))
+            expired.extend(keys)
+            self.assertEqual(
+                len(wheel), len([d for d in deadlines.values() if d > now]))
+
+        self.assertEqual(sorted(expired), sorted(deadlines))
+        self.assertEqual([deadlines[k] for k in expired],
+                         sorted(deadlines.values()))
+
+    def test_cancel_and_reschedule(self):
+        wheel = TimerWheel(resolution=0.5, now=100)
+        wheel.schedule('a', 101)
+        wheel.schedule('b', 101)
+        wheel.schedule('c', 99)
+        wheel.cancel('b')
+        wheel.schedule('a', 200)
+        self.assertNotIn('b', wheel)
+
+        self.assertEqual(wheel.expire(150), ['c'])
+        self.assertEqual(wheel.expire(199.9), [])
+        self.assertEqual(wheel.expire(200), ['a'])
+        self.assertEqual(len(wheel), 0)
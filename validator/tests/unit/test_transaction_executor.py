@@ -0,0 +1,77 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import unittest
+
+from gossip import signed_object
+from journal.global_store_manager import BlockStore
+from journal.global_store_manager import KeyValueStore
+from journal.transaction_executor import TransactionExecutor
+from ledger.transaction import integer_key
+
+
+class TestTransactionExecutor(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls._executor = TransactionExecutor(workers=2)
+        cls._signingkey = signed_object.generate_signing_key()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._executor.close()
+
+    def _txn(self, *updates):
+        txn = integer_key.IntegerKeyTransaction({
+            'Updates': [{'Verb': v, 'Name': n, 'Value': x}
+                        for v, n, x in updates],
+            'Dependencies': []})
+        txn.sign_object(self._signingkey)
+        return txn
+
+    def _blockstore(self):
+        store = BlockStore()
+        store.add_transaction_store(
+            integer_key.IntegerKeyTransaction.TransactionTypeName,
+            KeyValueStore())
+        store.commit_block('genesis')
+        return store.clone_block()
+
+    def _execute(self, executor, txns):
+        blockstore = self._blockstore()
+        valid = executor.execute(txns, blockstore)
+        txnstore = blockstore.get_transaction_store(
+            integer_key.IntegerKeyTransaction.TransactionTypeName)
+        return valid, dict(txnstore.iteritems())
+
+    def test_matches_serial_execution(self):
+        txns = [self._txn(('set', 'k{0}'.format(i), i)) for i in xrange(6)]
+        # conflicting run followed by another independent run
+        txns += [self._txn(('inc', 'k0', 5), ('dec', 'k1', 1)),
+                 self._txn(('inc', 'k0', 1)),
+                 self._txn(('set', 'k6', 6)),
+                 self._txn(('inc', 'k2', 1))]
+
+        serial = self._execute(TransactionExecutor(), txns)
+        self.assertEqual(serial[0], True)
+        self.assertEqual(serial[1]['k0'], 6)
+        self.assertEqual(self._execute(self._executor, txns), serial)
+
+    def test_invalid_transaction(self):
+        txns = [self._txn(('set', 'a', 1)),
+                self._txn(('set', 'b', 1)),
+                self._txn(('inc', 'missing', 1))]
+        self.assertFalse(self._execute(self._executor, txns)[0])
+        self.assertFalse(self._execute(TransactionExecutor(), txns)[0])
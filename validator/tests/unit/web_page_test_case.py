@@ -0,0 +1,97 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import urlparse
+
+from StringIO import StringIO
+
+from twisted.web import http
+from twisted.web.test.requesthelper import DummyRequest
+
+from gossip.common import dict2json
+from gossip.common import json2dict
+from journal_test_case import JournalTestCase
+
+
+class WebRequest(DummyRequest):
+    """A request for a page of the web API that records the response
+    code as the server's requests do.
+    """
+
+    def __init__(self, path, args=None, method='GET', headers=None,
+                 content=''):
+        DummyRequest.__init__(self, path.strip('/').split('/'))
+        self.path = path
+        self.method = method
+        self.args = args or {}
+        self.content = StringIO(content)
+        self.code = http.OK
+        for (name, value) in (headers or {}).iteritems():
+            self.requestHeaders.addRawHeader(name, value)
+
+    def setResponseCode(self, code, message=None):
+        DummyRequest.setResponseCode(self, code, message)
+        self.code = code
+
+
+class _Validator(object):
+    def __init__(self, journal, gossip):
+        self.journal = journal
+        self.gossip = gossip
+        self.web_thread_pool = None
+        self.config = {}
+
+
+class WebPageTestCase(JournalTestCase):
+    """The base class of the tests of the pages of the web API, pages
+    are created with _page and requested with _get.
+    """
+
+    def _page(self, page_class):
+        return page_class(_Validator(self._journal, self._gossip))
+
+    def _get(self, page, path, args=None, headers=None):
+        """
+        Request a path from a page, returns the response code and the
+        decoded response
+        """
+        request = WebRequest(path, args, headers=headers)
+        body = page.do_get(request)
+        if isinstance(body, dict):
+            return (request.code, body)
+        return (request.code, json2dict(body) if body else None)
+
+    def _post(self, page, path, info):
+        """
+        Post a JSON encoded message to a page, returns the response code
+        and the decoded response
+        """
+        request = WebRequest(path, method='POST',
+                             headers={'Content-Type': 'application/json'},
+                             content=dict2json(info))
+        body = page.do_post(request)
+        if isinstance(body, dict):
+            return (request.code, body)
+        return (request.code, json2dict(body))
+
+    def _get_url(self, pages, url):
+        """
+        Request a url relative to the root of the web API from the page
+        in pages, a dict mapping the names of pages to pages
+        """
+        parsed = urlparse.urlparse(url)
+        name = parsed.path.strip('/').split('/')[0]
+        return self._get(pages[name], parsed.path,
+                         urlparse.parse_qs(parsed.query))
@@ -0,0 +1,179 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+Measures the rate at which IntegerKey and MarketPlace updates are
+validated and applied to a chain of transaction stores, with the
+immutable value mode of the stores turned off and on. Transactions are
+not signed so the measurement only covers the store operations.
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from journal.global_store_manager import KeyValueStore
+from ledger.transaction import integer_key
+
+mktplace_imported = True
+try:
+    from mktplace.transactions import account_update
+    from mktplace.transactions import asset_type_update
+    from mktplace.transactions import asset_update
+    from mktplace.transactions import exchange_update
+    from mktplace.transactions import holding_update
+    from mktplace.transactions import participant_update
+    from mktplace.transactions.market_place import MarketPlaceGlobalStore
+except ImportError:
+    print "mktplace not available - MarketPlace benchmark disabled"
+    mktplace_imported = False
+
+
+class _Originator(object):
+    """The only transaction attribute used by the MarketPlace updates.
+    """
+
+    def __init__(self, originatorid):
+        self.OriginatorID = originatorid
+
+
+def _apply_blocks(store, blocks, originator):
+    """Validates and applies each block of updates to a new checkpoint
+    of the store, in the same way the journal applies a block.
+
+    Returns:
+        int: The number of updates applied.
+    """
+    count = 0
+    for block in blocks:
+        store = store.clone_store()
+        for update in block:
+            if originator is None:
+                update.check_valid(store)
+                update.apply(store)
+            else:
+                update.check_valid(store, originator)
+                update.apply(store, originator)
+            count += 1
+        store.commit()
+    return count
+
+
+def integer_key_workload(opts, immutable):
+    store = KeyValueStore()
+    store.ImmutableValues = immutable
+    for i in xrange(opts.keys):
+        store.set('key{0}'.format(i), 0)
+    store.commit()
+
+    blocks = []
+    for _ in xrange(opts.blocks):
+        blocks.append([
+            integer_key.Update({
+                'Verb': 'inc',
+                'Name': 'key{0}'.format(random.randrange(opts.keys)),
+                'Value': 1})
+            for _ in xrange(opts.block_size)])
+
+    return store, blocks, None
+
+
+def market_place_workload(opts, immutable):
+    address = 'benchmark-address'
+    store = MarketPlaceGlobalStore()
+    store.ImmutableValues = immutable
+
+    def add(objectid, obj):
+        store.set(objectid, obj.dump())
+
+    add('participant', participant_update.ParticipantObject(
+        'participant', {'name': 'benchmark', 'address': address}))
+    add('account', account_update.AccountObject(
+        'account', {'name': '/account', 'creator': 'participant'}))
+    add('assettype', asset_type_update.AssetTypeObject(
+        'assettype', {'name': '/asset-type', 'creator': 'participant'}))
+    add('asset', asset_update.AssetObject(
+        'asset', {'name': '/asset', 'creator': 'participant',
+                  'asset-type': 'assettype', 'consumable': True}))
+    holdings = []
+    for i in xrange(opts.keys):
+        holdingid = 'holding{0}'.format(i)
+        add(holdingid, holding_update.HoldingObject(
+            holdingid, {'name': '/holding{0}'.format(i),
+                        'creator': 'participant', 'account': 'account',
+                        'asset': 'asset', 'count': 1000000}))
+        holdings.append(holdingid)
+    store.commit()
+
+    blocks = []
+    for _ in xrange(opts.blocks):
+        block = []
+        for _ in xrange(opts.block_size):
+            payer, payee = random.sample(holdings, 2)
+            block.append(exchange_update.Exchange(
+                exchange_update.Exchange.UpdateType, payer, payee, [], 1))
+        blocks.append(block)
+
+    return store, blocks, _Originator(address)
+
+
+def run_benchmark(name, workload, opts):
+    for immutable in (False, True):
+        random.seed(opts.seed)
+        store, blocks, originator = workload(opts, immutable)
+
+        start = time.time()
+        count = _apply_blocks(store, blocks, originator)
+        elapsed = time.time() - start
+
+        print "{0:<12} immutable={1!s:<6} {2:>8} updates {3:8.3f}s " \
+            "{4:10.1f} updates/s".format(name, immutable, count, elapsed,
+                                         count / elapsed)
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.add_argument('--blocks',
+                        help='Number of blocks to apply',
+                        type=int,
+                        default=100)
+    parser.add_argument('--block-size',
+                        help='Number of updates in each block',
+                        type=int,
+                        default=100)
+    parser.add_argument('--keys',
+                        help='Number of keys or holdings in the store',
+                        type=int,
+                        default=1000)
+    parser.add_argument('--seed',
+                        help='Random seed used to generate the workload',
+                        type=int,
+                        default=0)
+
+    return parser.parse_args(args)
+
+
+def main():
+    opts = parse_args(sys.argv[1:])
+
+    run_benchmark('IntegerKey', integer_key_workload, opts)
+    if mktplace_imported:
+        run_benchmark('MarketPlace', market_place_workload, opts)
+
+
+if __name__ == "__main__":
+    main()
@@ -448,9 +448,13 @@ class Validator(object):
 
     def start_journal_transfer(self):
         self.status = 'transferring ledger'
-        journal_transfer.start_journal_transfer(self.gossip,
-                                                self.journal,
-                                                self.start_ledger)
+        journal_transfer.start_journal_transfer(
+            self.gossip,
+            self.journal,
+            self.start_ledger,
+            self.config.get("TransferWindow"),
+            self.config.get("TransferPeers"),
+            self.config.get("TransferMode") == "snapshot")
 
     def start_ledger(self):
         logger.info('ledger initialization complete')
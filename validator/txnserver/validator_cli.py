@@ -59,6 +59,7 @@ def local_main(config, windows_service=False, daemonized=False):
     from txnserver import web_api
     from gossip.gossip_core import GossipException
     from gossip.gossip_core import Gossip
+    from gossip import signed_object
 
     logger.warn('validator pid is %s', os.getpid())
 
@@ -73,7 +74,10 @@ def local_main(config, windows_service=False, daemonized=False):
         # Gossip parameters
         minimum_retries = config.get("MinimumRetries")
         retry_interval = config.get("RetryInterval")
-        gossip = Gossip(node, minimum_retries, retry_interval, stat_domains)
+        gossip = Gossip(node, minimum_retries, retry_interval, stat_domains,
+                        config.get("DuplicateCacheSize"),
+                        config.get("DuplicateBloomFilter"),
+                        config.get("DispatchLanes"))
         # WaitTimer globals
         target_wait_time = config.get("TargetWaitTime")
         initial_wait_time = config.get("InitialWaitTime")
@@ -86,6 +90,15 @@ def local_main(config, windows_service=False, daemonized=False):
         max_txn_age = config.get("MaxTxnAge")
         data_directory = config.get("DataDirectory")
         store_type = config.get("StoreType")
+        state_checkpoint_interval = config.get("StateCheckpointInterval")
+        parallel_validation_workers = \
+            config.get("ParallelValidationWorkers")
+        store_cache_sizes = config.get("StoreCacheSizes")
+        transaction_gossip = config.get("TransactionGossip")
+        signed_object.set_signature_verification_globals(
+            config.get("SignatureCacheSize"),
+            config.get("SignatureVerificationWorkers"),
+            config.get("SignatureCacheTTL"))
 
         if consensus_type == 'poet0':
             from sawtooth_validator.consensus.poet0 import poet_consensus
@@ -145,7 +158,11 @@ def local_main(config, windows_service=False, daemonized=False):
             max_txn_per_block,
             max_txn_age,
             data_directory,
-            store_type)
+            store_type,
+            state_checkpoint_interval,
+            parallel_validation_workers,
+            store_cache_sizes,
+            transaction_gossip)
 
         validator = Validator(
             gossip,
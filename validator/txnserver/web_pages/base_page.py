@@ -13,10 +13,14 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 
+import base64
+import hashlib
 import logging
-
+import threading
 import traceback
 
+from collections import OrderedDict
+
 from twisted.internet import reactor
 
 from twisted.internet import threads
@@ -34,8 +38,139 @@ from gossip.common import pretty_print_dict
 LOGGER = logging.getLogger(__name__)
 
 
+class ResponseCache(object):
+    """A bounded cache of encoded responses, the least recently used
+    entries are dropped first.
+
+    Entries are stored with the identifier of the head block the
+    response was computed from, or None when the response does not
+    depend on the head. The entries that depend on the head are dropped
+    when a block is committed or decommitted.
+
+    Entries are bounded in number and in bytes, an entry larger than
+    MaximumEntryBytes, such as an unpaged listing of a large store, is
+    not kept at all.
+
+    Attributes:
+        MaximumSize (int): The maximum number of entries held.
+        MaximumBytes (int): The maximum total size of the entries held.
+        MaximumEntryBytes (int): The maximum size of a single entry.
+        Hits (int): The number of lookups that found an entry.
+        Misses (int): The number of lookups that did not.
+    """
+
+    MaximumSize = 256
+    MaximumBytes = 16 * 1024 * 1024
+    MaximumEntryBytes = 1024 * 1024
+
+    def __init__(self, journal, maxsize=None, maxbytes=None,
+                 maxentrybytes=None):
+        """Constructor for the ResponseCache class.
+
+        Args:
+            journal (journal_core.Journal): The journal whose commits
+                invalidate the entries.
+            maxsize (int): The maximum number of entries held.
+            maxbytes (int): The maximum total size of the entries held.
+            maxentrybytes (int): The maximum size of a single entry.
+        """
+        if maxsize is not None:
+            self.MaximumSize = maxsize
+        if maxbytes is not None:
+            self.MaximumBytes = maxbytes
+        if maxentrybytes is not None:
+            self.MaximumEntryBytes = maxentrybytes
+
+        self.Hits = 0
+        self.Misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        journal.on_commit_block += self._on_head_change
+        journal.on_decommit_block += self._on_head_change
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def Bytes(self):
+        """The total size of the entries held."""
+        return self._bytes
+
+    def _on_head_change(self, journal, block):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] is not None]:
+                self._bytes -= self._entries.pop(key)[1]
+
+    def get(self, key, head=None):
+        """Returns the entry for a key, or None if there is none.
+
+        Args:
+            key: The key, it must be hashable.
+            head (str): The identifier of the head block.
+        """
+        with self._lock:
+            item = self._entries.pop((head, key), None)
+            if item is None:
+                self.Misses += 1
+                return None
+            self._entries[(head, key)] = item
+            self.Hits += 1
+            return item[0]
+
+    def put(self, key, entry, head=None, size=0):
+        """Adds an entry, dropping the least recently used entries when
+        more than MaximumSize entries or MaximumBytes bytes are held.
+
+        Args:
+            key: The key, it must be hashable.
+            entry: The entry.
+            head (str): The identifier of the head block the entry was
+                computed from, or None if it does not depend on it.
+            size (int): The size of the entry in bytes.
+
+        Returns:
+            bool: False if the entry is larger than MaximumEntryBytes and
+                was not added.
+        """
+        with self._lock:
+            item = self._entries.pop((head, key), None)
+            if item is not None:
+                self._bytes -= item[1]
+            if size > self.MaximumEntryBytes:
+                return False
+
+            self._entries[(head, key)] = (entry, size)
+            self._bytes += size
+            while len(self._entries) > self.MaximumSize or \
+                    self._bytes > self.MaximumBytes:
+                self._bytes -= self._entries.popitem(last=False)[1][1]
+            return True
+
+
 class BasePage(Resource):
+    """The base class of the pages of the web API.
+
+    Pages that list items return them in pages of at most limit items
+    when a limit is requested. A page holds its Items and a Next
+    continuation token, passed as the cursor parameter of the request
+    for the following page, or None after the last page.
+
+    Pages that set CacheResponses keep the encoded responses of
+    successful GET requests in a ResponseCache, keyed by the request and
+    the head block when the response depends on it. Responses carry an
+    ETag and a request whose If-None-Match matches it gets a 304 reply.
+    A page marks a response it must not cache with _set_uncacheable.
+
+    Attributes:
+        MaximumPageSize (int): The largest limit a request may use.
+        CacheResponses (bool): Whether the page caches its responses.
+    """
+
     isLeaf = True
+    MaximumPageSize = 1000
+    CacheResponses = False
 
     def __init__(self, validator, page_name=None):
         Resource.__init__(self)
@@ -51,6 +186,14 @@ class BasePage(Resource):
         else:
             self.page_name = page_name
 
+        self.response_cache = None
+        if self.CacheResponses:
+            self.response_cache = ResponseCache(
+                self.journal,
+                self.validator.config.get("WebResponseCacheSize"),
+                self.validator.config.get("WebResponseCacheBytes"),
+                self.validator.config.get("WebResponseCacheEntryBytes"))
+
     def log(self, status, *msgargs):
         msg = msgargs[0].format(*msgargs[1:])
         if status >= 500:
@@ -94,6 +237,66 @@ class BasePage(Resource):
     def render_get(self, request, components, msg):
         return self._encode_error_response(request, http.NOT_FOUND, "")
 
+    def _is_head_relative(self, components, msg):
+        """
+        Return True if the response to a request depends on the head of
+        the committed chain, pages override this for requests that name
+        the block they refer to
+        """
+        return True
+
+    @staticmethod
+    def _set_uncacheable(request):
+        """
+        Mark the response to a request as one that must not be cached
+        """
+        request.setHeader(b'cache-control', b'no-cache')
+
+    def _get_page_limit(self, msg):
+        """
+        Return the number of items requested per page, or None if the
+        request does not ask for pages
+        """
+        if 'limit' not in msg:
+            return None
+        limit = int(msg.get('limit').pop(0))
+        if limit < 1:
+            raise ValueError('limit must be positive')
+        return min(limit, self.MaximumPageSize)
+
+    @staticmethod
+    def _encode_cursor(cursor):
+        return base64.urlsafe_b64encode(dict2json(cursor))
+
+    @staticmethod
+    def _get_cursor(msg, fields):
+        """
+        Return the decoded continuation token of the request, or None if
+        the request is for the first page. The token must hold each of
+        fields, a dict that maps the name of a field to int for a
+        non-negative integer or to str for a string.
+        """
+        if 'cursor' not in msg:
+            return None
+        try:
+            cursor = json2dict(base64.urlsafe_b64decode(
+                str(msg.get('cursor').pop(0))))
+        except (TypeError, ValueError):
+            raise ValueError('invalid cursor')
+
+        if not isinstance(cursor, dict):
+            raise ValueError('invalid cursor')
+        for (name, ftype) in fields.iteritems():
+            value = cursor.get(name)
+            if ftype is int:
+                valid = isinstance(value, (int, long)) and \
+                    not isinstance(value, bool) and value >= 0
+            else:
+                valid = isinstance(value, basestring)
+            if not valid:
+                raise ValueError('invalid cursor')
+        return cursor
+
     def do_get(self, request):
         """
         Handle a GET request on the HTTP interface. Three paths are accepted:
@@ -118,29 +321,52 @@ class BasePage(Resource):
             components.pop(0)
 
         test_only = (request.method == 'HEAD')
+        cbor = (request.getHeader('Accept') == 'application/cbor')
+        pretty = request.args.get('p') == ['1']
+
+        # render_get consumes the arguments so the key is built first
+        cache_key = None
+        if self.response_cache is not None and not test_only:
+            cache_key = (
+                tuple(components), cbor,
+                tuple(sorted((k, tuple(v))
+                             for k, v in request.args.iteritems())))
+            head = None
+            if self._is_head_relative(components, request.args):
+                head = self.journal.most_recent_committed_block_id
+            entry = self.response_cache.get(cache_key, head)
+            if entry is not None:
+                return self._cached_response(request, entry)
+
         try:
             response = self.render_get(request, components, request.args)
             if test_only:
                 return ''
 
-            cbor = (request.getHeader('Accept') == 'application/cbor')
             if cbor:
-                request.responseHeaders.addRawHeader(b"content-type",
-                                                     b"application/cbor")
+                content_type = b"application/cbor"
                 result = dict2cbor(response)
             else:
-                request.responseHeaders.addRawHeader(b"content-type",
-                                                     b"application/json")
-                pretty = False
-                if 'p' in request.args:
-                    pretty = request.args['p'] == ['1']
-
+                content_type = b"application/json"
                 if pretty:
                     result = pretty_print_dict(response) + '\n'
                 else:
                     result = dict2json(response)
 
-            return result
+            # a response computed while the head moved may not belong
+            # to either head so it is not kept
+            if cache_key is None or request.code != http.OK or \
+                    request.responseHeaders.hasHeader(b'cache-control') or \
+                    (head is not None and
+                     head != self.journal.most_recent_committed_block_id):
+                request.responseHeaders.addRawHeader(b"content-type",
+                                                     content_type)
+                return result
+
+            entry = (content_type, '"{0}"'.format(
+                hashlib.sha256(result).hexdigest()[:32]), result)
+            self.response_cache.put(cache_key, entry, head, len(result))
+            return self._cached_response(request, entry)
         except Exception as e:
             LOGGER.warn('error processing http request %s; %s', request.path,
                         traceback.format_exc(20))
@@ -149,6 +375,18 @@ class BasePage(Resource):
                 http.INTERNAL_SERVER_ERROR,
                 e)
 
+    @staticmethod
+    def _cached_response(request, entry):
+        (content_type, etag, result) = entry
+        request.responseHeaders.addRawHeader(b"content-type", content_type)
+        request.setHeader(b'etag', etag)
+        if_none_match = request.getHeader('If-None-Match')
+        if if_none_match is not None and \
+                etag in [t.strip() for t in if_none_match.split(',')]:
+            request.setResponseCode(http.NOT_MODIFIED)
+            return ''
+        return result
+
     def render_post(self, request, components, msg):
         self._error_response(request, http.NOT_FOUND, "")
 
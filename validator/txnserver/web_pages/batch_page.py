@@ -0,0 +1,170 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import copy
+import logging
+
+from twisted.web import http
+
+from gossip import signed_object
+from gossip.common import cbor2dict
+from gossip.common import json2dict
+from txnserver.web_pages.base_page import BasePage
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class BatchPage(BasePage):
+    """Forwards a list of signed transaction messages through the gossip
+    network.
+
+    The transactions are checked in order against the committed state
+    with the pending transactions applied, each one sees the effects of
+    the valid transactions that precede it in the list. The result lists
+    for each message its transaction identifier and whether it was
+    accepted, rejected as invalid, or refused because the incoming queue
+    is full, in which case it may be submitted again later. Since the
+    transactions that follow a refused one were checked assuming it is
+    applied, they are refused as well.
+
+    The signatures of the batch are verified before the journal is
+    locked to check the transactions, and batches of more than
+    MaximumBatchSize messages are refused.
+
+    Attributes:
+        MaximumBatchSize (int): The largest number of messages a batch
+            may hold.
+    """
+
+    isLeaf = True
+    MaximumBatchSize = 1000
+
+    def __init__(self, validator, page_name=None):
+        BasePage.__init__(self, validator, page_name)
+        self.max_batch_size = self.validator.config.get(
+            "MaxBatchSize", self.MaximumBatchSize)
+
+    def _get_messages(self, request):
+        encoding = request.getHeader('Content-Type')
+        data = request.content.getvalue()
+        if encoding == 'application/json':
+            minfos = json2dict(data)
+        elif encoding == 'application/cbor':
+            minfos = cbor2dict(data)
+        else:
+            raise ValueError(
+                'unknown message encoding: {0}'.format(encoding))
+        if not isinstance(minfos, list):
+            raise ValueError('expected a list of messages')
+        return minfos
+
+    def _unpack_message(self, minfo):
+        dispatcher = self.validator.gossip.dispatcher
+        typename = minfo.get('__TYPE__', '**UNSPECIFIED**') \
+            if isinstance(minfo, dict) else '**UNSPECIFIED**'
+        if not dispatcher.has_message_handler(typename):
+            raise ValueError('unknown message type, {0}'.format(typename))
+        msg = dispatcher.unpack_message(typename, minfo)
+        if getattr(msg, 'Transaction', None) is None:
+            raise ValueError('{0} is not a transaction message'.format(
+                typename))
+        return msg
+
+    def render_post(self, request, components, msg):
+        """
+        Forward a list of signed transaction messages through the gossip
+        network.
+        """
+        try:
+            minfos = self._get_messages(request)
+        except ValueError as e:
+            return self._encode_error_response(request, http.BAD_REQUEST, e)
+
+        if len(minfos) > self.max_batch_size:
+            return self._encode_error_response(
+                request,
+                http.REQUEST_ENTITY_TOO_LARGE,
+                ValueError('a batch may hold at most {0} messages'.format(
+                    self.max_batch_size)))
+
+        results = []
+        msgs = []
+        for minfo in minfos:
+            try:
+                msg = self._unpack_message(minfo)
+            except Exception as e:
+                results.append({'Status': 'rejected', 'Error': str(e)})
+                msgs.append(None)
+                continue
+            results.append({'Identifier': msg.Transaction.Identifier})
+            msgs.append(msg)
+
+        # we check copies of the transactions because side effects of the
+        # validity check may impact objects related to the messages
+        if self.validator.config.get("LocalValidation", True):
+            checked = [i for i, m in enumerate(msgs) if m is not None]
+            txns = [copy.deepcopy(msgs[i].Transaction) for i in checked]
+
+            # verify the signatures outside of the journal lock, the keys
+            # are cached for the checks made under the lock
+            signed = signed_object.verify_signatures(txns)
+            for i, valid in zip(checked, signed):
+                if not valid:
+                    results[i].update({'Status': 'rejected',
+                                       'Error': 'invalid signature'})
+                    msgs[i] = None
+            txns = [t for t, v in zip(txns, signed) if v]
+            checked = [i for i, v in zip(checked, signed) if v]
+
+            errors = self.journal.check_pending_transactions(txns)
+            for i, error in zip(checked, errors):
+                if error is not None:
+                    LOGGER.info('submitted transaction %s is not valid: %s',
+                                msgs[i].Transaction.Identifier, error)
+                    results[i].update({'Status': 'rejected',
+                                       'Error': str(error)})
+                    msgs[i] = None
+
+            copies = dict(zip(checked, txns))
+        else:
+            copies = {}
+
+        queue = self.validator.gossip.IncomingMessageQueue
+        refused = None
+        for i, (msg, result) in enumerate(zip(msgs, results)):
+            if msg is None:
+                continue
+            if refused is None:
+                # the lane may fill up between the check and the broadcast
+                lane = queue.lane_of(msg)
+                if queue.is_full(lane) or \
+                        not self.validator.gossip.broadcast_message(msg):
+                    refused = 'the {0} queue is full, try again later'.format(
+                        lane)
+            if refused is not None:
+                result.update({'Status': 'busy', 'Error': refused})
+                continue
+
+            # the checked copy of an accepted transaction is applied to
+            # the pending state until the message is dispatched
+            if i in copies:
+                self.journal.add_submitted_transaction(copies[i])
+            result['Status'] = 'accepted'
+
+        LOGGER.info('forwarded %d of %d transactions',
+                    sum(1 for r in results if r['Status'] == 'accepted'),
+                    len(results))
+        return results
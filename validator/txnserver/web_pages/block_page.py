@@ -24,9 +24,15 @@ LOGGER = logging.getLogger(__name__)
 
 
 class BlockPage(BasePage):
+    CacheResponses = True
+
     def __init__(self, validator):
         BasePage.__init__(self, validator)
 
+    def _is_head_relative(self, components, msg):
+        # the contents of a block do not change once it is known
+        return not components or len(components[0]) == 0
+
     def render_get(self, request, components, msg):
         """
         Handle a block request. There are three types of requests:
@@ -50,6 +56,10 @@ class BlockPage(BasePage):
                     if short is not equal to one, then all block content
                     is included
 
+            limit -- the number of block ids to return in a page, when info
+                is not in effect
+            cursor -- the continuation token of the page to return
+
         Blocks are returned newest to oldest.
         """
 
@@ -66,6 +76,19 @@ class BlockPage(BasePage):
             if 'blockcount' in msg:
                 count = int(msg.get('blockcount').pop(0))
 
+            try:
+                limit = self._get_page_limit(msg)
+                if limit is not None:
+                    return self._render_page(
+                        request,
+                        self._get_cursor(msg, {'Height': int, 'BlockID': str}),
+                        limit)
+            except ValueError as e:
+                return self._encode_error_response(
+                    request,
+                    http.BAD_REQUEST,
+                    e)
+
             block_ids = self.journal.committed_block_ids(count)
             return block_ids
 
@@ -91,6 +114,34 @@ class BlockPage(BasePage):
 
         return binfo[field]
 
+    def _render_page(self, request, cursor, limit):
+        """
+        Return a page of committed block ids, the continuation token holds
+        the height and identifier of the block to continue from
+        """
+        if cursor is not None:
+            height = int(cursor['Height'])
+            if self.journal.committed_block_id(height) != cursor['BlockID']:
+                return self._encode_error_response(
+                    request,
+                    http.GONE,
+                    LookupError('block {0} is no longer committed'.format(
+                        cursor['BlockID'])))
+        else:
+            height = self.journal.committed_chain_length - 1
+
+        end = max(height - limit, -1)
+        block_ids = self.journal.committed_block_range(
+            end + 1, height - end)
+        block_ids.reverse()
+
+        token = None
+        if end >= 0:
+            token = self._encode_cursor(
+                {'Height': end,
+                 'BlockID': self.journal.committed_block_id(end)})
+        return {'Items': block_ids, 'Next': token}
+
     def render_info(self, request, components, msg):
         GENESIS_PREVIOUS_BLOCK_ID = "0000000000000000"
 
@@ -114,7 +165,7 @@ class BlockPage(BasePage):
         if 'blockcount' in msg:
             count = int(msg.get('blockcount').pop(0))
         if count is 0:
-            count = self.journal.committed_Block_count
+            count = self.journal.committed_chain_length
 
         short = 1
         if 'short' in msg:
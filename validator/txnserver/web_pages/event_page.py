@@ -0,0 +1,183 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+from collections import deque
+import logging
+import threading
+
+from twisted.internet import reactor
+from twisted.web import http
+from twisted.web import server
+
+from gossip.common import dict2cbor
+from gossip.common import dict2json
+from txnserver.web_pages.base_page import BasePage
+
+LOGGER = logging.getLogger(__name__)
+
+
+class CommitEventLog(object):
+    """Records the most recent block commit and decommit events of a
+    journal, numbered in the order they happened.
+
+    Attributes:
+        MaximumEvents (int): The number of events kept.
+        Sequence (int): The number of the most recent event, events are
+            numbered from one.
+    """
+
+    MaximumEvents = 1000
+
+    def __init__(self, journal, callback=None):
+        """Constructor for the CommitEventLog class.
+
+        Args:
+            journal (journal_core.Journal): The journal whose events are
+                recorded.
+            callback (function): The function to call, with no arguments,
+                after an event is recorded.
+        """
+        self.Sequence = 0
+        self._events = deque(maxlen=self.MaximumEvents)
+        self._lock = threading.Lock()
+        self._callback = callback
+
+        journal.on_commit_block += self._on_commit_block
+        journal.on_decommit_block += self._on_decommit_block
+
+    def _on_commit_block(self, journal, block):
+        self._record('commit', block)
+
+    def _on_decommit_block(self, journal, block):
+        self._record('decommit', block)
+
+    def _record(self, event, block):
+        with self._lock:
+            self.Sequence += 1
+            self._events.append({
+                'Sequence': self.Sequence,
+                'Event': event,
+                'BlockID': block.Identifier,
+                'BlockNum': block.BlockNum,
+                'TransactionIDs': list(block.TransactionIDs)})
+        if self._callback is not None:
+            self._callback()
+
+    def events_since(self, since):
+        """Returns the events that follow an event.
+
+        Args:
+            since (int): The number of the event, events are returned
+                from the next one.
+
+        Returns:
+            tuple: The list of events and whether events that follow
+                since are missing from it, because they are no longer
+                kept or since is not an event of this log.
+        """
+        with self._lock:
+            oldest = self._events[0]['Sequence'] if self._events \
+                else self.Sequence + 1
+            truncated = since < oldest - 1 or since > self.Sequence
+            events = [e for e in self._events if e['Sequence'] > since]
+            return (events, truncated)
+
+
+class EventPage(BasePage):
+    """Streams the block commit and decommit events of the journal by
+    long polling.
+
+    GET /event?since=<n>&timeout=<seconds> returns the events numbered
+    after n, waiting up to timeout seconds for one to happen. since
+    defaults to the most recent event and timeout to MaximumTimeout, a
+    timeout of zero returns the number of the most recent event
+    immediately. The response holds the Events, the number of the most
+    recent event to use as since in the next request as Next, and
+    Truncated when events that followed since are missing.
+
+    Waiting requests do not hold a web worker thread.
+
+    Attributes:
+        MaximumTimeout (float): The longest time in seconds a request
+            waits for an event.
+    """
+
+    MaximumTimeout = 60.0
+
+    def __init__(self, validator, page_name=None):
+        BasePage.__init__(self, validator, page_name)
+        self._waiting = []
+        self.event_log = CommitEventLog(
+            self.journal, lambda: reactor.callFromThread(self._wake))
+
+    def _respond(self, request, since):
+        (events, truncated) = self.event_log.events_since(since)
+        response = {'Events': events,
+                    'Next': events[-1]['Sequence'] if events else since,
+                    'Truncated': truncated}
+        if truncated:
+            response['Next'] = self.event_log.Sequence
+
+        if request.getHeader('Accept') == 'application/cbor':
+            request.responseHeaders.addRawHeader(b"content-type",
+                                                 b"application/cbor")
+            request.write(dict2cbor(response))
+        else:
+            request.responseHeaders.addRawHeader(b"content-type",
+                                                 b"application/json")
+            request.write(dict2json(response))
+        request.finish()
+
+    def _wake(self):
+        waiting = self._waiting
+        self._waiting = []
+        for entry in waiting:
+            (request, since, timer) = entry
+            if self.event_log.events_since(since)[0]:
+                timer.cancel()
+                self._respond(request, since)
+            else:
+                self._waiting.append(entry)
+
+    def _expire(self, request, since):
+        self._waiting = [e for e in self._waiting if e[0] is not request]
+        self._respond(request, since)
+
+    def _abandon(self, failure, request):
+        for (waiting, _, timer) in self._waiting:
+            if waiting is request:
+                timer.cancel()
+        self._waiting = [e for e in self._waiting if e[0] is not request]
+
+    def render_GET(self, request):
+        # pylint: disable=invalid-name
+        try:
+            since = int(request.args['since'][0]) \
+                if 'since' in request.args else self.event_log.Sequence
+            timeout = float(request.args['timeout'][0]) \
+                if 'timeout' in request.args else self.MaximumTimeout
+        except ValueError as e:
+            return self._error_response(request, http.BAD_REQUEST,
+                                        'invalid parameter, {0}', e)
+        timeout = min(max(timeout, 0.0), self.MaximumTimeout)
+
+        if timeout == 0 or self.event_log.events_since(since) != ([], False):
+            self._respond(request, since)
+            return server.NOT_DONE_YET
+
+        timer = reactor.callLater(timeout, self._expire, request, since)
+        self._waiting.append((request, since, timer))
+        request.notifyFinish().addErrback(self._abandon, request)
+        return server.NOT_DONE_YET
@@ -38,6 +38,18 @@ class ForwardPage(BasePage):
         """
         data = request.content.getvalue()
         msg = self._get_message(request)
+
+        # refuse the message rather than let it be dropped when the lane
+        # of the incoming queue it would wait in is full
+        queue = self.validator.gossip.IncomingMessageQueue
+        lane = queue.lane_of(msg)
+        if queue.is_full(lane):
+            return self._encode_error_response(
+                request,
+                http.SERVICE_UNAVAILABLE,
+                'the {0} queue is full, try again later'.format(lane))
+
+        mytxn = None
         if self.validator.config.get("LocalValidation", True):
             # determine if the message contains a valid transaction before
             # we send the message to the network
@@ -54,71 +66,19 @@ class ForwardPage(BasePage):
                             mytxn.Identifier,
                             mytxn.TransactionTypeName)
 
-                pending_block_txns = None
-                if self.journal.pending_block is not None:
-                    pending_block_txns = \
-                        self.journal.pending_block.TransactionIDs
-
+                # determine validity of the POSTed transaction against the
+                # committed state with the pending transactions applied
                 try:
-                    temp_store_map = self._get_store_map()
-                except KeyError as e:
-                    return self._encode_error_response(
-                        request,
-                        http.NOT_FOUND,
-                        e)
-                pending_txns = copy.copy(self.journal.pending_transactions)
-                pending_txn_ids = [x for x in pending_txns.iterkeys()]
-
-                # clone a copy of the ledger's message queue so we can
-                # temporarily play forward all locally submitted yet
-                # uncommitted transactions
-                my_queue = copy.deepcopy(
-                    self.validator.gossip.IncomingMessageQueue)
-
-                transaction_type = mytxn.TransactionTypeName
-                if transaction_type not in temp_store_map.TransactionStores:
+                    LOGGER.info(mytxn)
+                    self.journal.check_pending_transaction(mytxn)
+                except KeyError:
                     LOGGER.info('transaction type %s not in global store map',
-                                transaction_type)
+                                mytxn.TransactionTypeName)
                     return self._encode_error_response(
                         request,
                         http.BAD_REQUEST,
                         'unable to validate enclosed'
                         ' transaction {0}'.format(data))
-
-                if pending_block_txns is not None:
-                    pending_txn_ids = pending_block_txns + pending_txn_ids
-
-                # apply any local pending transactions
-                for txn_id in pending_txn_ids:
-                    if txn_id in self.journal.transaction_store:
-                        pend_txn = self.journal.transaction_store[txn_id]
-                        my_store = temp_store_map.get_transaction_store(
-                            pend_txn.TransactionTypeName)
-                        if pend_txn and pend_txn.is_valid(my_store):
-                            my_pend_txn = copy.copy(pend_txn)
-                            my_pend_txn.apply(my_store)
-
-                # apply any enqueued messages
-                while len(my_queue) > 0:
-                    qmsg = my_queue.pop()
-                    if qmsg and \
-                            self.journal.gossip.dispatcher.\
-                            has_message_handler(qmsg.MessageType):
-                        if (hasattr(qmsg, 'Transaction') and
-                                qmsg.Transaction is not None):
-                            my_store = temp_store_map.get_transaction_store(
-                                qmsg.Transaction.TransactionTypeName)
-                            if qmsg.Transaction.is_valid(my_store):
-                                myqtxn = copy.copy(qmsg.Transaction)
-                                myqtxn.apply(my_store)
-
-                # determine validity of the POSTed transaction against our
-                # new temporary state
-                my_store = temp_store_map.get_transaction_store(
-                    mytxn.TransactionTypeName)
-                try:
-                    LOGGER.info(mytxn)
-                    mytxn.check_valid(my_store)
                 except InvalidTransactionError as e:
                     LOGGER.info('submitted transaction fails transaction '
                                 'family validation check: %s; %s',
@@ -140,5 +100,8 @@ class ForwardPage(BasePage):
         # and finally execute the associated method
         # and send back the results
 
-        self.validator.gossip.broadcast_message(msg)
+        # the transactions submitted after this one are checked against
+        # its effects until it is dispatched to the journal
+        if self.validator.gossip.broadcast_message(msg) and mytxn:
+            self.journal.add_submitted_transaction(mytxn)
         return msg.dump()
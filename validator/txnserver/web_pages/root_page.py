@@ -23,8 +23,10 @@ from twisted.web.resource import Resource
 from twisted.web.resource import NoResource
 
 
+from txnserver.web_pages.batch_page import BatchPage
 from txnserver.web_pages.block_page import BlockPage
 from txnserver.web_pages.command_page import CommandPage
+from txnserver.web_pages.event_page import EventPage
 from txnserver.web_pages.forward_page import ForwardPage
 from txnserver.web_pages.prevalidation_page import PrevalidationPage
 from txnserver.web_pages.statistics_page import StatisticsPage
@@ -51,8 +53,10 @@ class RootPage(Resource):
         self.putChild('store', StorePage(validator))
         self.putChild('status', StatusPage(validator))
         self.putChild('transaction', TransactionPage(validator))
+        self.putChild('event', EventPage(validator))
 
         self.putChild('forward', ForwardPage(validator))
+        self.putChild('batch', BatchPage(validator))
         self.putChild('prevalidation', PrevalidationPage(validator))
         self.putChild('command', CommandPage(validator))
 
@@ -13,6 +13,7 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 
+import bisect
 import logging
 
 from twisted.web.error import Error
@@ -25,9 +26,19 @@ LOGGER = logging.getLogger(__name__)
 
 
 class StorePage(BasePage):
+    CacheResponses = True
+
     def __init__(self, validator):
         BasePage.__init__(self, validator)
 
+        # the sorted keys of the store most recently listed in pages, the
+        # state of a block does not change so they stay valid
+        self._sorted_keys = (None, None, [])
+
+    def _is_head_relative(self, components, msg):
+        # the state of a named block does not change
+        return 'blockid' not in msg and 'cursor' not in msg
+
     def render_get(self, request, components, msg):
         """
         Handle a store request. There are four types of requests:
@@ -36,13 +47,30 @@ class StorePage(BasePage):
             store name, key == '*' -- return a complete dump of all keys in the
                 store
             store name, key != '*' -- return the data associated with the key
+
+        The keys and the complete dump of a store are returned in pages,
+        ordered by key, when the request specifies a limit:
+            limit -- the number of keys or objects to return in a page
+            cursor -- the continuation token of the page to return, the
+                pages of a listing all show the state of the same block
         """
         if not self.journal.global_store:
             raise Error(http.BAD_REQUEST, 'no global store')
 
+        try:
+            limit = self._get_page_limit(msg)
+            cursor = self._get_cursor(msg, {'BlockID': str, 'Key': str})
+        except ValueError as e:
+            return self._encode_error_response(
+                request,
+                http.BAD_REQUEST,
+                e)
+
         block_id = self.journal.most_recent_committed_block_id
         if 'blockid' in msg:
             block_id = msg.get('blockid').pop(0)
+        if cursor is not None:
+            block_id = cursor['BlockID']
 
         storemap = self.journal.global_store_map.get_block_store(block_id)
         if not storemap:
@@ -64,12 +92,18 @@ class StorePage(BasePage):
         store = storemap.get_transaction_store(store_name)
 
         if len(components) == 0:
+            if limit is not None:
+                return self._render_page(
+                    block_id, store_name, store, cursor, limit, False)
             return store.keys()
 
         key = components[0]
         if key == '*':
             if 'delta' in msg and msg.get('delta').pop(0) == '1':
                 return store.dump(True)
+            if limit is not None:
+                return self._render_page(
+                    block_id, store_name, store, cursor, limit, True)
             return store.compose()
 
         if key not in store:
@@ -79,3 +113,29 @@ class StorePage(BasePage):
                 KeyError('no such key {0}'.format(key)))
 
         return store[key]
+
+    def _render_page(self, block_id, store_name, store, cursor, limit,
+                     values):
+        """
+        Return a page of the keys, or of the objects when values is set,
+        of a store, the continuation token holds the block the store
+        belongs to and the last key returned
+        """
+        (cached_id, cached_name, keys) = self._sorted_keys
+        if cached_id != block_id or cached_name != store_name:
+            keys = sorted(store.keys())
+            self._sorted_keys = (block_id, store_name, keys)
+
+        start = 0
+        if cursor is not None:
+            start = bisect.bisect_right(keys, cursor['Key'])
+        page = keys[start:start + limit]
+
+        token = None
+        if start + limit < len(keys):
+            token = self._encode_cursor(
+                {'BlockID': block_id, 'Key': page[-1]})
+        if values:
+            return {'Items': dict((k, store[k]) for k in page),
+                    'Next': token}
+        return {'Items': page, 'Next': token}
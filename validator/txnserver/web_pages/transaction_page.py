@@ -25,6 +25,8 @@ LOGGER = logging.getLogger(__name__)
 
 
 class TransactionPage(BasePage):
+    CacheResponses = True
+
     def __init__(self, validator):
         BasePage.__init__(self, validator)
 
@@ -44,6 +46,8 @@ class TransactionPage(BasePage):
         The request may specify additional parameters:
             blockcount -- the number of blocks (newest to oldest) from which to
                 pull txns
+            limit -- the number of transaction ids to return in a page
+            cursor -- the continuation token of the page to return
 
         Transactions are returned from oldest to newest.
         """
@@ -56,6 +60,21 @@ class TransactionPage(BasePage):
             if 'blockcount' in msg:
                 blkcount = int(msg.get('blockcount').pop(0))
 
+            try:
+                limit = self._get_page_limit(msg)
+                if limit is not None:
+                    return self._render_page(
+                        request,
+                        self._get_cursor(
+                            msg,
+                            {'Height': int, 'BlockID': str, 'Offset': int}),
+                        limit, blkcount)
+            except ValueError as e:
+                return self._encode_error_response(
+                    request,
+                    http.BAD_REQUEST,
+                    e)
+
             txnids = []
             blockids = self.journal.committed_block_ids(blkcount)
             while blockids:
@@ -72,6 +91,8 @@ class TransactionPage(BasePage):
                 LookupError('no such transaction {0}'.format(txnid)))
 
         txn = self.journal.transaction_store[txnid]
+        if txn.Status != transaction.Status.committed:
+            self._set_uncacheable(request)
 
         test_only = (request.method == 'HEAD')
         if test_only:
@@ -98,3 +119,43 @@ class TransactionPage(BasePage):
                 KeyError('unknown transaction field {0}'.format(field)))
 
         return tinfo[field]
+
+    def _render_page(self, request, cursor, limit, blkcount):
+        """
+        Return a page of committed transaction ids, the continuation token
+        holds the height and identifier of the block to continue from and
+        the position in its transaction list
+        """
+        length = self.journal.committed_chain_length
+        if cursor is not None:
+            height = int(cursor['Height'])
+            offset = int(cursor['Offset'])
+            if self.journal.committed_block_id(height) != cursor['BlockID']:
+                return self._encode_error_response(
+                    request,
+                    http.GONE,
+                    LookupError('block {0} is no longer committed'.format(
+                        cursor['BlockID'])))
+        else:
+            height = max(length - blkcount, 0) if blkcount else 0
+            offset = 0
+
+        txnids = []
+        while len(txnids) < limit and height < length:
+            blockid = self.journal.committed_block_id(height)
+            if blockid is None:
+                break
+            blktxnids = self.journal.block_store[blockid].TransactionIDs
+            page = blktxnids[offset:offset + limit - len(txnids)]
+            txnids.extend(page)
+            offset += len(page)
+            if offset >= len(blktxnids):
+                height += 1
+                offset = 0
+
+        token = None
+        blockid = self.journal.committed_block_id(height)
+        if blockid is not None:
+            token = self._encode_cursor(
+                {'Height': height, 'BlockID': blockid, 'Offset': offset})
+        return {'Items': txnids, 'Next': token}